@@ -1,5 +1,7 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+
+from analytics import search
 from .models import User
 
 
@@ -13,4 +15,12 @@ class CustomUserAdmin(UserAdmin):
     add_fieldsets = UserAdmin.add_fieldsets + (
         ('Role & Profile', {'fields': ('role', 'email', 'first_name', 'last_name')}),
     )
-    search_fields = ['username', 'email', 'first_name', 'last_name']
+    # Prefix matches (indexed) for everyone; students are also matched through
+    # the student search index, which covers roll number, parent and phone.
+    search_fields = ['^username', '^first_name', '^last_name', '=email']
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            results |= queryset.filter(pk__in=search.search_ids(search_term, limit=500))
+        return results, may_have_duplicates
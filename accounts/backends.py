@@ -0,0 +1,36 @@
+"""
+Authentication backend that caches the logged-in user.
+
+``AuthenticationMiddleware`` loads ``request.user`` on every request; with
+this backend that is a cache hit instead of a ``User`` query. The entry is
+dropped whenever the user is saved or deleted and on logout (see
+``accounts.signals``), and expires after ``USER_CACHE_TIMEOUT`` seconds
+anyway. Without a shared cache (``CACHE_IS_SHARED``) the entry could only be
+dropped in the process that saw the change, so the user is queried as usual.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import cache
+
+
+def user_cache_key(user_id):
+    return f'auth_user:{user_id}'
+
+
+def forget_user(user_id):
+    cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        if not settings.CACHE_IS_SHARED:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                cache.set(key, user, settings.USER_CACHE_TIMEOUT)
+        elif not self.user_can_authenticate(user):
+            return None
+        return user
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY
+from django.contrib.sessions.backends.cached_db import KEY_PREFIX
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.cache import caches
+from django.db import migrations
+from django.utils import timezone
+
+OLD_BACKEND = 'django.contrib.auth.backends.ModelBackend'
+NEW_BACKEND = 'accounts.backends.CachedModelBackend'
+
+
+def _rewrite(old, new):
+    def rewrite(apps, schema_editor):
+        """Point live sessions logged in through ``old`` at ``new``, which is
+        the only backend listed, so they stay logged in. Expiry dates are kept;
+        sessions that do not decode (e.g. signed with another SECRET_KEY) are
+        left alone."""
+        Session = apps.get_model('sessions', 'Session')
+        sessions = Session.objects.using(schema_editor.connection.alias)
+        live = sessions.filter(expire_date__gt=timezone.now()).only('session_data')
+        store = SessionStore()  # same encoding as cached_db
+        cache = caches[settings.SESSION_CACHE_ALIAS]
+        for session in live.iterator(chunk_size=1000):
+            try:
+                data = store.decode(session.session_data)
+            except Exception:
+                continue
+            if data.get(BACKEND_SESSION_KEY) != old:
+                continue
+            data[BACKEND_SESSION_KEY] = new
+            sessions.filter(pk=session.pk).update(session_data=store.encode(data))
+            cache.delete(KEY_PREFIX + session.pk)  # a cached_db copy, if any
+    return rewrite
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('sessions', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunPython(_rewrite(OLD_BACKEND, NEW_BACKEND), _rewrite(NEW_BACKEND, OLD_BACKEND)),
+    ]
@@ -1,7 +1,16 @@
 from django.contrib import admin
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+
+from . import profiling, search
+from .pagination import EstimatedCountPaginator
 from .models import (
     Subject, ClassRoom, StudentProfile, ExamType,
-    Marks, Attendance, Assessment, AssessmentSubmission, Notification
+    Marks, Attendance, Assessment, AssessmentSubmission, Notification,
+    ClosedAcademicYear, CohortAggregate, ChangeLog, ChangeConsumer, ReportSnapshot,
+    RequestProfile, SlowQuery
 )
 
 
@@ -19,10 +28,32 @@ class ClassRoomAdmin(admin.ModelAdmin):
     filter_horizontal = ['students', 'subjects']
 
 
+class StudentSearchMixin:
+    """Adds students found through ``analytics.search`` to the admin search results."""
+    student_field = 'student_id'
+
+    def get_search_results(self, request, queryset, search_term):
+        results, may_have_duplicates = super().get_search_results(request, queryset, search_term)
+        if search_term:
+            ids = search.search_ids(search_term, limit=500)
+            results |= queryset.filter(**{f'{self.student_field}__in': ids})
+        return results, may_have_duplicates
+
+
+class LargeTableAdmin(admin.ModelAdmin):
+    """Changelist settings for tables with millions of rows."""
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_per_page = 50
+
+
 @admin.register(StudentProfile)
-class StudentProfileAdmin(admin.ModelAdmin):
+class StudentProfileAdmin(StudentSearchMixin, admin.ModelAdmin):
     list_display = ['user', 'roll_number', 'parent_name']
-    search_fields = ['roll_number', 'user__username', 'user__first_name']
+    list_select_related = ['user']
+    # Prefix matches here; everything else comes from the search index.
+    search_fields = ['^roll_number', '^user__username', '^user__first_name']
+    student_field = 'user_id'
 
 
 @admin.register(ExamType)
@@ -31,17 +62,25 @@ class ExamTypeAdmin(admin.ModelAdmin):
 
 
 @admin.register(Marks)
-class MarksAdmin(admin.ModelAdmin):
+class MarksAdmin(StudentSearchMixin, LargeTableAdmin):
     list_display = ['student', 'subject', 'exam_type', 'marks_obtained', 'date']
+    list_select_related = ['student', 'subject', 'exam_type']
     list_filter = ['subject', 'exam_type', 'date']
-    search_fields = ['student__username', 'student__first_name']
+    date_hierarchy = 'date'
+    search_fields = ['^student__username']
+    autocomplete_fields = ['student']
+    raw_id_fields = ['recorded_by']
 
 
 @admin.register(Attendance)
-class AttendanceAdmin(admin.ModelAdmin):
+class AttendanceAdmin(StudentSearchMixin, LargeTableAdmin):
     list_display = ['student', 'subject', 'date', 'status']
+    list_select_related = ['student', 'subject']
     list_filter = ['subject', 'status', 'date']
-    search_fields = ['student__username']
+    date_hierarchy = 'date'
+    search_fields = ['^student__username']
+    autocomplete_fields = ['student']
+    raw_id_fields = ['marked_by']
 
 
 @admin.register(Assessment)
@@ -60,3 +99,123 @@ class AssessmentSubmissionAdmin(admin.ModelAdmin):
 class NotificationAdmin(admin.ModelAdmin):
     list_display = ['recipient', 'title', 'notif_type', 'is_read', 'created_at']
     list_filter = ['notif_type', 'is_read']
+
+
+@admin.register(ClosedAcademicYear)
+class ClosedAcademicYearAdmin(admin.ModelAdmin):
+    list_display = ['academic_year', 'closed_at', 'closed_by']
+
+
+@admin.register(CohortAggregate)
+class CohortAggregateAdmin(admin.ModelAdmin):
+    list_display = ['academic_year', 'class_name', 'section', 'subject', 'student_count', 'count']
+    list_filter = ['academic_year', 'subject']
+
+
+@admin.register(ChangeLog)
+class ChangeLogAdmin(LargeTableAdmin):
+    list_display = ['id', 'table', 'action', 'object_id', 'student_id', 'changed_at']
+    list_filter = ['table', 'action']
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(ChangeConsumer)
+class ChangeConsumerAdmin(admin.ModelAdmin):
+    list_display = ['name', 'position', 'updated_at']
+
+
+@admin.register(ReportSnapshot)
+class ReportSnapshotAdmin(admin.ModelAdmin):
+    list_display = ['kind', 'object_id', 'version', 'built_at']
+    list_filter = ['kind']
+    exclude = ['payload']
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ['created_at', 'method', 'path', 'user', 'status_code', 'duration_ms', 'query_count', 'query_ms', 'mode']
+    list_filter = ['mode', 'view_name']
+    list_select_related = ['user']
+    search_fields = ['path']
+    fields = [
+        'created_at', 'user', 'method', 'path', 'view_name', 'mode', 'status_code',
+        'duration_ms', 'query_count', 'query_ms', 'download', 'profile', 'slowest_queries',
+    ]
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('<int:pk>/download/', self.admin_site.admin_view(self.download_view),
+                 name='analytics_requestprofile_download'),
+        ] + super().get_urls()
+
+    def download_view(self, request, pk):
+        if not self.has_view_permission(request):
+            return HttpResponse(status=403)
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        name = f'profile-{pk}.prof' if profile.mode == 'cprofile' else f'profile-{pk}.folded'
+        response = HttpResponse(bytes(profile.data), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="{name}"'
+        return response
+
+    @admin.display(description='Download')
+    def download(self, obj):
+        label = 'pstats (.prof, for snakeviz)' if obj.mode == 'cprofile' else 'folded stacks (for flamegraph.pl / speedscope)'
+        return format_html('<a href="{}">{}</a>', reverse('admin:analytics_requestprofile_download', args=[obj.pk]), label)
+
+    @admin.display(description='Profile')
+    def profile(self, obj):
+        return format_html('<pre style="font-size: 11px">{}</pre>', profiling.report(obj))
+
+    @admin.display(description='Slowest queries')
+    def slowest_queries(self, obj):
+        queries = sorted(obj.queries, key=lambda q: q['ms'], reverse=True)[:20]
+        return format_html(
+            '<table><tr><th>ms</th><th>db</th><th>SQL</th></tr>{}</table>',
+            format_html_join('', '<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>',
+                             ((f"{q['ms']:.2f}", q['alias'], q['sql']) for q in queries)),
+        )
+
+
+@admin.register(SlowQuery)
+class SlowQueryAdmin(admin.ModelAdmin):
+    list_display = ['short_statement', 'count', 'total_ms', 'avg', 'max_ms', 'view', 'database', 'last_seen']
+    list_filter = ['database', 'view']
+    search_fields = ['statement', 'view', 'caller']
+    fields = [
+        'statement', 'count', 'total_ms', 'avg', 'max_ms', 'first_seen', 'last_seen',
+        'database', 'view', 'caller', 'sql', 'query_plan', 'plan_at',
+    ]
+    readonly_fields = fields
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    @admin.display(description='Statement')
+    def short_statement(self, obj):
+        return obj.statement[:120]
+
+    @admin.display(description='Avg ms')
+    def avg(self, obj):
+        return f'{obj.avg_ms:.1f}'
+
+    @admin.display(description='Plan')
+    def query_plan(self, obj):
+        return format_html('<pre style="font-size: 11px">{}</pre>', obj.plan)
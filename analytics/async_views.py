@@ -0,0 +1,116 @@
+"""
+Async versions of the dashboard and chart API views.
+
+Served instead of the sync views in ``views.py`` when ``settings.ASYNC_VIEWS``
+is on (the default under ``student_analytics.asgi``). Independent dashboard
+shell queries use the async ORM and are awaited together with
+``asyncio.gather`` rather than one after another; the heavier sections are
+served by ``api_dashboard_section``.
+"""
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.decorators import login_required
+from django.db.models import Count
+from django.http import JsonResponse
+from django.shortcuts import aget_object_or_404, render
+
+from accounts.models import User
+from student_analytics.db_router import replica_reads
+from . import reports
+from .models import Assessment, ClassRoom, Marks, Subject
+from .scope import TeacherScope
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+@login_required
+@replica_reads
+async def dashboard(request):
+    user = await request.auser()
+    request.user = user  # reuse the resolved user while rendering
+
+    if user.is_admin_user():
+        data = await _admin_dashboard_data()
+    elif user.is_teacher():
+        data = await _teacher_dashboard_data(user)
+    else:
+        data = await _student_dashboard_data(user)
+
+    # Context processors still query synchronously, so render off the event loop.
+    return await sync_to_async(render)(request, 'analytics/dashboard.html', {'user': user, **data})
+
+
+# --- Dashboard shells (charts and lists load from api_dashboard_section) ---
+
+async def _admin_dashboard_data():
+    total_students, total_teachers, total_subjects, total_classes, recent_marks = await asyncio.gather(
+        User.objects.filter(role='student').acount(),
+        User.objects.filter(role='teacher').acount(),
+        Subject.objects.acount(),
+        ClassRoom.objects.acount(),
+        _alist(Marks.objects.select_related('student', 'subject')[:10]),
+    )
+    return {
+        'total_students': total_students,
+        'total_teachers': total_teachers,
+        'total_subjects': total_subjects,
+        'total_classes': total_classes,
+        'recent_marks': recent_marks,
+    }
+
+
+async def _teacher_dashboard_data(user):
+    scope = await sync_to_async(TeacherScope.for_user)(user)
+
+    subjects, class_list, recent_marks, pending_assessments = await asyncio.gather(
+        _alist(scope.subjects()),
+        _alist(scope.classrooms()),
+        _alist(
+            Marks.objects.filter(recorded_by=user)
+            .select_related('student', 'subject', 'exam_type').order_by('-created_at')[:10]
+        ),
+        _alist(
+            Assessment.objects.filter(created_by=user)
+            .annotate(submission_count=Count('submissions')).order_by('-due_date')[:5]
+        ),
+    )
+    return {
+        'subjects': subjects,
+        'classes': class_list,
+        'student_count': len(scope.student_ids),
+        'recent_marks': recent_marks,
+        'pending_assessments': pending_assessments,
+    }
+
+
+async def _student_dashboard_data(user):
+    return {
+        'recent_marks': await _alist(user.marks.select_related('subject', 'exam_type')[:5]),
+    }
+
+
+# --- API --------------------------------------------------------------------
+
+@login_required
+@replica_reads
+async def api_student_trend(request, pk):
+    student = await aget_object_or_404(User, pk=pk, role='student')
+    data = [
+        {'date': str(m.date), 'pct': float(m.get_percentage()), 'subject': m.subject.name}
+        async for m in student.marks.select_related('subject').order_by('date')
+    ]
+    return JsonResponse({'data': data})
+
+
+@login_required
+@replica_reads
+async def api_class_performance(request):
+    classroom_id = request.GET.get('classroom_id')
+    if not classroom_id:
+        return JsonResponse({'data': []})
+    classroom = await aget_object_or_404(ClassRoom, pk=classroom_id)
+    summary = await sync_to_async(reports.summary)('classroom', classroom.pk)
+    return JsonResponse({'data': summary['students']})
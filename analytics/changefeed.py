@@ -0,0 +1,163 @@
+"""
+Change feed for Marks, Attendance and AssessmentSubmission.
+
+Every create, update and delete appends a ``ChangeLog`` entry in the same
+transaction as the change (handlers in ``analytics.signals``). Consumers
+remember the id of the last entry they handled (their watermark, stored as a
+``ChangeConsumer``) and ask for what came after it:
+
+    entries, position = changefeed.read(after=position)
+
+or let ``consume()`` drive a handler and keep the watermark for them
+(``manage.py consume_changes`` streams entries to a JSON-lines file that way).
+
+Ids are handed out when a transaction inserts, not when it commits, so a
+slow transaction can commit an id below entries that are already visible.
+``read()`` therefore stops before a gap in the ids until it knows the gap
+will not fill:
+
+* PostgreSQL: the writer makes sure its transaction has an id, then draws
+  the entry's id, then inserts the entry in a subtransaction. The row's
+  ``xmin`` is therefore a transaction id handed out after every transaction
+  holding a lower entry id got its own. A gap is passed once the reader's
+  snapshot xmin (the oldest transaction still running) has reached the
+  ``xmin`` of the entry after it, i.e. once all of those have ended. However
+  long a transaction runs, nothing behind it is skipped.
+* elsewhere: once the entry after the gap is ``CHANGEFEED_SETTLE_SECONDS``
+  old. Keep the setting above the longest write transaction. SQLite runs one
+  write transaction at a time, so its gaps are rollbacks anyway.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import BooleanField, Min
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import AssessmentSubmission, Attendance, ChangeConsumer, ChangeLog, Marks
+
+TABLES = {Marks: 'marks', Attendance: 'attendance', AssessmentSubmission: 'submissions'}
+
+
+# True when every transaction older than the row's xmin has ended, for the
+# query's own snapshot; age() copes with xid wraparound and frozen rows.
+SETTLED_SQL = (
+    'age({table}.xmin) >= age((pg_snapshot_xmin(pg_current_snapshot())::text::bigint & 4294967295)::text::xid)'
+)
+
+
+def _reserve_id(connection):
+    """Draw the next entry id on PostgreSQL, once the transaction has an id of its own."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, 'id')) FROM (SELECT pg_current_xact_id()) AS xact",
+            [ChangeLog._meta.db_table],
+        )
+        return cursor.fetchone()[0]
+
+
+def record(instance, action, using=None):
+    using = using or router.db_for_write(ChangeLog)
+    fields = {
+        'table': TABLES[type(instance)],
+        'action': action,
+        'object_id': instance.pk,
+        'student_id': instance.student_id,
+        'data': {f.attname: f.value_from_object(instance) for f in instance._meta.concrete_fields},
+    }
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        ChangeLog.objects.using(using).create(**fields)
+        return
+    with transaction.atomic(using=using):
+        pk = _reserve_id(connection)
+        with transaction.atomic(using=using):  # the row's xmin: a new subtransaction id
+            ChangeLog.objects.using(using).create(pk=pk, **fields)
+
+
+def read(after=0, limit=1000, tables=None):
+    """Committed entries after position ``after``, oldest first.
+
+    Returns ``(entries, position)``; pass ``position`` as ``after`` next
+    time. With ``tables`` only those tables' entries are returned, but the
+    position still moves past the others.
+    """
+    using = router.db_for_read(ChangeLog)
+    connection = connections[using]
+    entries = ChangeLog.objects.using(using).filter(pk__gt=after).order_by('pk')
+    if connection.vendor == 'postgresql':
+        table = connection.ops.quote_name(ChangeLog._meta.db_table)
+        entries = entries.annotate(settled=RawSQL(SETTLED_SQL.format(table=table), [], output_field=BooleanField()))
+    entries = list(entries[:limit])
+    settled = timezone.now() - timedelta(seconds=settings.CHANGEFEED_SETTLE_SECONDS)
+    position = after
+    for i, entry in enumerate(entries):
+        if entry.pk != position + 1:
+            final = entry.settled if hasattr(entry, 'settled') else entry.changed_at <= settled
+            if not final:
+                entries = entries[:i]
+                break
+        position = entry.pk
+    if tables:
+        entries = [e for e in entries if e.table in tables]
+    return entries, position
+
+
+def position(name):
+    """Watermark of consumer ``name`` (0 if it never ran)."""
+    return ChangeConsumer.objects.filter(name=name).values_list('position', flat=True).first() or 0
+
+
+def set_position(name, value):
+    ChangeConsumer.objects.update_or_create(name=name, defaults={'position': value})
+
+
+def consume(name, handler, tables=None, batch_size=1000):
+    """Feed the entries consumer ``name`` hasn't seen to ``handler(entries)``.
+
+    Works in batches until caught up. Each batch and the watermark move
+    commit together, so database writes made by ``handler`` are applied
+    exactly once; anything else it does (files, other services) at least
+    once. Returns the number of entries handled.
+    """
+    consumer, _ = ChangeConsumer.objects.get_or_create(name=name)
+    handled = 0
+    while True:
+        entries, new_position = read(consumer.position, batch_size, tables)
+        if new_position == consumer.position:
+            return handled
+        with transaction.atomic():
+            current = ChangeConsumer.objects.select_for_update().get(pk=consumer.pk)
+            if current.position != consumer.position:
+                # Another process with the same name got there first.
+                consumer = current
+                continue
+            if entries:
+                handler(entries)
+            consumer.position = new_position
+            consumer.save(update_fields=['position', 'updated_at'])
+        handled += len(entries)
+
+
+def as_dict(entry):
+    return {
+        'id': entry.pk,
+        'table': entry.table,
+        'action': entry.action,
+        'object_id': entry.object_id,
+        'student_id': entry.student_id,
+        'changed_at': entry.changed_at.isoformat(),
+        'data': entry.data,
+    }
+
+
+def prune(days=None):
+    """Delete entries older than ``days`` that every consumer has read. Returns the count."""
+    if days is None:
+        days = settings.CHANGEFEED_RETENTION_DAYS
+    entries = ChangeLog.objects.filter(changed_at__lt=timezone.now() - timedelta(days=days))
+    lowest = ChangeConsumer.objects.aggregate(lowest=Min('position'))['lowest']
+    if lowest is not None:
+        entries = entries.filter(pk__lte=lowest)
+    return entries.delete()[0]
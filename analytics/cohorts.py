@@ -0,0 +1,84 @@
+"""
+Cross-year cohort comparison backed by frozen yearly aggregates.
+
+When an academic year is closed its per-section, per-subject marks statistics
+are copied out of the marks cube into CohortAggregate rows. Comparisons only
+read those rows, so historical reports never scan live Marks data.
+"""
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .cube import summarise
+from .models import ClassRoom, ClosedAcademicYear, CohortAggregate, MarksCubeCell
+
+
+class YearAlreadyClosed(Exception):
+    pass
+
+
+def close_year(academic_year, closed_by=None, force=False):
+    """Freeze the aggregates for ``academic_year``. Returns the number of rows written."""
+    if not force and ClosedAcademicYear.objects.filter(academic_year=academic_year).exists():
+        raise YearAlreadyClosed(f'{academic_year} is already closed.')
+
+    classrooms = {
+        c.pk: c for c in ClassRoom.objects.filter(academic_year=academic_year).annotate(
+            student_count=Count('students')
+        )
+    }
+    cells = (
+        MarksCubeCell.objects
+        .filter(academic_year=academic_year, classroom__in=list(classrooms))
+        .values('classroom', 'subject')
+        .annotate(n=Sum('count'), sum_pct=Sum('total'), sum_sq=Sum('total_sq'))
+    )
+    aggregates = [
+        CohortAggregate(
+            academic_year=academic_year,
+            class_name=classrooms[row['classroom']].name,
+            section=classrooms[row['classroom']].section,
+            subject_id=row['subject'],
+            student_count=classrooms[row['classroom']].student_count,
+            count=row['n'], total=row['sum_pct'], total_sq=row['sum_sq'],
+        )
+        for row in cells
+    ]
+    with transaction.atomic():
+        CohortAggregate.objects.filter(academic_year=academic_year).delete()
+        CohortAggregate.objects.bulk_create(aggregates)
+        ClosedAcademicYear.objects.update_or_create(
+            academic_year=academic_year, defaults={'closed_by': closed_by}
+        )
+    return len(aggregates)
+
+
+def compare(subject_id, class_name=None, academic_year=None):
+    """Compare cohorts for a subject.
+
+    With ``academic_year`` the sections of that year are compared (optionally
+    only those of ``class_name``); otherwise ``class_name`` is compared across
+    every closed year, with its sections combined.
+    """
+    aggregates = CohortAggregate.objects.filter(subject_id=subject_id)
+    if class_name:
+        aggregates = aggregates.filter(class_name=class_name)
+    if academic_year:
+        group_by = ['class_name', 'section']
+        aggregates = aggregates.filter(academic_year=academic_year)
+    else:
+        group_by = ['academic_year']
+
+    result = []
+    rows = aggregates.values(*group_by).annotate(
+        n=Sum('count'), sum_pct=Sum('total'), sum_sq=Sum('total_sq'), students=Sum('student_count')
+    ).order_by(*group_by)
+    for row in rows:
+        if not row['n']:
+            continue
+        label = row['academic_year'] if 'academic_year' in row else f"{row['class_name']}-{row['section']}"
+        result.append({
+            'label': label,
+            'students': row['students'],
+            **summarise(row['n'], row['sum_pct'], row['sum_sq']),
+        })
+    return result
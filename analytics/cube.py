@@ -0,0 +1,204 @@
+"""
+Marks cube: pre-aggregated marks percentages for slice-and-dice reporting.
+
+Every Marks row lands in exactly one cell keyed by academic year, month,
+subject, classroom and exam type. Cells keep count / sum / sum of squares of
+the percentage, so any roll-up (average, standard deviation) is a cheap
+GROUP BY over the cube instead of a scan of the Marks table.
+
+The cube is kept up to date incrementally by the handlers in
+``analytics.signals``; ``manage.py rebuild_marks_cube`` recomputes it from
+scratch.
+"""
+import math
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F, Sum
+
+from .models import ClassRoom, ExamType, Marks, MarksCubeCell, Subject
+
+DIMENSIONS = ('academic_year', 'month', 'subject', 'classroom', 'exam_type')
+
+MARK_FIELDS = ('student_id', 'subject_id', 'exam_type_id', 'date', 'marks_obtained', 'subject__max_marks')
+
+
+def academic_year_for(day):
+    """Return the academic year label (e.g. "2024-2025") a date falls in."""
+    start_month = getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6)
+    start = day.year if day.month >= start_month else day.year - 1
+    return f"{start}-{start + 1}"
+
+
+def mark_row(mark):
+    """Cube input tuple for a single Marks instance (same layout as MARK_FIELDS)."""
+    return (
+        mark.student_id, mark.subject_id, mark.exam_type_id,
+        mark.date, mark.marks_obtained, mark.subject.max_marks,
+    )
+
+
+def _classrooms_by_student(student_ids):
+    """Map student id -> [(classroom_id, academic_year, {subject ids})]."""
+    if not student_ids:
+        return {}
+    enrolments = list(
+        ClassRoom.students.through.objects
+        .filter(user_id__in=student_ids)
+        .values_list('user_id', 'classroom_id', 'classroom__academic_year')
+    )
+    subjects = defaultdict(set)
+    for classroom_id, subject_id in ClassRoom.subjects.through.objects.filter(
+        classroom_id__in={c for _, c, _ in enrolments}
+    ).values_list('classroom_id', 'subject_id'):
+        subjects[classroom_id].add(subject_id)
+
+    rooms = defaultdict(list)
+    for student_id, classroom_id, year in enrolments:
+        rooms[student_id].append((classroom_id, year, subjects[classroom_id]))
+    return rooms
+
+
+def _resolve(rooms, subject_id, day):
+    """Pick the classroom (and its academic year) a mark belongs to.
+
+    Prefers classrooms teaching the subject, then the one whose academic year
+    covers the mark date, then the most recent year.
+    """
+    year = academic_year_for(day)
+    candidates = [r for r in rooms if subject_id in r[2]] or list(rooms)
+    if not candidates:
+        return None, year
+    for classroom_id, room_year, _ in candidates:
+        if room_year == year:
+            return classroom_id, room_year
+    classroom_id, room_year, _ = max(candidates, key=lambda r: r[1])
+    return classroom_id, room_year
+
+
+def _cells(rows, deltas=None):
+    """Group mark rows into cell deltas: {cell key: [count, total, total_sq]}."""
+    rows = list(rows)
+    rooms = _classrooms_by_student({r[0] for r in rows})
+    if deltas is None:
+        deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    for student_id, subject_id, exam_type_id, day, obtained, max_marks in rows:
+        classroom_id, year = _resolve(rooms.get(student_id, ()), subject_id, day)
+        pct = float(obtained) / max_marks * 100 if max_marks else 0.0
+        cell = deltas[(year, day.replace(day=1), subject_id, classroom_id, exam_type_id)]
+        cell[0] += 1
+        cell[1] += pct
+        cell[2] += pct * pct
+    return deltas
+
+
+def _cell_filter(key):
+    year, month, subject_id, classroom_id, exam_type_id = key
+    return {
+        'academic_year': year, 'month': month, 'subject_id': subject_id,
+        'classroom_id': classroom_id, 'exam_type_id': exam_type_id,
+    }
+
+
+def apply(rows, sign=1):
+    """Add (sign=1) or remove (sign=-1) mark rows from the cube."""
+    deltas = _cells(rows)
+    if not deltas:
+        return
+    with transaction.atomic():
+        for key, (n, total, total_sq) in deltas.items():
+            lookup = _cell_filter(key)
+            cells = MarksCubeCell.objects.filter(**lookup)
+            updated = cells.update(
+                count=F('count') + sign * n,
+                total=F('total') + sign * total,
+                total_sq=F('total_sq') + sign * total_sq,
+            )
+            if sign < 0:
+                cells.filter(count__lte=0).delete()
+            elif not updated:
+                try:
+                    with transaction.atomic():
+                        MarksCubeCell.objects.create(count=n, total=total, total_sq=total_sq, **lookup)
+                except IntegrityError:
+                    # Lost a race with a concurrent writer creating the same cell.
+                    cells.update(
+                        count=F('count') + n, total=F('total') + total, total_sq=F('total_sq') + total_sq,
+                    )
+
+
+def marks_rows(**filters):
+    """Mark rows for the Marks matching ``filters``, ready for ``apply``."""
+    return Marks.objects.filter(**filters).values_list(*MARK_FIELDS).iterator(chunk_size=2000)
+
+
+def rebuild():
+    """Recompute the whole cube from the Marks table. Returns the number of cells."""
+    rows = Marks.objects.values_list(*MARK_FIELDS).iterator(chunk_size=5000)
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    while True:
+        batch = list(islice(rows, 5000))
+        if not batch:
+            break
+        _cells(batch, deltas)
+    with transaction.atomic():
+        MarksCubeCell.objects.all().delete()
+        MarksCubeCell.objects.bulk_create(
+            [
+                MarksCubeCell(count=n, total=total, total_sq=total_sq, **_cell_filter(key))
+                for key, (n, total, total_sq) in deltas.items()
+            ],
+            batch_size=1000,
+        )
+    return len(deltas)
+
+
+def summarise(n, total, total_sq):
+    mean = total / n
+    variance = max(total_sq / n - mean * mean, 0.0)
+    return {'count': n, 'avg': round(mean, 1), 'stddev': round(math.sqrt(variance), 1)}
+
+
+def rollup(dims=(), **filters):
+    """Roll the cube up to ``dims`` (any subset of DIMENSIONS).
+
+    ``filters`` are regular queryset lookups on MarksCubeCell, e.g.
+    ``rollup(['subject'], academic_year='2024-2025')``. Returns one dict per
+    group holding the dimension values plus count, avg and stddev of the
+    percentage.
+    """
+    dims = list(dims)
+    unknown = set(dims) - set(DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown cube dimension(s): {', '.join(sorted(unknown))}")
+
+    cells = MarksCubeCell.objects.filter(**filters)
+    sums = {'n': Sum('count'), 'total': Sum('total'), 'total_sq': Sum('total_sq')}
+    if not dims:
+        agg = cells.aggregate(**sums)
+        return [summarise(agg['n'], agg['total'], agg['total_sq'])] if agg['n'] else []
+
+    result = []
+    for row in cells.values(*dims).annotate(**sums).order_by(*dims):
+        n, total, total_sq = row.pop('n'), row.pop('total'), row.pop('total_sq')
+        if n:
+            row.update(summarise(n, total, total_sq))
+            result.append(row)
+    return result
+
+
+def dimension_labels(dim, values):
+    """Human-readable labels for the given values of a dimension."""
+    values = [v for v in values if v is not None]
+    if dim == 'subject':
+        return {pk: s.name for pk, s in Subject.objects.in_bulk(values).items()}
+    if dim == 'classroom':
+        return {pk: str(c) for pk, c in ClassRoom.objects.in_bulk(values).items()}
+    if dim == 'exam_type':
+        return {pk: e.name for pk, e in ExamType.objects.in_bulk(values).items()}
+    if dim == 'month':
+        return {v: v.strftime('%b %Y') if isinstance(v, date) else str(v) for v in values}
+    return {v: v for v in values}
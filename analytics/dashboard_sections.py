@@ -0,0 +1,171 @@
+"""
+Dashboard sections served as independent JSON payloads.
+
+The dashboard page only renders a cheap shell (counts and recent rows); every
+chart and list is fetched by the browser in parallel from
+``api_dashboard_section`` so a slow section no longer delays the first paint.
+Payloads are cached for ``DASHBOARD_SECTION_TIMEOUT`` seconds, per user or,
+for school-wide admin sections, once for all admins.
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q
+from django.urls import reverse
+
+from accounts.models import User
+from .models import AssessmentSubmission, Attendance, Marks, Subject
+from .scope import TeacherScope
+
+GRADE_ORDER = ['A+', 'A', 'B+', 'B', 'C', 'D', 'F']
+
+
+def user_role(user):
+    if user.is_admin_user():
+        return 'admin'
+    return 'teacher' if user.is_teacher() else 'student'
+
+
+def _percentage(m):
+    return float((m.marks_obtained / m.subject.max_marks) * 100)
+
+
+# --- Admin ------------------------------------------------------------------
+
+def grade_distribution(user):
+    grade_dist = dict.fromkeys(GRADE_ORDER, 0)
+    for m in Marks.objects.select_related('subject').iterator(chunk_size=2000):
+        grade_dist[m.get_grade()] += 1
+    return {'grades': grade_dist}
+
+
+def top_students(user):
+    students = list(User.objects.filter(role='student')[:20])
+    percentages = defaultdict(list)
+    for m in Marks.objects.filter(student__in=students).select_related('subject'):
+        percentages[m.student_id].append(_percentage(m))
+    ranked = sorted(
+        (
+            {
+                'name': s.get_full_name() or s.username,
+                'url': reverse('student_detail', args=[s.pk]),
+                'avg': round(sum(percentages[s.pk]) / len(percentages[s.pk]), 1),
+            }
+            for s in students if percentages[s.pk]
+        ),
+        key=lambda x: x['avg'], reverse=True,
+    )
+    return {'students': ranked[:5]}
+
+
+# --- Shared by role ---------------------------------------------------------
+
+def subject_averages(user):
+    role = user_role(user)
+    if role == 'admin':
+        return {'subjects': [
+            {'name': s.name, 'avg': round(s.avg, 1)}
+            for s in Subject.objects.annotate(avg=Avg('marks__marks_obtained')) if s.avg
+        ]}
+    if role == 'teacher':
+        return {'subjects': [
+            {'name': s.name, 'avg': round(s.avg, 1) if s.avg else 0, 'students': s.student_total}
+            for s in TeacherScope.for_user(user).subjects().annotate(
+                avg=Avg('marks__marks_obtained'), student_total=Count('marks__student', distinct=True)
+            )
+        ]}
+
+    subject_perf = defaultdict(list)
+    for m in user.marks.select_related('subject'):
+        subject_perf[m.subject.name].append(_percentage(m))
+    all_percs = [p for percs in subject_perf.values() for p in percs]
+    return {
+        'overall_avg': round(sum(all_percs) / len(all_percs), 1) if all_percs else 0,
+        'subjects': [
+            {'subject': s, 'avg': round(sum(v) / len(v), 1)}
+            for s, v in subject_perf.items()
+        ],
+    }
+
+
+def attendance(user):
+    present = Count('id', filter=Q(status='present'))
+    if user_role(user) == 'admin':
+        counts = Attendance.objects.filter(
+            date__gte=date.today() - timedelta(days=7)
+        ).aggregate(total=Count('id'), present=present)
+        return {'att_rate': round((counts['present'] / counts['total']) * 100, 1) if counts['total'] else 0}
+
+    records = user.attendance_records.all()
+    counts = records.aggregate(total=Count('id'), present=present)
+    by_subject = (
+        records.values('subject__code', 'subject__name')
+        .annotate(total=Count('id'), present=present)
+        .order_by('subject__code')
+    )
+    return {
+        'att_pct': round((counts['present'] / counts['total']) * 100, 1) if counts['total'] else 0,
+        'total_att': counts['total'],
+        'present_att': counts['present'],
+        'by_subject': [
+            {'subject': row['subject__name'], 'pct': round((row['present'] / row['total']) * 100, 1)}
+            for row in by_subject
+        ],
+    }
+
+
+# --- Student ----------------------------------------------------------------
+
+def trend(user):
+    return {'points': [
+        {'date': str(m.date), 'pct': float(m.get_percentage()), 'subject': m.subject.name}
+        for m in user.marks.select_related('subject').order_by('date')[:12]
+    ]}
+
+
+def suggestions(user):
+    from .views import _generate_suggestions
+
+    att_pct = get_section('attendance', user)['att_pct']
+    marks = list(user.marks.select_related('subject'))
+    return {'suggestions': _generate_suggestions(user, marks, att_pct)}
+
+
+def pending_submissions(user):
+    return {'count': AssessmentSubmission.objects.filter(
+        student=user, status__in=['pending', 'submitted']
+    ).count()}
+
+
+# slug -> (builder, roles allowed, shared across all users of the role)
+SECTIONS = {
+    'grade-distribution': (grade_distribution, {'admin'}, True),
+    'top-students': (top_students, {'admin'}, True),
+    'subject-averages': (subject_averages, {'admin', 'teacher', 'student'}, False),
+    'attendance': (attendance, {'admin', 'student'}, False),
+    'trend': (trend, {'student'}, False),
+    'suggestions': (suggestions, {'student'}, False),
+    'pending-submissions': (pending_submissions, {'student'}, False),
+}
+
+
+def is_available(section, user):
+    return section in SECTIONS and user_role(user) in SECTIONS[section][1]
+
+
+def cache_key(section, user):
+    shared = SECTIONS[section][2] or user_role(user) == 'admin'
+    return f"dashboard:{section}:{'all' if shared else user.pk}"
+
+
+def get_section(section, user):
+    """Return the (cached) payload of ``section`` for ``user``."""
+    builder = SECTIONS[section][0]
+    key = cache_key(section, user)
+    data = cache.get(key)
+    if data is None:
+        data = builder(user)
+        cache.set(key, data, getattr(settings, 'DASHBOARD_SECTION_TIMEOUT', 60))
+    return data
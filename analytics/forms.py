@@ -1,6 +1,8 @@
 from django import forms
 from .models import Marks, Attendance, Assessment, AssessmentSubmission, Subject
 from accounts.models import User
+from .scope import TeacherScope
+from .widgets import StudentAutocomplete, student_label
 
 
 class MarksForm(forms.ModelForm):
@@ -8,7 +10,7 @@ class MarksForm(forms.ModelForm):
         model = Marks
         fields = ['student', 'subject', 'exam_type', 'marks_obtained', 'date', 'remarks']
         widgets = {
-            'student': forms.Select(attrs={'class': 'form-select'}),
+            'student': StudentAutocomplete(),
             'subject': forms.Select(attrs={'class': 'form-select'}),
             'exam_type': forms.Select(attrs={'class': 'form-select'}),
             'marks_obtained': forms.NumberInput(attrs={'class': 'form-control', 'step': '0.01'}),
@@ -20,8 +22,11 @@ class MarksForm(forms.ModelForm):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         self.fields['student'].queryset = User.objects.filter(role='student')
+        self.fields['student'].label_from_instance = student_label
         if user and user.role == 'teacher':
-            self.fields['subject'].queryset = user.teaching_subjects.all()
+            scope = TeacherScope.for_user(user)
+            self.fields['student'].queryset = scope.students()
+            self.fields['subject'].queryset = scope.subjects()
 
     def clean(self):
         cleaned_data = super().clean()
@@ -39,7 +44,7 @@ class AttendanceForm(forms.ModelForm):
         model = Attendance
         fields = ['student', 'subject', 'date', 'status', 'note']
         widgets = {
-            'student': forms.Select(attrs={'class': 'form-select'}),
+            'student': StudentAutocomplete(),
             'subject': forms.Select(attrs={'class': 'form-select'}),
             'date': forms.DateInput(attrs={'class': 'form-control', 'type': 'date'}),
             'status': forms.Select(attrs={'class': 'form-select'}),
@@ -50,8 +55,11 @@ class AttendanceForm(forms.ModelForm):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         self.fields['student'].queryset = User.objects.filter(role='student')
+        self.fields['student'].label_from_instance = student_label
         if user and user.role == 'teacher':
-            self.fields['subject'].queryset = user.teaching_subjects.all()
+            scope = TeacherScope.for_user(user)
+            self.fields['student'].queryset = scope.students()
+            self.fields['subject'].queryset = scope.subjects()
 
 
 class AssessmentForm(forms.ModelForm):
@@ -72,7 +80,9 @@ class AssessmentForm(forms.ModelForm):
         user = kwargs.pop('user', None)
         super().__init__(*args, **kwargs)
         if user and user.role == 'teacher':
-            self.fields['subject'].queryset = user.teaching_subjects.all()
+            scope = TeacherScope.for_user(user)
+            self.fields['subject'].queryset = scope.subjects()
+            self.fields['classroom'].queryset = scope.classrooms()
 
 
 class SubmissionGradeForm(forms.ModelForm):
@@ -0,0 +1,33 @@
+"""
+Move the Attendance partitions of a closed academic year out of the live table.
+Run: python manage.py archive_attendance 2023-2024 [--schema archive] [--tablespace slow_disk]
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Detaches the monthly Attendance partitions of a closed academic year into an archive schema'
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='e.g. 2023-2024')
+        parser.add_argument('--schema', default='archive', help='Schema the partitions are moved to')
+        parser.add_argument('--tablespace', help='Also move them to this tablespace')
+        parser.add_argument('--force', action='store_true', help='Archive even if the year is not closed')
+
+    def handle(self, *args, **options):
+        from analytics import partitions
+        from analytics.models import ClosedAcademicYear
+
+        year = options['academic_year']
+        if not options['force'] and not ClosedAcademicYear.objects.filter(academic_year=year).exists():
+            raise CommandError(f'{year} is not closed; run close_academic_year first or use --force.')
+        try:
+            archived = partitions.archive_year(year, schema=options['schema'], tablespace=options['tablespace'])
+        except partitions.PartitioningUnavailable as exc:
+            raise CommandError(str(exc))
+        if not archived:
+            self.stdout.write(f'No attendance partitions for {year}.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {len(archived)} partitions of {year} to schema {options['schema']}"
+        ))
@@ -0,0 +1,139 @@
+"""
+Precompute student, subject and classroom report summaries.
+Run: python manage.py build_reports [--workers 4] [--since last|2025-03-01]
+"""
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+CONSUMER = 'build_reports'
+
+
+def _init_worker():
+    # Spawned workers start from scratch and open their own DB connections.
+    import django
+    django.setup()
+
+
+def _build_shard(name, jobs):
+    from analytics import reports
+
+    started = time.perf_counter()
+    reports.build(jobs)
+    return name, len(jobs), time.perf_counter() - started
+
+
+class Command(BaseCommand):
+    help = 'Builds the report store the student, subject and classroom reports are served from, sharded by classroom'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Worker processes')
+        parser.add_argument(
+            '--since',
+            help='Only rebuild reports touched by Marks/Attendance changes since this date or time, '
+                 'or since the previous run ("last")',
+        )
+
+    def handle(self, *args, **options):
+        from analytics import changefeed, versioning
+        from analytics.models import ChangeLog, ClassRoom, Subject
+        from accounts.models import User
+        from django.db import connections
+        from django.db.models import Max
+
+        if options['since']:
+            student_ids, subject_ids, position = self._changed(options['since'])
+            self.stdout.write(f'{len(student_ids)} students and {len(subject_ids)} subjects changed')
+        else:
+            student_ids = set(User.objects.filter(role='student').values_list('pk', flat=True))
+            subject_ids = set(Subject.objects.values_list('pk', flat=True))
+            position = ChangeLog.objects.aggregate(last=Max('pk'))['last'] or 0
+
+        # One shard per classroom: its summary plus its students not taken by
+        # an earlier shard. Students without a classroom and the subject
+        # reports get shards of their own.
+        enrolments = ClassRoom.students.through.objects.order_by('classroom_id')
+        if options['since']:
+            enrolments = enrolments.filter(user_id__in=student_ids)
+        members = {}
+        for classroom_id, user_id in enrolments.values_list('classroom_id', 'user_id'):
+            members.setdefault(classroom_id, []).append(user_id)
+        shards = []
+        assigned = set()
+        for classroom in ClassRoom.objects.filter(pk__in=members):
+            students = [pk for pk in members[classroom.pk] if pk in student_ids and pk not in assigned]
+            assigned.update(students)
+            shards.append((str(classroom), [('classroom', classroom.pk)] + [('student', pk) for pk in students]))
+        unassigned = sorted(student_ids - assigned)
+        if unassigned:
+            shards.append(('(no classroom)', [('student', pk) for pk in unassigned]))
+        for subject in Subject.objects.filter(pk__in=subject_ids):
+            shards.append((f'subject {subject.code}', [('subject', subject.pk)]))
+        if not shards:
+            self.stdout.write('Nothing to build.')
+            changefeed.set_position(CONSUMER, position)
+            return
+
+        # Versions are read before anything is computed; see reports.build().
+        versions = versioning.get_versions([pair for _, pairs in shards for pair in pairs])
+        work = [(name, [(kind, pk, versions[(kind, pk)]) for kind, pk in pairs]) for name, pairs in shards]
+
+        connections.close_all()
+        started = time.perf_counter()
+        total = 0
+        with ProcessPoolExecutor(
+            max_workers=options['workers'],
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        ) as pool:
+            futures = [pool.submit(_build_shard, name, jobs) for name, jobs in work]
+            for future in as_completed(futures):
+                name, count, seconds = future.result()
+                total += count
+                self.stdout.write(f'{name:<40}{count:>6} reports{seconds:>9.2f}s')
+
+        changefeed.set_position(CONSUMER, position)
+        self.stdout.write(self.style.SUCCESS(
+            f'Built {total} reports in {len(work)} shards with {options["workers"]} workers '
+            f'in {time.perf_counter() - started:.2f}s'
+        ))
+
+    def _changed(self, since):
+        """Students and subjects touched by Marks/Attendance changes, and the change-log position reached."""
+        from analytics import changefeed
+        from analytics.models import ChangeLog
+        from django.db.models import Max
+        from django.utils import timezone
+        from django.utils.dateparse import parse_date, parse_datetime
+
+        student_ids, subject_ids = set(), set()
+        if since == 'last':
+            position = changefeed.position(CONSUMER)
+            while True:
+                entries, new_position = changefeed.read(position, 5000, tables=['marks', 'attendance'])
+                if new_position == position:
+                    break
+                position = new_position
+                for entry in entries:
+                    student_ids.add(entry.student_id)
+                    subject_ids.add(entry.data['subject_id'])
+            return student_ids, subject_ids, position
+
+        moment = parse_datetime(since)
+        if moment is None:
+            day = parse_date(since)
+            if day is None:
+                raise CommandError(f'--since expects "last", a date or a date and time, not {since!r}')
+            moment = datetime(day.year, day.month, day.day)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        entries = ChangeLog.objects.filter(changed_at__gte=moment, table__in=['marks', 'attendance'])
+        for student_id, subject_id in entries.values_list('student_id', 'data__subject_id'):
+            student_ids.add(student_id)
+            subject_ids.add(subject_id)
+        position = ChangeLog.objects.aggregate(last=Max('pk'))['last'] or 0
+        return student_ids, subject_ids, position
@@ -0,0 +1,24 @@
+"""
+Freeze cohort aggregates for an academic year.
+Run: python manage.py close_academic_year 2024-2025
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Closes an academic year and stores its frozen per-section marks aggregates'
+
+    def add_arguments(self, parser):
+        parser.add_argument('academic_year', help='e.g. 2024-2025')
+        parser.add_argument('--force', action='store_true', help='Recompute a year that is already closed')
+
+    def handle(self, *args, **options):
+        from analytics.cohorts import YearAlreadyClosed, close_year
+
+        try:
+            rows = close_year(options['academic_year'], force=options['force'])
+        except YearAlreadyClosed as exc:
+            raise CommandError(f'{exc} Use --force to recompute.')
+        self.stdout.write(self.style.SUCCESS(
+            f"Closed {options['academic_year']}: {rows} cohort aggregates stored"
+        ))
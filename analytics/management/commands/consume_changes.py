@@ -0,0 +1,54 @@
+"""
+Stream new Marks, Attendance and submission changes as JSON lines.
+Run: python manage.py consume_changes <consumer> [--output changes.jsonl] [--table marks] [--follow]
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = "Writes the change-log entries a consumer hasn't seen yet and advances its watermark"
+
+    def add_arguments(self, parser):
+        parser.add_argument('consumer', help='Name the watermark is kept under, e.g. warehouse')
+        parser.add_argument('--output', default='-', help='JSON-lines file to append to (default: stdout)')
+        parser.add_argument('--table', action='append', dest='tables', choices=['marks', 'attendance', 'submissions'])
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--position', type=int, help='Move the watermark to this entry id first (0 replays everything kept)')
+        parser.add_argument('--follow', action='store_true', help='Keep polling for new entries')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between polls with --follow')
+        parser.add_argument('--prune', action='store_true', help='Afterwards delete entries every consumer has read (older than CHANGEFEED_RETENTION_DAYS)')
+
+    def handle(self, *args, **options):
+        from analytics import changefeed
+
+        name = options['consumer']
+        if options['position'] is not None:
+            changefeed.set_position(name, options['position'])
+        out = self.stdout if options['output'] == '-' else open(options['output'], 'a', encoding='utf-8')
+
+        def write(entries):
+            for entry in entries:
+                out.write(json.dumps(changefeed.as_dict(entry)) + '\n')
+            out.flush()
+
+        total = 0
+        try:
+            while True:
+                total += changefeed.consume(name, write, options['tables'], options['batch_size'])
+                if not options['follow']:
+                    break
+                time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if out is not self.stdout:
+                out.close()
+
+        if options['prune']:
+            self.stderr.write(f'Pruned {changefeed.prune()} change-log entries')
+        self.stderr.write(self.style.SUCCESS(
+            f'{name}: {total} changes written, watermark at {changefeed.position(name)}'
+        ))
@@ -0,0 +1,26 @@
+"""
+Create the monthly Attendance partitions for the coming months (PostgreSQL).
+Run: python manage.py create_attendance_partitions --months 3
+"""
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+
+class Command(BaseCommand):
+    help = 'Creates Attendance partitions from this month up to --months ahead; schedule it daily'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=None, help='Months ahead (default ATTENDANCE_PARTITIONS_AHEAD)')
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS, help='Database to create the partitions in')
+
+    def handle(self, *args, **options):
+        from analytics import partitions
+
+        try:
+            created = partitions.ensure_partitions(options['months'], using=options['database'])
+        except partitions.PartitioningUnavailable as exc:
+            raise CommandError(str(exc))
+        if created:
+            self.stdout.write(self.style.SUCCESS(f"Created {', '.join(created)}"))
+        else:
+            self.stdout.write('All partitions already exist.')
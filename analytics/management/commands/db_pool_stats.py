@@ -0,0 +1,39 @@
+"""
+Report database connection pool activity across all workers.
+Run: python manage.py db_pool_stats
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Shows connection pool checkouts, waits and timeouts per database alias'
+
+    def handle(self, *args, **kwargs):
+        from django.db import connections
+
+        from analytics import metrics
+
+        stats = {}
+        for name in metrics.POOL_COUNTERS.values():
+            for _, labels, value in metrics.counters(name):
+                stats.setdefault(labels['alias'], {})[name] = value
+
+        for conn in connections.all():
+            if not conn.settings_dict.get('OPTIONS', {}).get('pool'):
+                self.stdout.write(f"{conn.alias}: no pool (CONN_MAX_AGE={conn.settings_dict['CONN_MAX_AGE']})")
+
+        if not stats:
+            self.stdout.write('No pool activity recorded yet.')
+            return
+        for alias, values in sorted(stats.items()):
+            checkouts = values.get('db_pool_checkouts', 0)
+            waits = values.get('db_pool_waits', 0)
+            avg_wait = values.get('db_pool_wait_ms', 0) / waits if waits else 0
+            self.stdout.write(self.style.SUCCESS(alias))
+            self.stdout.write(f"  checkouts            {checkouts:>10}")
+            self.stdout.write(f"  waits                {waits:>10}  (avg {avg_wait:.1f} ms)")
+            self.stdout.write(f"  timeouts             {values.get('db_pool_timeouts', 0):>10}")
+            self.stdout.write(f"  connections opened   {values.get('db_pool_connections_opened', 0):>10}")
+            self.stdout.write(f"  connection errors    {values.get('db_pool_connection_errors', 0):>10}")
+            self.stdout.write(f"  connections lost     {values.get('db_pool_connections_lost', 0):>10}")
+            self.stdout.write(f"  bad returns          {values.get('db_pool_bad_returns', 0):>10}")
@@ -0,0 +1,32 @@
+"""
+Export Marks, Attendance and AssessmentSubmission as columnar snapshot files.
+Run: python manage.py export_snapshot [--year 2024-2025] [--table marks] [--format parquet|arrow]
+"""
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Streams each table and academic year into a dictionary-encoded Parquet or Arrow IPC file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--year', action='append', dest='years', help='Academic year, e.g. 2024-2025 (repeatable; default: every year with data)')
+        parser.add_argument('--table', action='append', dest='tables', choices=['marks', 'attendance', 'submissions'], help='Repeatable; default: all')
+        parser.add_argument('--format', choices=['parquet', 'arrow'], default='parquet')
+        parser.add_argument('--output', default=settings.SNAPSHOT_DIR, help='Directory the snapshots are written to')
+        parser.add_argument('--chunk-size', type=int, default=65536, help='Rows fetched and written per batch')
+
+    def handle(self, *args, **options):
+        from analytics import snapshots
+        from student_analytics.db_router import routing
+
+        files = 0
+        with routing(replica=True):
+            for table in options['tables'] or snapshots.TABLES:
+                for year in options['years'] or snapshots.academic_years(table):
+                    path, rows = snapshots.export(
+                        table, year, options['output'], fmt=options['format'], chunk_size=options['chunk_size'],
+                    )
+                    self.stdout.write(f'{path}: {rows} rows')
+                    files += 1
+        self.stdout.write(self.style.SUCCESS(f"Exported {files} snapshot files to {options['output']}"))
@@ -0,0 +1,26 @@
+"""
+Report hit rates of the versioned template fragment cache.
+Run: python manage.py fragment_cache_stats
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Shows hits, misses and hit rate per cached template fragment'
+
+    def handle(self, *args, **kwargs):
+        from analytics import metrics
+
+        stats = {}
+        for kind in ('hits', 'misses'):
+            for _, labels, value in metrics.counters(f'fragment_cache_{kind}'):
+                stats.setdefault(labels['fragment'], {'hits': 0, 'misses': 0})[kind] = value
+
+        if not stats:
+            self.stdout.write('No fragment cache activity recorded yet.')
+            return
+        self.stdout.write(f"{'fragment':<32}{'hits':>10}{'misses':>10}{'hit rate':>10}")
+        for name, s in sorted(stats.items()):
+            total = s['hits'] + s['misses']
+            rate = s['hits'] / total * 100 if total else 0
+            self.stdout.write(f"{name:<32}{s['hits']:>10}{s['misses']:>10}{rate:>9.1f}%")
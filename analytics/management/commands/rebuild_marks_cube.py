@@ -0,0 +1,19 @@
+"""
+Recompute the pre-aggregated marks cube from the Marks table.
+Run: python manage.py rebuild_marks_cube
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the marks cube (subject x classroom x exam type x month x year) from scratch'
+
+    def handle(self, *args, **kwargs):
+        from analytics import cube
+
+        started = time.perf_counter()
+        cells = cube.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt marks cube: {cells} cells in {elapsed:.2f}s'))
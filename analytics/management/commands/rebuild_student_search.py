@@ -0,0 +1,19 @@
+"""
+Reindex every student for the student search.
+Run: python manage.py rebuild_student_search
+"""
+import time
+
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the student search documents (names, roll number, parent name and phone)'
+
+    def handle(self, *args, **kwargs):
+        from analytics import search
+
+        started = time.perf_counter()
+        documents = search.rebuild()
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Indexed {documents} students in {elapsed:.2f}s'))
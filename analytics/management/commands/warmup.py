@@ -0,0 +1,21 @@
+"""
+Warm up this process: imports, URL resolvers, templates, caches, DB connections.
+Run: python manage.py warmup [--skip connections]
+"""
+from django.core.management.base import BaseCommand
+
+
+class Command(BaseCommand):
+    help = 'Runs the worker warm-up (student_analytics.warmup) and prints how long each step took'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--skip', action='append', default=[], choices=['apps', 'urls', 'templates', 'caches', 'connections'])
+
+    def handle(self, *args, **options):
+        from student_analytics.warmup import STEPS, warm_up
+
+        total = 0
+        for step, seconds, detail in warm_up([s for s in STEPS if s not in options['skip']]):
+            total += seconds
+            self.stdout.write(f'{step:<14}{seconds * 1000:>9.1f} ms  {detail}')
+        self.stdout.write(self.style.SUCCESS(f'Warmed up in {total * 1000:.0f} ms'))
@@ -0,0 +1,357 @@
+"""
+Lightweight application counters and histograms, and their Prometheus
+exposition.
+
+Every process counts in its own memory and ``flush()`` writes its totals to
+a file of its own under ``METRICS_DIR`` (``<host>-<pid>.json``, replaced
+atomically), at most every ``METRICS_FLUSH_INTERVAL`` seconds and when a
+gunicorn worker exits. Readers add up all the files, so any worker can
+answer a scrape for all of them and nothing is shared that could be evicted
+or overwritten by another process. Files of exited workers stay, keeping the
+counters monotonic until the next server start clears this host's files.
+``manage.py fragment_cache_stats`` and ``manage.py db_pool_stats`` report
+the same numbers.
+
+``exposition()`` renders everything for ``/metrics``, plus gauges read when
+scraped: change-feed consumer backlog, the largest tables and, with Redis,
+the cache server's hit and miss counts.
+"""
+import json
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import Max
+
+# Histogram bucket upper bounds.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+# name -> (help, buckets, scale); sums are kept as integers of value * scale.
+HISTOGRAMS = {
+    'django_view_duration_seconds': ('Time to produce the response, per view.', DURATION_BUCKETS, 1_000_000),
+    'django_view_queries': ('SQL queries run per request, per view.', QUERY_BUCKETS, 1),
+}
+
+# Seconds the table sizes read by exposition() are reused.
+TABLE_SIZES_TIMEOUT = 300
+
+
+def _key(name, labels):
+    label_str = ','.join(f'{k}={v}' for k, v in sorted(labels.items()))
+    return f'{name}:{label_str}'
+
+
+def _path(pid=None):
+    return Path(settings.METRICS_DIR) / f'{socket.gethostname()}-{pid or os.getpid()}.json'
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except FileNotFoundError:
+        return []  # cleared between listing and reading
+
+
+_counts = {}  # key -> [name, labels, value], everything this process counted
+_counts_pid = None
+_dirty = False
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+
+
+def _own_counts():
+    """This process's counts; called with ``_lock`` held."""
+    global _counts, _counts_pid
+    if _counts_pid != os.getpid():
+        # First use in this process, or a fork that inherited the parent's
+        # counts (the parent reports those itself). An earlier process that
+        # had the same pid left its totals behind: continue from them.
+        _counts_pid = os.getpid()
+        _counts = {_key(name, labels): [name, labels, value] for name, labels, value in _read(_path())}
+    return _counts
+
+
+def incr(name, amount=1, **labels):
+    """Add ``amount`` to counter ``name``; other processes see it after the next ``flush()``."""
+    global _dirty
+    key = _key(name, labels)
+    with _lock:
+        counts = _own_counts()
+        entry = counts.get(key)
+        if entry is None:
+            counts[key] = [name, labels, amount]
+        else:
+            entry[2] += amount
+        _dirty = True
+
+
+def observe(name, value, **labels):
+    """Count ``value`` into histogram ``name``."""
+    _, buckets, scale = HISTOGRAMS[name]
+    le = next((str(bound) for bound in buckets if value <= bound), '+Inf')
+    incr(f'{name}_bucket', le=le, **labels)
+    incr(f'{name}_sum', round(value * scale), **labels)
+    incr(f'{name}_count', **labels)
+
+
+def flush():
+    """Write this process's totals to its file under ``METRICS_DIR``."""
+    global _dirty
+    with _flush_lock:  # an older snapshot must not replace a newer one
+        with _lock:
+            if not _dirty:
+                return
+            data = json.dumps(list(_own_counts().values()))
+            _dirty = False
+        path = _path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix('.tmp')
+        tmp.write_text(data)
+        os.replace(tmp, path)  # readers never see a partial file
+
+
+def clear():
+    """Remove this host's files; run once before the server starts its workers."""
+    for path in Path(settings.METRICS_DIR).glob(f'{socket.gethostname()}-*.json'):
+        path.unlink(missing_ok=True)
+
+
+def _merged():
+    """``{key: [name, labels, value]}`` summed over every process's file."""
+    flush()
+    merged = {}
+    for path in Path(settings.METRICS_DIR).glob('*.json'):
+        for name, labels, value in _read(path):
+            entry = merged.setdefault(_key(name, labels), [name, labels, 0])
+            entry[2] += value
+    return merged
+
+
+def counters(name=None):
+    """Return ``[(name, labels, value), ...]`` for all (or one) recorded counters."""
+    return [
+        (n, labels, value) for _, (n, labels, value) in sorted(_merged().items())
+        if not name or n == name
+    ]
+
+
+# psycopg_pool counter -> metric name
+POOL_COUNTERS = {
+    'requests_num': 'db_pool_checkouts',
+    'requests_queued': 'db_pool_waits',
+    'requests_wait_ms': 'db_pool_wait_ms',
+    'requests_errors': 'db_pool_timeouts',
+    'connections_num': 'db_pool_connections_opened',
+    'connections_errors': 'db_pool_connection_errors',
+    'connections_lost': 'db_pool_connections_lost',
+    'returns_bad': 'db_pool_bad_returns',
+}
+
+
+def record_pool_stats():
+    """Move this process's connection pool counters into the metrics counters."""
+    for conn in connections.all(initialized_only=True):
+        pool = getattr(conn, 'pool', None)
+        if pool is None:
+            continue
+        stats = pool.pop_stats()
+        for stat, name in POOL_COUNTERS.items():
+            if stats.get(stat):
+                incr(name, stats[stat], alias=conn.alias)
+
+
+class QueryCounter:
+    """Counts the SQL statements run on any connection inside the block."""
+
+    def __init__(self):
+        self.count = 0
+
+    def wrapper(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrapped = [connections[alias] for alias in connections]
+        for connection in self._wrapped:
+            connection.execute_wrappers.append(self.wrapper)
+        return self
+
+    def __exit__(self, *exc):
+        for connection in self._wrapped:
+            connection.execute_wrappers.remove(self.wrapper)
+
+
+class MetricsMiddleware:
+    """Records latency, query count and status code of every request per view."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            response = self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, queries.count)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        with QueryCounter() as queries:
+            response = await self.get_response(request)
+        self._record(request, response, time.perf_counter() - started, queries.count)
+        return response
+
+    def _record(self, request, response, seconds, queries):
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        observe('django_view_duration_seconds', seconds, view=view)
+        observe('django_view_queries', queries, view=view)
+        incr('django_http_responses', view=view, status=str(response.status_code))
+
+
+# --- Exposition ------------------------------------------------------------
+
+COUNTER_HELP = {
+    'django_http_responses': 'Responses sent, per view and status code.',
+    'fragment_cache_hits': 'Versioned template fragments served from the cache.',
+    'fragment_cache_misses': 'Versioned template fragments rendered and cached.',
+    'db_pool_checkouts': 'Connections handed out by the pool.',
+    'db_pool_waits': 'Checkouts that had to wait for a free connection.',
+    'db_pool_wait_ms': 'Milliseconds spent waiting for a pool connection.',
+    'db_pool_timeouts': 'Checkouts that timed out.',
+    'db_pool_connections_opened': 'Connections the pool opened.',
+    'db_pool_connection_errors': 'Failed attempts to open a pool connection.',
+    'db_pool_connections_lost': 'Pool connections found broken.',
+    'db_pool_bad_returns': 'Connections returned to the pool in a bad state.',
+}
+
+
+def _format(value):
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+
+def _sample(name, labels, value):
+    if labels:
+        label_str = ','.join(
+            '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+            for k, v in labels
+        )
+        return f'{name}{{{label_str}}} {_format(value)}'
+    return f'{name} {_format(value)}'
+
+
+def _family(lines, name, kind, text):
+    lines.append(f'# HELP {name} {text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def table_sizes(limit=10):
+    """``[(table, bytes or None, rows), ...]`` for the ``limit`` largest tables.
+
+    Partitioned tables count their partitions; row counts are the planner's
+    estimates on PostgreSQL and exact elsewhere (no sizes there).
+    """
+    connection = connections['default']
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute("""
+                SELECT c.relname, SUM(pg_total_relation_size(p.oid))::bigint, SUM(GREATEST(p.reltuples, 0))::bigint
+                FROM pg_class c
+                JOIN pg_namespace n ON n.oid = c.relnamespace
+                LEFT JOIN LATERAL pg_partition_tree(c.oid) t ON true
+                JOIN pg_class p ON p.oid = COALESCE(t.relid, c.oid)
+                WHERE n.nspname = current_schema() AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+                GROUP BY c.relname
+                ORDER BY 2 DESC
+                LIMIT %s
+            """, [limit])
+            return cursor.fetchall()
+        sizes = []
+        for table in connection.introspection.table_names(cursor):
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            sizes.append((table, None, cursor.fetchone()[0]))
+    return sorted(sizes, key=lambda size: size[2], reverse=True)[:limit]
+
+
+def _redis_stats():
+    client = getattr(getattr(cache, '_cache', None), 'get_client', None)
+    if client is None:
+        return None
+    stats = client().info('stats')
+    return stats['keyspace_hits'], stats['keyspace_misses']
+
+
+def exposition():
+    """Every metric in the Prometheus text exposition format (version 0.0.4)."""
+    from .models import ChangeConsumer, ChangeLog
+
+    record_pool_stats()
+    samples = defaultdict(list)  # name -> [(labels, value), ...]
+    for name, labels, value in _merged().values():
+        samples[name].append((labels, value))
+
+    lines = []
+    for family, (text, buckets, scale) in HISTOGRAMS.items():
+        series = defaultdict(lambda: {'buckets': defaultdict(int), 'sum': 0, 'count': 0})
+        for labels, value in samples[f'{family}_bucket']:
+            labels = dict(labels)
+            le = labels.pop('le')
+            series[tuple(sorted(labels.items()))]['buckets'][le] += value
+        for part in ('sum', 'count'):
+            for labels, value in samples[f'{family}_{part}']:
+                series[tuple(sorted(labels.items()))][part] += value
+        _family(lines, family, 'histogram', text)
+        for labels, s in sorted(series.items()):
+            cumulative = 0
+            for bound in [str(b) for b in buckets] + ['+Inf']:
+                cumulative += s['buckets'][bound]
+                lines.append(_sample(f'{family}_bucket', labels + (('le', bound),), cumulative))
+            lines.append(_sample(f'{family}_sum', labels, s['sum'] / scale))
+            lines.append(_sample(f'{family}_count', labels, s['count']))
+
+    for name, text in COUNTER_HELP.items():
+        if samples[name]:
+            _family(lines, f'{name}_total', 'counter', text)
+            for labels, value in sorted(samples[name], key=lambda sample: sorted(sample[0].items())):
+                lines.append(_sample(f'{name}_total', sorted(labels.items()), value))
+
+    last = ChangeLog.objects.aggregate(last=Max('pk'))['last'] or 0
+    _family(lines, 'changefeed_backlog', 'gauge', 'Change-log entries a consumer has not read yet (approximate).')
+    for name, position in ChangeConsumer.objects.values_list('name', 'position').order_by('name'):
+        lines.append(_sample('changefeed_backlog', [('consumer', name)], max(last - position, 0)))
+
+    sizes = cache.get_or_set('metrics:table_sizes', table_sizes, TABLE_SIZES_TIMEOUT)
+    _family(lines, 'db_table_rows', 'gauge', 'Rows in the largest tables (planner estimate on PostgreSQL).')
+    for table, _, rows in sizes:
+        lines.append(_sample('db_table_rows', [('table', table)], rows))
+    if any(size is not None for _, size, _ in sizes):
+        _family(lines, 'db_table_size_bytes', 'gauge', 'On-disk size of the largest tables, indexes included.')
+        for table, size, _ in sizes:
+            lines.append(_sample('db_table_size_bytes', [('table', table)], size))
+
+    redis = _redis_stats()
+    if redis is not None:
+        for name, value, text in zip(
+            ('cache_server_hits_total', 'cache_server_misses_total'), redis,
+            ('Key lookups the cache server found.', 'Key lookups the cache server missed.'),
+        ):
+            _family(lines, name, 'counter', text)
+            lines.append(_sample(name, [], value))
+    return '\n'.join(lines) + '\n'
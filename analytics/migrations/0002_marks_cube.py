@@ -0,0 +1,32 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarksCubeCell',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(blank=True, max_length=9)),
+                ('month', models.DateField()),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_sq', models.FloatField(default=0)),
+                ('classroom', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='cube_cells', to='analytics.classroom')),
+                ('exam_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cube_cells', to='analytics.examtype')),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cube_cells', to='analytics.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['academic_year', 'subject'], name='analytics_m_academi_b91186_idx')],
+                'unique_together': {('academic_year', 'month', 'subject', 'classroom', 'exam_type')},
+            },
+        ),
+    ]
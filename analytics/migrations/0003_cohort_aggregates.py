@@ -0,0 +1,46 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0002_marks_cube'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClosedAcademicYear',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=9, unique=True)),
+                ('closed_at', models.DateTimeField(auto_now_add=True)),
+                ('closed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='closed_years', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-academic_year'],
+            },
+        ),
+        migrations.CreateModel(
+            name='CohortAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('academic_year', models.CharField(max_length=9)),
+                ('class_name', models.CharField(max_length=50)),
+                ('section', models.CharField(max_length=5)),
+                ('student_count', models.PositiveIntegerField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('total', models.FloatField(default=0)),
+                ('total_sq', models.FloatField(default=0)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cohort_aggregates', to='analytics.subject')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['class_name', 'subject'], name='analytics_c_class_n_46dfe5_idx')],
+                'unique_together': {('academic_year', 'class_name', 'section', 'subject')},
+            },
+        ),
+    ]
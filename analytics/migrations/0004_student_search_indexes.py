@@ -0,0 +1,41 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations
+
+# Case-insensitive prefix lookups (``istartswith``) compile to
+# ``UPPER(col::text) LIKE UPPER('term%')`` on PostgreSQL, which only an
+# expression index with text_pattern_ops can serve.
+INDEXES = [
+    ('accounts_user_first_name_upper_like', 'accounts_user', 'first_name'),
+    ('accounts_user_last_name_upper_like', 'accounts_user', 'last_name'),
+    ('accounts_user_username_upper_like', 'accounts_user', 'username'),
+    ('analytics_studentprofile_roll_number_upper_like', 'analytics_studentprofile', 'roll_number'),
+]
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, table, column in INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "{table}" (UPPER("{column}"::text) text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _, _ in INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0001_initial'),
+        ('analytics', '0003_cohort_aggregates'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -0,0 +1,104 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from datetime import date
+
+from django.db import migrations
+
+# Converts analytics_attendance into a table partitioned by month of ``date``
+# on PostgreSQL (see analytics.partitions); other databases are left alone.
+#
+# Rows are copied into a new partitioned table created LIKE the old one, then
+# the old table's indexes and constraints are recreated under their original
+# names. The primary key becomes (id, date) because a partitioned table's
+# unique constraints must include the partition key; ``id`` keeps coming
+# from its own sequence and stays unique. Large tables are copied inside the
+# migration's transaction, so run it in a maintenance window.
+
+TABLE = 'analytics_attendance'
+OLD = f'{TABLE}_unpartitioned'
+DEFAULT_PARTITION = f'{TABLE}_default'
+SEQUENCE = f'{TABLE}_id_seq'
+
+
+def _add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _definitions(cursor, table):
+    """Index and constraint definitions of ``table`` (excluding the primary key)."""
+    cursor.execute(
+        """
+        SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint
+        WHERE conrelid = %s::regclass AND contype IN ('u', 'f')
+        """,
+        [table],
+    )
+    constraints = cursor.fetchall()
+    cursor.execute(
+        """
+        SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid
+        WHERE x.indrelid = %s::regclass AND NOT x.indisprimary
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.oid)
+        """,
+        [table],
+    )
+    return constraints, cursor.fetchall()
+
+
+def _rebuild(schema_editor, partitioned):
+    with schema_editor.connection.cursor() as cursor:
+        constraints, indexes = _definitions(cursor, TABLE)
+        cursor.execute(f'ALTER TABLE "{TABLE}" RENAME TO "{OLD}"')
+        cursor.execute(f'SELECT MIN(date), MAX(date), MAX(id) FROM "{OLD}"')
+        first, last, max_id = cursor.fetchone()
+
+        cursor.execute(
+            f'CREATE TABLE "{TABLE}" (LIKE "{OLD}" INCLUDING DEFAULTS)'
+            + (' PARTITION BY RANGE (date)' if partitioned else '')
+        )
+        if partitioned:
+            cursor.execute(f'CREATE TABLE "{DEFAULT_PARTITION}" PARTITION OF "{TABLE}" DEFAULT')
+            month = (first or date.today()).replace(day=1)
+            end = _add_months(max(last or date.today(), date.today()), 4)
+            while month < end:
+                cursor.execute(
+                    f'CREATE TABLE "{TABLE}_p{month:%Y_%m}" PARTITION OF "{TABLE}" '
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+                )
+                month = _add_months(month, 1)
+
+        cursor.execute(f'INSERT INTO "{TABLE}" SELECT * FROM "{OLD}"')
+        cursor.execute(f'DROP TABLE "{OLD}" CASCADE')
+
+        pk = '(id, date)' if partitioned else '(id)'
+        cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{TABLE}_pkey" PRIMARY KEY {pk}')
+        for name, definition in constraints:
+            cursor.execute(f'ALTER TABLE "{TABLE}" ADD CONSTRAINT "{name}" {definition}')
+        for name, definition in indexes:
+            cursor.execute(definition)
+
+        cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS "{SEQUENCE}" OWNED BY "{TABLE}".id')
+        cursor.execute(f"ALTER TABLE \"{TABLE}\" ALTER COLUMN id SET DEFAULT nextval('\"{SEQUENCE}\"')")
+        cursor.execute(f"SELECT setval('\"{SEQUENCE}\"', %s, %s)", [max_id or 1, max_id is not None])
+
+
+def partition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild(schema_editor, partitioned=True)
+
+
+def unpartition(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        _rebuild(schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0006_large_table_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, unpartition),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def merge_unassigned_cells(apps, schema_editor):
+    """Fold duplicate cells of students without a classroom (left by
+    concurrent writers) into one so the constraint can be created."""
+    MarksCubeCell = apps.get_model('analytics', 'MarksCubeCell')
+    key = ('academic_year', 'month', 'subject', 'exam_type')
+    cells = MarksCubeCell.objects.using(schema_editor.connection.alias).filter(classroom__isnull=True)
+    duplicates = cells.values(*key).annotate(n=Count('id')).filter(n__gt=1).order_by()
+    for row in duplicates:
+        group = cells.filter(**{f: row[f] for f in key}).order_by('pk')
+        totals = group.aggregate(count=Sum('count'), total=Sum('total'), total_sq=Sum('total_sq'))
+        keep = group.first()
+        group.exclude(pk=keep.pk).delete()
+        group.update(**totals)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0011_slow_queries'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_unassigned_cells, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='markscubecell',
+            constraint=models.UniqueConstraint(condition=models.Q(('classroom__isnull', True)), fields=('academic_year', 'month', 'subject', 'exam_type'), name='marks_cube_cell_unassigned_unique'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0012_marks_cube_unassigned_unique'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='changelog',
+            name='xact_id',
+            field=models.BigIntegerField(editable=False, null=True),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations
+
+
+def drop_named_snapshots(apps, schema_editor):
+    """Subject and classroom snapshots now hold student ids instead of names;
+    drop the old ones (reports are computed live until build_reports runs)."""
+    ReportSnapshot = apps.get_model('analytics', 'ReportSnapshot')
+    ReportSnapshot.objects.using(schema_editor.connection.alias).filter(kind__in=['subject', 'classroom']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0013_changelog_xact_id'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_named_snapshots, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations
+
+
+def _document_text(user):
+    # analytics.search.document_text as of this migration.
+    profile = getattr(user, 'student_profile', None)
+    parts = [user.first_name, user.last_name, user.username, user.phone]
+    if profile is not None:
+        parts += [profile.roll_number, profile.parent_name, profile.parent_phone]
+    return ' '.join(p.strip().lower() for p in parts if p and p.strip())
+
+
+def index_students(apps, schema_editor):
+    """Index every student: 0005 created the search table empty, and the
+    signal handlers only index students saved after it."""
+    alias = schema_editor.connection.alias
+    User = apps.get_model('accounts', 'User')
+    StudentSearchDocument = apps.get_model('analytics', 'StudentSearchDocument')
+    StudentSearchDocument.objects.using(alias).all().delete()
+    StudentSearchDocument.objects.using(alias).bulk_create(
+        (
+            StudentSearchDocument(student_id=user.pk, document=_document_text(user))
+            for user in (
+                User.objects.using(alias).filter(role='student')
+                .select_related('student_profile').iterator(chunk_size=2000)
+            )
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0014_report_snapshot_student_ids'),
+    ]
+
+    operations = [
+        migrations.RunPython(index_students, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from collections import defaultdict
+
+from django.db import migrations
+
+
+def fill_cube(apps, schema_editor):
+    """Aggregate every existing mark into the cube: 0002 created it empty,
+    and the signal handlers only add marks saved after it (same cells as
+    ``analytics.cube.rebuild()``)."""
+    from analytics.cube import _cell_filter, _resolve
+
+    alias = schema_editor.connection.alias
+    ClassRoom = apps.get_model('analytics', 'ClassRoom')
+    Marks = apps.get_model('analytics', 'Marks')
+    MarksCubeCell = apps.get_model('analytics', 'MarksCubeCell')
+
+    subjects = defaultdict(set)
+    for classroom_id, subject_id in ClassRoom.subjects.through.objects.using(alias).values_list('classroom_id', 'subject_id'):
+        subjects[classroom_id].add(subject_id)
+    rooms = defaultdict(list)
+    for student_id, classroom_id, year in ClassRoom.students.through.objects.using(alias).values_list(
+        'user_id', 'classroom_id', 'classroom__academic_year',
+    ):
+        rooms[student_id].append((classroom_id, year, subjects[classroom_id]))
+
+    deltas = defaultdict(lambda: [0, 0.0, 0.0])
+    rows = Marks.objects.using(alias).values_list(
+        'student_id', 'subject_id', 'exam_type_id', 'date', 'marks_obtained', 'subject__max_marks',
+    )
+    for student_id, subject_id, exam_type_id, day, obtained, max_marks in rows.iterator(chunk_size=5000):
+        classroom_id, year = _resolve(rooms.get(student_id, ()), subject_id, day)
+        pct = float(obtained) / max_marks * 100 if max_marks else 0.0
+        cell = deltas[(year, day.replace(day=1), subject_id, classroom_id, exam_type_id)]
+        cell[0] += 1
+        cell[1] += pct
+        cell[2] += pct * pct
+
+    cells = MarksCubeCell.objects.using(alias)
+    cells.all().delete()
+    cells.bulk_create(
+        [
+            MarksCubeCell(count=n, total=total, total_sq=total_sq, **_cell_filter(key))
+            for key, (n, total, total_sq) in deltas.items()
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0015_backfill_student_search'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_cube, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0.2 on 2026-10-19 10:00
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analytics', '0016_backfill_marks_cube'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='changelog',
+            name='xact_id',
+        ),
+    ]
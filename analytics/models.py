@@ -1,4 +1,7 @@
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models import Avg, Count, F, FloatField, OuterRef, Q, Subquery
+from django.db.models.functions import Cast, Coalesce, NullIf
+from django.core.serializers.json import DjangoJSONEncoder
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 
@@ -50,6 +53,37 @@ class ClassRoom(models.Model):
         ordering = ['academic_year', 'name', 'section']
 
 
+# A mark as a percentage of its subject's maximum, and the share of
+# attendance records marked present, as SQL expressions.
+PERCENTAGE = Cast('marks_obtained', FloatField()) * 100 / F('subject__max_marks')
+PRESENT_PERCENTAGE = Cast(Count('pk', filter=Q(status='present')), FloatField()) * 100 / NullIf(Count('pk'), 0)
+
+
+def student_stats(student):
+    """Annotations with a student's average mark percentage, attendance
+    percentage and mark / attendance counts, for the student the ``student``
+    field path (e.g. ``'pk'`` on users) points at.
+
+    Each is a correlated subquery, so they add no joins or grouping to the
+    annotated query and any number of students is one query. The percentages
+    are None for students without marks or attendance.
+    """
+    marks = Marks.objects.filter(student=OuterRef(student)).order_by().values('student')
+    attendance = Attendance.objects.filter(student=OuterRef(student)).order_by().values('student')
+    return {
+        'avg_percentage': Subquery(marks.annotate(v=Avg(PERCENTAGE)).values('v')),
+        'marks_count': Coalesce(Subquery(marks.annotate(v=Count('pk')).values('v')), 0),
+        'attendance_percentage': Subquery(attendance.annotate(v=PRESENT_PERCENTAGE).values('v')),
+        'attendance_count': Coalesce(Subquery(attendance.annotate(v=Count('pk')).values('v')), 0),
+    }
+
+
+class StudentProfileQuerySet(models.QuerySet):
+    def with_stats(self):
+        """Profiles annotated with ``student_stats()``; see ``get_overall_average()``."""
+        return self.annotate(**student_stats('user_id'))
+
+
 class StudentProfile(models.Model):
     user = models.OneToOneField(
         settings.AUTH_USER_MODEL,
@@ -63,22 +97,24 @@ class StudentProfile(models.Model):
     address = models.TextField(blank=True)
     admission_date = models.DateField(null=True, blank=True)
 
+    objects = StudentProfileQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.user.get_full_name()} ({self.roll_number})"
 
+    # Both use the values annotated by StudentProfile.objects.with_stats()
+    # when present and run one aggregate query otherwise.
+
     def get_overall_average(self):
-        marks = self.user.marks.all()
-        if not marks:
-            return 0
-        total = sum((m.marks_obtained / m.subject.max_marks) * 100 for m in marks)
-        return round(total / marks.count(), 2)
+        if not hasattr(self, 'avg_percentage'):
+            self.avg_percentage = Marks.objects.filter(student_id=self.user_id).aggregate(v=Avg(PERCENTAGE))['v']
+        return round(self.avg_percentage, 2) if self.avg_percentage is not None else 0
 
     def get_attendance_percentage(self):
-        records = self.user.attendance_records.all()
-        if not records:
-            return 0
-        present = records.filter(status='present').count()
-        return round((present / records.count()) * 100, 2)
+        if not hasattr(self, 'attendance_percentage'):
+            records = Attendance.objects.filter(student_id=self.user_id).order_by()
+            self.attendance_percentage = records.aggregate(v=PRESENT_PERCENTAGE)['v']
+        return round(self.attendance_percentage, 2) if self.attendance_percentage is not None else 0
 
     class Meta:
         verbose_name = 'Student Profile'
@@ -96,7 +132,32 @@ class ExamType(models.Model):
         return self.name
 
 
-class Marks(models.Model):
+def grade_for(pct):
+    if pct >= 90: return 'A+'
+    elif pct >= 80: return 'A'
+    elif pct >= 70: return 'B+'
+    elif pct >= 60: return 'B'
+    elif pct >= 50: return 'C'
+    elif pct >= 40: return 'D'
+    return 'F'
+
+
+class ChangeLogged(models.Model):
+    """Saves run in a transaction that also covers the ``post_save`` handlers,
+    so the ``ChangeLog`` entry written there commits or rolls back with the row.
+    (Deletes already send ``post_delete`` inside their transaction.)
+    """
+
+    def save(self, *args, using=None, **kwargs):
+        using = using or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, using=using, **kwargs)
+
+    class Meta:
+        abstract = True
+
+
+class Marks(ChangeLogged):
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -123,14 +184,7 @@ class Marks(models.Model):
         return round((self.marks_obtained / self.subject.max_marks) * 100, 2)
 
     def get_grade(self):
-        pct = self.get_percentage()
-        if pct >= 90: return 'A+'
-        elif pct >= 80: return 'A'
-        elif pct >= 70: return 'B+'
-        elif pct >= 60: return 'B'
-        elif pct >= 50: return 'C'
-        elif pct >= 40: return 'D'
-        return 'F'
+        return grade_for(self.get_percentage())
 
     def __str__(self):
         return f"{self.student.username} - {self.subject.name} - {self.marks_obtained}"
@@ -139,9 +193,14 @@ class Marks(models.Model):
         unique_together = ['student', 'subject', 'exam_type', 'date']
         ordering = ['-date']
         verbose_name_plural = 'Marks'
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['subject', 'date']),
+            models.Index(fields=['exam_type', 'date']),
+        ]
 
 
-class Attendance(models.Model):
+class Attendance(ChangeLogged):
     STATUS_CHOICES = [
         ('present', 'Present'),
         ('absent', 'Absent'),
@@ -172,6 +231,11 @@ class Attendance(models.Model):
         unique_together = ['student', 'subject', 'date']
         ordering = ['-date']
         verbose_name_plural = 'Attendance Records'
+        indexes = [
+            models.Index(fields=['date']),
+            models.Index(fields=['subject', 'date']),
+            models.Index(fields=['status', 'date']),
+        ]
 
 
 class Assessment(models.Model):
@@ -204,7 +268,7 @@ class Assessment(models.Model):
         ordering = ['-due_date']
 
 
-class AssessmentSubmission(models.Model):
+class AssessmentSubmission(ChangeLogged):
     assessment = models.ForeignKey(Assessment, on_delete=models.CASCADE, related_name='submissions')
     student = models.ForeignKey(
         settings.AUTH_USER_MODEL,
@@ -263,3 +327,218 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ['-created_at']
+
+
+class MarksCubeCell(models.Model):
+    """Pre-aggregated marks percentages per subject x classroom x exam type x month.
+
+    Maintained incrementally from Marks changes by ``analytics.cube``; rows
+    hold enough (count, sum, sum of squares) to roll up averages and
+    standard deviations along any subset of dimensions.
+    """
+    academic_year = models.CharField(max_length=9, blank=True)
+    month = models.DateField()  # first day of the month
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='cube_cells')
+    classroom = models.ForeignKey(
+        ClassRoom, null=True, blank=True, on_delete=models.CASCADE, related_name='cube_cells'
+    )
+    exam_type = models.ForeignKey(ExamType, on_delete=models.CASCADE, related_name='cube_cells')
+    count = models.IntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_sq = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.academic_year} {self.month:%Y-%m} {self.subject_id}/{self.classroom_id}/{self.exam_type_id}"
+
+    class Meta:
+        unique_together = ['academic_year', 'month', 'subject', 'classroom', 'exam_type']
+        constraints = [
+            # NULLs are distinct in the constraint above, so cells of students
+            # without a classroom need their own.
+            models.UniqueConstraint(
+                fields=['academic_year', 'month', 'subject', 'exam_type'],
+                condition=Q(classroom__isnull=True),
+                name='marks_cube_cell_unassigned_unique',
+            ),
+        ]
+        indexes = [models.Index(fields=['academic_year', 'subject'])]
+
+
+class ClosedAcademicYear(models.Model):
+    academic_year = models.CharField(max_length=9, unique=True)
+    closed_at = models.DateTimeField(auto_now_add=True)
+    closed_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True, blank=True,
+        related_name='closed_years'
+    )
+
+    def __str__(self):
+        return self.academic_year
+
+    class Meta:
+        ordering = ['-academic_year']
+
+
+class CohortAggregate(models.Model):
+    """Marks statistics for one class section and subject, frozen when its year is closed.
+
+    Class name and section are copied from the ClassRoom so historical
+    comparisons never need to touch live tables.
+    """
+    academic_year = models.CharField(max_length=9)
+    class_name = models.CharField(max_length=50)
+    section = models.CharField(max_length=5)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='cohort_aggregates')
+    student_count = models.PositiveIntegerField(default=0)
+    count = models.IntegerField(default=0)
+    total = models.FloatField(default=0)
+    total_sq = models.FloatField(default=0)
+
+    def __str__(self):
+        return f"{self.class_name}-{self.section} ({self.academic_year}) {self.subject_id}"
+
+    class Meta:
+        unique_together = ['academic_year', 'class_name', 'section', 'subject']
+        indexes = [models.Index(fields=['class_name', 'subject'])]
+
+
+class StudentSearchDocument(models.Model):
+    """Searchable text for one student, maintained by ``analytics.search``.
+
+    Indexed with a pg_trgm GIN index on PostgreSQL and mirrored into an FTS5
+    table on SQLite (see migration 0005).
+    """
+    student = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    document = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.document
+
+
+class ChangeLog(models.Model):
+    """One create, update or delete of a Marks, Attendance or AssessmentSubmission row.
+
+    Append-only outbox written in the same transaction as the change (see
+    ``analytics.changefeed``); ``id`` is the position consumers keep as their
+    watermark. ``data`` holds the row's field values after the change (before
+    it, for deletes).
+    """
+    ACTIONS = [
+        ('create', 'Create'),
+        ('update', 'Update'),
+        ('delete', 'Delete'),
+    ]
+    table = models.CharField(max_length=20)
+    action = models.CharField(max_length=10, choices=ACTIONS)
+    object_id = models.BigIntegerField()
+    student_id = models.BigIntegerField(null=True)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    changed_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.table} {self.object_id}"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [models.Index(fields=['table', 'id'])]
+
+
+class ChangeConsumer(models.Model):
+    """How far a named consumer has read the change log."""
+    name = models.CharField(max_length=100, unique=True)
+    position = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.position}"
+
+
+class ReportSnapshot(models.Model):
+    """A report summary precomputed by ``manage.py build_reports`` (see ``analytics.reports``).
+
+    ``version`` is the data version of the student / subject / classroom the
+    summary was computed from; it is only served while that is still current.
+    """
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+    payload = models.JSONField(encoder=DjangoJSONEncoder)
+    built_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.kind} {self.object_id} @ {self.version}"
+
+    class Meta:
+        unique_together = ['kind', 'object_id']
+
+
+class RequestProfile(models.Model):
+    """A request a staff user asked to have profiled (see ``analytics.profiling``).
+
+    ``data`` holds the cProfile statistics in ``.prof`` (pstats) format, or
+    for the sampling profiler the sampled stacks in collapsed ("folded")
+    format; ``queries`` the SQL the request ran with its timings.
+    """
+    MODES = [
+        ('cprofile', 'cProfile'),
+        ('sample', 'Sampling'),
+    ]
+    created_at = models.DateTimeField(auto_now_add=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, related_name='+')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=500)
+    view_name = models.CharField(max_length=200, blank=True)
+    mode = models.CharField(max_length=10, choices=MODES)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    query_count = models.PositiveIntegerField()
+    query_ms = models.FloatField()
+    queries = models.JSONField(default=list)
+    data = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    class Meta:
+        ordering = ['-created_at']
+
+
+class SlowQuery(models.Model):
+    """A statement fingerprint that has run slower than ``SLOW_QUERY_MS``
+    (see ``analytics.slow_queries``).
+
+    ``sql``, ``view``, ``caller`` and ``plan`` describe the slowest execution
+    seen so far.
+    """
+    fingerprint = models.CharField(max_length=32, unique=True)
+    statement = models.TextField()
+    count = models.PositiveIntegerField(default=0)
+    total_ms = models.FloatField(default=0)
+    max_ms = models.FloatField(default=0)
+    first_seen = models.DateTimeField(auto_now_add=True)
+    last_seen = models.DateTimeField()
+    database = models.CharField(max_length=50)
+    sql = models.TextField()
+    view = models.CharField(max_length=200, blank=True)
+    caller = models.CharField(max_length=300, blank=True)
+    plan = models.TextField(blank=True)
+    plan_at = models.DateTimeField(null=True)
+
+    def __str__(self):
+        return self.statement[:80]
+
+    @property
+    def avg_ms(self):
+        return self.total_ms / self.count if self.count else 0
+
+    class Meta:
+        ordering = ['-total_ms']
+        verbose_name_plural = 'Slow queries'
@@ -0,0 +1,55 @@
+"""
+Paginator for very large tables.
+
+``Paginator.count`` runs an exact ``COUNT(*)``, which on PostgreSQL scans the
+whole table (or the whole filtered range). ``EstimatedCountPaginator`` uses
+the planner's estimate instead - ``pg_class.reltuples`` for an unfiltered
+table, the EXPLAIN row estimate for a filtered one - and only falls back to
+an exact count when the estimate is small enough for that to be cheap.
+
+A partitioned table (Attendance, see ``analytics.partitions``) has no
+``reltuples`` of its own, as autovacuum never analyzes the parent; its
+estimate is the sum of its partitions'. Changes to the partitioning need to
+keep that working, or the changelists fall back to counting every partition.
+"""
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+def estimated_count(queryset):
+    """Planner row estimate for ``queryset`` on PostgreSQL, else None."""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    if not queryset.query.where:
+        with connection.cursor() as cursor:
+            # The table itself, or the leaf partitions of a partitioned one.
+            cursor.execute("""
+                SELECT SUM(GREATEST(p.reltuples, 0))::bigint
+                FROM pg_class c
+                LEFT JOIN LATERAL pg_partition_tree(c.oid) t ON true
+                JOIN pg_class p ON p.oid = COALESCE(t.relid, c.oid)
+                WHERE c.oid = %s::regclass AND p.relkind = 'r'
+            """, [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        # -1 (counted as 0) until a table has been vacuumed/analyzed.
+        if row and row[0]:
+            return row[0]
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    # Below this many (estimated) rows an exact count is cheap enough.
+    exact_below = 10000
+
+    @cached_property
+    def count(self):
+        estimate = estimated_count(self.object_list) if hasattr(self.object_list, 'query') else None
+        if estimate is not None and estimate >= self.exact_below:
+            return estimate
+        return super().count
@@ -0,0 +1,157 @@
+"""
+Monthly partitions of the Attendance table (PostgreSQL only).
+
+Migration 0007 turns ``analytics_attendance`` into a table partitioned by
+range of ``date``, with one partition per month plus a default partition for
+anything outside them. Queries filtering on ``date`` only touch the matching
+months (partition pruning); everything else keeps working unchanged.
+
+* ``ensure_partitions()`` creates the partitions for the coming months; it
+  runs after every ``migrate`` and from ``manage.py create_attendance_partitions``
+  (schedule it, e.g. daily).
+* ``archive_year()`` detaches the months of a closed academic year and moves
+  them to an archive schema (and optionally tablespace), out of the live table.
+
+The parent table has no row estimate of its own; ``analytics.pagination``
+sums its partitions' to avoid exact counts in the admin changelist.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from . import versioning
+
+TABLE = 'analytics_attendance'
+DEFAULT_PARTITION = f'{TABLE}_default'
+
+
+class PartitioningUnavailable(Exception):
+    pass
+
+
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'{TABLE}_p{month:%Y_%m}'
+
+
+def academic_year_range(academic_year):
+    """First day of ``academic_year`` ("2024-2025") and of the year after it."""
+    start = date(int(academic_year.split('-')[0]), getattr(settings, 'ACADEMIC_YEAR_START_MONTH', 6), 1)
+    return start, add_months(start, 12)
+
+
+def is_partitioned(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [TABLE])
+        return cursor.fetchone() is not None
+
+
+def _require_partitioned(using):
+    if not is_partitioned(using):
+        raise PartitioningUnavailable(
+            f'{TABLE} is not partitioned (partitioning needs PostgreSQL and migration analytics 0007).'
+        )
+
+
+def partitions(using=DEFAULT_DB_ALIAS):
+    """``[(name, first day, day after last)]`` of the monthly partitions, oldest first."""
+    _require_partitioned(using)
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT c.relname, pg_get_expr(c.relpartbound, c.oid)
+            FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = %s::regclass
+            """,
+            [TABLE],
+        )
+        rows = cursor.fetchall()
+    result = []
+    for name, bound in rows:
+        if bound == 'DEFAULT':
+            continue
+        # FOR VALUES FROM ('2024-06-01') TO ('2024-07-01')
+        start, end = (date.fromisoformat(part.split("'")[1]) for part in bound.split(' TO '))
+        result.append((name, start, end))
+    return sorted(result, key=lambda p: p[1])
+
+
+def create_partition(month, using=DEFAULT_DB_ALIAS):
+    """Create the partition holding ``month`` (any day in it) if it doesn't exist. Returns its name."""
+    month = month.replace(day=1)
+    start, end = month, add_months(month, 1)
+    name = partition_name(month)
+    create = (
+        f'CREATE TABLE IF NOT EXISTS "{name}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f'SELECT 1 FROM "{DEFAULT_PARTITION}" WHERE date >= %s AND date < %s LIMIT 1', [start, end])
+        if cursor.fetchone() is None:
+            cursor.execute(create)
+            return name
+        # Rows for this month already landed in the default partition: move
+        # them into the new partition while the default one is detached.
+        # (Deferred FK checks would block the re-ATTACH, so run them now.)
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{DEFAULT_PARTITION}"')
+        cursor.execute(create)
+        cursor.execute(
+            f'INSERT INTO "{TABLE}" SELECT * FROM "{DEFAULT_PARTITION}" WHERE date >= %s AND date < %s', [start, end]
+        )
+        cursor.execute(f'DELETE FROM "{DEFAULT_PARTITION}" WHERE date >= %s AND date < %s', [start, end])
+        cursor.execute(f'ALTER TABLE "{TABLE}" ATTACH PARTITION "{DEFAULT_PARTITION}" DEFAULT')
+    return name
+
+
+def ensure_partitions(months_ahead=None, using=DEFAULT_DB_ALIAS):
+    """Create partitions from the current month up to ``months_ahead`` months ahead."""
+    _require_partitioned(using)
+    if months_ahead is None:
+        months_ahead = getattr(settings, 'ATTENDANCE_PARTITIONS_AHEAD', 3)
+    this_month = date.today().replace(day=1)
+    existing = {name for name, _, _ in partitions(using)}
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(this_month, offset)
+        if partition_name(month) not in existing:
+            created.append(create_partition(month, using))
+    return created
+
+
+def archive_year(academic_year, schema='archive', tablespace=None, using=DEFAULT_DB_ALIAS):
+    """Detach the monthly partitions of ``academic_year`` and move them to ``schema``.
+
+    The rows stay queryable as ``<schema>.<partition>`` but no longer appear
+    in Attendance queries. Returns the names of the archived partitions.
+    """
+    _require_partitioned(using)
+    start, end = academic_year_range(academic_year)
+    months = [p for p in partitions(using) if start <= p[1] and p[2] <= end]
+    if not months:
+        return []
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'SELECT DISTINCT student_id FROM "{TABLE}" WHERE date >= %s AND date < %s', [start, end]
+        )
+        student_ids = [row[0] for row in cursor.fetchall()]
+
+    with transaction.atomic(using=using), connections[using].cursor() as cursor:
+        cursor.execute(f'CREATE SCHEMA IF NOT EXISTS "{schema}"')
+        for name, _, _ in months:
+            cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+            cursor.execute(f'ALTER TABLE "{name}" SET SCHEMA "{schema}"')
+            if tablespace:
+                cursor.execute(f'ALTER TABLE "{schema}"."{name}" SET TABLESPACE "{tablespace}"')
+
+    versioning.bump([versioning.SCHOOL] + [('student', pk) for pk in student_ids])
+    return [name for name, _, _ in months]
@@ -0,0 +1,224 @@
+"""
+On-demand request profiling for staff users.
+
+A staff user adds ``?_profile`` (or sends an ``X-Profile`` header) to any URL
+to have that one request run under cProfile, or under a sampling profiler
+with ``?_profile=sample``. The profile is stored as a ``RequestProfile``
+together with every SQL query and its duration; the admin lists them,
+renders the hottest functions and offers the raw profile for download
+(``.prof`` for snakeviz / pstats, folded stacks for flamegraph.pl and
+speedscope). The response carries an ``X-Profile-Url`` header pointing there.
+
+Other requests only pay for a substring check of the query string and a
+header lookup; with ``PROFILER_ENABLED`` off the middleware is not loaded.
+Streaming responses are profiled up to the point the response is returned,
+not while their body is sent.
+"""
+import cProfile
+import io
+import marshal
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.urls import reverse
+
+PARAM = '_profile'
+HEADER = 'HTTP_X_PROFILE'
+
+# SQL statements kept per profile; the count and total time cover all of them.
+MAX_QUERIES = 500
+
+
+class QueryTimer:
+    """``execute_wrapper`` recording each query's alias, SQL and duration."""
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.queries = []
+
+    def wrapper(self, alias):
+        def record(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                ms = (time.perf_counter() - started) * 1000
+                self.count += 1
+                self.total += ms
+                if len(self.queries) < MAX_QUERIES:
+                    self.queries.append({'alias': alias, 'sql': sql, 'many': many, 'ms': round(ms, 3)})
+        return record
+
+    def __enter__(self):
+        self._stack = ExitStack()
+        for alias in connections:
+            self._stack.enter_context(connections[alias].execute_wrapper(self.wrapper(alias)))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+
+
+class CProfiler:
+    mode = 'cprofile'
+
+    def start(self):
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+        self.profile.create_stats()
+        return marshal.dumps(self.profile.stats)  # what Profile.dump_stats() writes
+
+
+class Sampler:
+    """Records the profiled thread's stack every ``PROFILER_SAMPLE_INTERVAL`` seconds."""
+    mode = 'sample'
+
+    def start(self):
+        self.thread_id = threading.get_ident()
+        self.stacks = Counter()
+        self.done = threading.Event()
+        self.thread = threading.Thread(target=self._run, name='request-sampler', daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        interval = settings.PROFILER_SAMPLE_INTERVAL
+        while not self.done.wait(interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                stack.append(f"{frame.f_globals.get('__name__', '?')}.{frame.f_code.co_qualname}")
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+
+    def stop(self):
+        self.done.set()
+        self.thread.join()
+        return ''.join(f'{stack} {count}\n' for stack, count in self.stacks.most_common()).encode()
+
+
+PROFILERS = {'cprofile': CProfiler, 'sample': Sampler}
+
+
+def requested_mode(request):
+    """The profiler mode the request asks for, or None; cheap enough for every request."""
+    if PARAM in request.META.get('QUERY_STRING', '') and PARAM in request.GET:
+        value = request.GET[PARAM]
+    elif HEADER in request.META:
+        value = request.META[HEADER]
+    else:
+        return None
+    return value if value in PROFILERS else 'cprofile'
+
+
+def is_allowed(request):
+    return request.user.is_authenticated and request.user.is_staff
+
+
+def report(profile, limit=40):
+    """The ``limit`` hottest functions as text: by cumulative time (cProfile),
+    or by the share of samples they were running in (sampling)."""
+    if profile.mode == 'sample':
+        lines = bytes(profile.data).decode().splitlines()
+        total = sum(int(line.rsplit(' ', 1)[1]) for line in lines) or 1
+        leaves = Counter()
+        for line in lines:
+            stack, count = line.rsplit(' ', 1)
+            leaves[stack.rsplit(';', 1)[-1]] += int(count)
+        return '\n'.join(f'{count / total:7.1%}  {frame}' for frame, count in leaves.most_common(limit))
+
+    class Loaded:
+        stats = marshal.loads(bytes(profile.data))
+
+        def create_stats(self):
+            pass
+
+    out = io.StringIO()
+    pstats.Stats(Loaded(), stream=out).strip_dirs().sort_stats('cumulative').print_stats(limit)
+    return out.getvalue()
+
+
+def save(request, response, profiler, data, timer, duration):
+    from .models import RequestProfile
+
+    match = request.resolver_match
+    profile = RequestProfile.objects.create(
+        user=request.user,
+        method=request.method,
+        path=request.get_full_path()[:500],
+        view_name=match.view_name if match else '',
+        mode=profiler.mode,
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        query_count=timer.count,
+        query_ms=timer.total,
+        queries=timer.queries,
+        data=data,
+    )
+    stale = RequestProfile.objects.values_list('pk', flat=True)[settings.PROFILER_KEEP:]
+    RequestProfile.objects.filter(pk__in=list(stale)).delete()
+    response['X-Profile-Url'] = reverse('admin:analytics_requestprofile_change', args=[profile.pk])
+
+
+class ProfilerMiddleware:
+    """Profiles requests staff users flag with ``?_profile`` or ``X-Profile``.
+
+    Place it after the authentication middleware.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.PROFILER_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = requested_mode(request)
+        if mode is None or not is_allowed(request):
+            return self.get_response(request)
+        profiler = PROFILERS[mode]()
+        with QueryTimer() as timer:
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                data = profiler.stop()
+            duration = time.perf_counter() - started
+        save(request, response, profiler, data, timer, duration)
+        return response
+
+    async def __acall__(self, request):
+        # Under ASGI the profilers see the whole event loop thread, so other
+        # requests served meanwhile show up in the profile too.
+        mode = requested_mode(request)
+        if mode is None or not await sync_to_async(is_allowed)(request):
+            return await self.get_response(request)
+        profiler = PROFILERS[mode]()
+        with QueryTimer() as timer:
+            started = time.perf_counter()
+            profiler.start()
+            try:
+                response = await self.get_response(request)
+            finally:
+                data = profiler.stop()
+            duration = time.perf_counter() - started
+        await sync_to_async(save)(request, response, profiler, data, timer, duration)
+        return response
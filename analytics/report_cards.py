@@ -0,0 +1,147 @@
+"""
+Term report cards for a whole classroom, streamed as a ZIP of HTML files.
+
+Students are processed in chunks of ``REPORT_CARD_CHUNK``: each chunk's
+marks, attendance and submissions come from three queries for all of its
+students, the cards are rendered by a pool of ``REPORT_CARD_WORKERS``
+processes (in-process when 0), and every card is written to the archive and
+sent on before the next chunk is loaded, so memory stays bounded by the
+chunk size however large the classroom is.
+"""
+import multiprocessing
+import zipfile
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+
+import django
+from django.conf import settings
+from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .models import AssessmentSubmission, Attendance, Marks, grade_for
+
+_pool = None
+
+
+def _executor():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=settings.REPORT_CARD_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup,
+        )
+    return _pool
+
+
+def _discard_pool():
+    global _pool
+    _pool = None
+
+
+def load(classroom, students):
+    """Card data (plain dicts) for ``students`` of ``classroom``."""
+    ids = [s.pk for s in students]
+    marks = defaultdict(lambda: defaultdict(list))
+    for m in Marks.objects.filter(student_id__in=ids).select_related('subject', 'exam_type').order_by('date'):
+        marks[m.student_id][m.subject].append(m)
+    attendance = defaultdict(dict)
+    rows = Attendance.objects.filter(student_id__in=ids).values('student_id', 'subject__name', 'status') \
+        .annotate(n=Count('id')).order_by()
+    for row in rows:
+        counts = attendance[row['student_id']].setdefault(row['subject__name'], {'present': 0, 'total': 0})
+        counts['total'] += row['n']
+        if row['status'] == 'present':
+            counts['present'] += row['n']
+    submissions = defaultdict(list)
+    for s in AssessmentSubmission.objects.filter(student_id__in=ids).select_related('assessment').order_by('assessment__due_date'):
+        submissions[s.student_id].append({
+            'title': s.assessment.title,
+            'score': float(s.score) if s.score is not None else None,
+            'max_score': s.assessment.max_score,
+            'status': s.get_status_display(),
+        })
+
+    cards = []
+    for student in students:
+        subjects = []
+        all_percentages = []
+        for subject, ms in sorted(marks[student.pk].items(), key=lambda item: item[0].name):
+            percentages = [float(m.get_percentage()) for m in ms]
+            all_percentages += percentages
+            avg = round(sum(percentages) / len(percentages), 1)
+            subjects.append({
+                'name': subject.name,
+                'code': subject.code,
+                'exams': [{'name': m.exam_type.name, 'marks': float(m.marks_obtained), 'pct': p} for m, p in zip(ms, percentages)],
+                'avg': avg,
+                'grade': grade_for(avg),
+            })
+        present = sum(c['present'] for c in attendance[student.pk].values())
+        total = sum(c['total'] for c in attendance[student.pk].values())
+        for counts in attendance[student.pk].values():
+            counts['pct'] = round(counts['present'] / counts['total'] * 100, 1)
+        overall = round(sum(all_percentages) / len(all_percentages), 1) if all_percentages else None
+        profile = getattr(student, 'student_profile', None)
+        cards.append({
+            'filename': f"{profile.roll_number if profile else student.username}-{slugify(student.get_full_name())}.html",
+            'name': student.get_full_name() or student.username,
+            'roll_number': profile.roll_number if profile else '',
+            'classroom': str(classroom),
+            'subjects': subjects,
+            'overall_avg': overall,
+            'overall_grade': grade_for(overall) if overall is not None else None,
+            'attendance': dict(sorted(attendance[student.pk].items())),
+            'att_pct': round(present / total * 100, 1) if total else None,
+            'submissions': submissions[student.pk],
+        })
+    return cards
+
+
+def render_card(card):
+    return card['filename'], render_to_string('analytics/report_card.html', {'card': card})
+
+
+class _Stream:
+    """Write-only file object handing ZipFile's output over in pieces."""
+
+    def __init__(self):
+        self.pieces = []
+
+    def write(self, data):
+        self.pieces.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.pieces)
+        self.pieces = []
+        return data
+
+
+def stream_zip(classroom):
+    """Yield the bytes of a ZIP holding one report card per student of ``classroom``."""
+    students = classroom.students.select_related('student_profile').order_by('last_name', 'first_name', 'pk')
+    generated = timezone.localtime()
+    chunk_size = settings.REPORT_CARD_CHUNK
+    render = partial(_executor().map, chunksize=16) if settings.REPORT_CARD_WORKERS else map
+    stream = _Stream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for start in range(0, students.count(), chunk_size):
+            cards = load(classroom, list(students[start:start + chunk_size]))
+            for card in cards:
+                card['generated'] = generated.strftime('%d %b %Y')
+            try:
+                for filename, html in render(render_card, cards):
+                    archive.writestr(zipfile.ZipInfo(filename, generated.timetuple()[:6]), html, zipfile.ZIP_DEFLATED)
+                    yield stream.take()
+            except BrokenProcessPool:
+                _discard_pool()  # start a fresh one for the next request
+                raise
+    yield stream.take()
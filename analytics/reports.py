@@ -0,0 +1,152 @@
+"""
+Report summaries: the per-subject and attendance analysis of the student
+detail page, the subject report's grades and rankings, and the classroom
+performance chart.
+
+``summary(kind, pk)`` serves the copy ``manage.py build_reports`` stored in
+``ReportSnapshot`` while the data version it was built from (see
+``analytics.versioning``) is still current, and computes the summary on the
+spot otherwise, so a precomputed report is never staler than a live one.
+Stored copies are only used when the versions are shared by every process.
+Student lists hold ids only; names are looked up whenever a summary is
+served, since renaming a student changes none of the versions involved.
+"""
+from collections import defaultdict
+
+from django.db.models import Avg
+
+from accounts.models import User
+from . import versioning
+from .models import Attendance, ClassRoom, Marks, ReportSnapshot
+
+GRADE_ORDER = ['A+', 'A', 'B+', 'B', 'C', 'D', 'F']
+
+
+def _percentage(m):
+    return (m.marks_obtained / m.subject.max_marks) * 100
+
+
+def student_summary(pk):
+    from .views import _generate_suggestions
+
+    marks = list(Marks.objects.filter(student_id=pk).select_related('subject').order_by('-date'))
+    attendance = Attendance.objects.filter(student_id=pk).values_list('subject__name', 'status')
+
+    by_subject = defaultdict(list)
+    for m in marks:
+        by_subject[m.subject.name].append(m)
+    subject_analysis = {}
+    for name, ms in by_subject.items():
+        percs = [_percentage(m) for m in ms]
+        subject_analysis[name] = {
+            'avg': float(round(sum(percs) / len(percs), 1)),
+            'max': float(round(max(percs), 1)),
+            'min': float(round(min(percs), 1)),
+            'grade': ms[0].get_grade(),
+        }
+
+    att_analysis = {}
+    present = total = 0
+    for name, status in attendance:
+        d = att_analysis.setdefault(name, {'total': 0, 'present': 0})
+        d['total'] += 1
+        total += 1
+        if status == 'present':
+            d['present'] += 1
+            present += 1
+    for d in att_analysis.values():
+        d['pct'] = round((d['present'] / d['total']) * 100, 1)
+    att_pct = round((present / total) * 100, 1) if total else 0
+
+    overall_avg = 0
+    if marks:
+        overall_avg = float(round(sum(_percentage(m) for m in marks) / len(marks), 1))
+
+    return {
+        'subject_analysis': subject_analysis,
+        'att_analysis': att_analysis,
+        'trend': [
+            {'date': str(m.date), 'pct': float(m.get_percentage()), 'subject': m.subject.name}
+            for m in sorted(marks, key=lambda m: m.date)[:20]
+        ],
+        'overall_avg': overall_avg,
+        'att_pct': att_pct,
+        'suggestions': _generate_suggestions(None, marks, att_pct),
+    }
+
+
+def subject_summary(pk):
+    marks = Marks.objects.filter(subject_id=pk).select_related('subject')
+    grade_dist = dict.fromkeys(GRADE_ORDER, 0)
+    percentages = defaultdict(list)
+    for m in marks:
+        grade_dist[m.get_grade()] += 1
+        percentages[m.student_id].append(float(m.get_percentage()))
+    students = sorted(
+        (
+            {'student_id': sid, 'avg': round(sum(p) / len(p), 1)}
+            for sid, p in percentages.items()
+        ),
+        key=lambda x: x['avg'], reverse=True,
+    )
+    overall_avg = marks.aggregate(avg=Avg('marks_obtained'))['avg']
+    return {
+        'grade_dist': grade_dist,
+        'students': students,
+        'overall_avg': float(round(overall_avg, 1)) if overall_avg else 0,
+    }
+
+
+def classroom_summary(pk):
+    students = list(ClassRoom.objects.get(pk=pk).students.all())
+    percentages = defaultdict(list)
+    for m in Marks.objects.filter(student__in=students).select_related('subject'):
+        percentages[m.student_id].append(float(m.get_percentage()))
+    return {'students': [
+        {'student_id': s.pk, 'avg': round(sum(percentages[s.pk]) / len(percentages[s.pk]), 1)}
+        for s in students if percentages[s.pk]
+    ]}
+
+
+BUILDERS = {
+    'student': student_summary,
+    'subject': subject_summary,
+    'classroom': classroom_summary,
+}
+
+
+def _add_names(students):
+    names = {
+        user.pk: user.get_full_name()
+        for user in User.objects.filter(pk__in=[s['student_id'] for s in students]).only('first_name', 'last_name')
+    }
+    for s in students:
+        s['name'] = names.get(s['student_id'], '')
+
+
+def summary(kind, pk):
+    """The ``kind`` summary of ``pk``: the stored one while current, else computed now."""
+    stored = None
+    if versioning.is_shared():
+        stored = (
+            ReportSnapshot.objects
+            .filter(kind=kind, object_id=pk, version=versioning.get_version(kind, pk))
+            .values_list('payload', flat=True)
+            .first()
+        )
+    result = stored if stored is not None else BUILDERS[kind](pk)
+    if 'students' in result:
+        _add_names(result['students'])
+    return result
+
+
+def build(jobs):
+    """Compute and store ``[(kind, pk, version), ...]``.
+
+    ``version`` must be read before the summary is computed, so a change
+    landing in between leaves the stored copy marked as outdated.
+    """
+    for kind, pk, version in jobs:
+        ReportSnapshot.objects.update_or_create(
+            kind=kind, object_id=pk, defaults={'version': version, 'payload': BUILDERS[kind](pk)},
+        )
@@ -0,0 +1,78 @@
+"""
+Teacher scope: the subjects a teacher teaches, the classrooms they take (as
+class teacher or through one of those subjects) and the students enrolled in
+those classrooms.
+
+The querysets filter through subqueries on the membership tables, so the
+database resolves the scope as part of each query. The id sets, resolved in
+three queries and cached per teacher, serve membership checks and counts;
+their cache key includes the ``('teacher_scope', 'all')`` data version,
+which ``analytics.signals`` bumps whenever subject teachers, classroom
+subjects, enrolments or class teachers change. Without a shared cache that
+bump reaches one worker only, so the sets are resolved per call instead.
+"""
+from django.core.cache import cache
+from django.db.models import Q
+
+from accounts.models import User
+from . import versioning
+from .models import ClassRoom, Subject
+
+VERSION = ('teacher_scope', 'all')
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _subject_pks(teacher_id):
+    return Subject.teachers.through.objects.filter(user_id=teacher_id).values('subject_id')
+
+
+def _classroom_pks(teacher_id):
+    return ClassRoom.objects.filter(
+        Q(class_teacher_id=teacher_id) | Q(subjects__in=_subject_pks(teacher_id))
+    ).values('pk')
+
+
+def _student_pks(teacher_id):
+    return ClassRoom.students.through.objects.filter(classroom_id__in=_classroom_pks(teacher_id)).values('user_id')
+
+
+class TeacherScope:
+    def __init__(self, teacher_id, subject_ids, classroom_ids, student_ids):
+        self.teacher_id = teacher_id
+        self.subject_ids = frozenset(subject_ids)
+        self.classroom_ids = frozenset(classroom_ids)
+        self.student_ids = frozenset(student_ids)
+
+    @classmethod
+    def resolve(cls, teacher_id):
+        return cls(
+            teacher_id,
+            _subject_pks(teacher_id).values_list('subject_id', flat=True),
+            _classroom_pks(teacher_id).values_list('pk', flat=True),
+            _student_pks(teacher_id).values_list('user_id', flat=True),
+        )
+
+    @classmethod
+    def for_user(cls, user):
+        if not versioning.is_shared():
+            return cls.resolve(user.pk)
+        key = f'teacher_scope:{user.pk}:{versioning.get_version(*VERSION)}'
+        scope = cache.get(key)
+        if scope is None:
+            scope = cls.resolve(user.pk)
+            cache.set(key, scope, CACHE_TIMEOUT)
+        return scope
+
+    def subjects(self):
+        return Subject.objects.filter(pk__in=_subject_pks(self.teacher_id))
+
+    def classrooms(self):
+        return ClassRoom.objects.filter(pk__in=_classroom_pks(self.teacher_id))
+
+    def students(self):
+        return User.objects.filter(role='student', pk__in=_student_pks(self.teacher_id))
+
+
+def invalidate():
+    versioning.bump([VERSION])
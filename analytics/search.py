@@ -0,0 +1,123 @@
+"""
+Student search.
+
+Each student has a ``StudentSearchDocument`` holding their names, username,
+roll number, parent name and phone numbers as one lower-cased string, kept in
+sync by the handlers in ``analytics.signals``. ``search()`` ranks documents
+against a query using
+
+* PostgreSQL: trigram word similarity (typo tolerant, cut-off set by
+  ``pg_trgm.word_similarity_threshold``), served by a GIN ``gin_trgm_ops``
+  index;
+* SQLite: an FTS5 table (prefix matching, bm25 ranking) maintained by
+  triggers;
+* anything else: a plain ``icontains`` match per query word.
+
+``manage.py rebuild_student_search`` (re)indexes every student.
+"""
+import re
+
+from django.db import connection
+
+from accounts.models import User
+from .models import StudentSearchDocument
+
+FTS_TABLE = 'analytics_studentsearch_fts'
+
+
+def document_text(user):
+    """The searchable text for a student (``student_profile`` may be missing)."""
+    profile = getattr(user, 'student_profile', None)
+    parts = [user.first_name, user.last_name, user.username, user.phone]
+    if profile is not None:
+        parts += [profile.roll_number, profile.parent_name, profile.parent_phone]
+    return ' '.join(p.strip().lower() for p in parts if p and p.strip())
+
+
+def index_students(user_ids):
+    """Create, refresh or drop the search documents of the given users."""
+    user_ids = set(user_ids)
+    students = User.objects.filter(pk__in=user_ids, role='student').select_related('student_profile')
+    documents = {user.pk: document_text(user) for user in students}
+    StudentSearchDocument.objects.filter(student_id__in=user_ids - documents.keys()).delete()
+    for pk, text in documents.items():
+        StudentSearchDocument.objects.update_or_create(student_id=pk, defaults={'document': text})
+
+
+def rebuild():
+    """Reindex every student. Returns the number of documents."""
+    StudentSearchDocument.objects.all().delete()
+    StudentSearchDocument.objects.bulk_create(
+        (
+            StudentSearchDocument(student_id=user.pk, document=document_text(user))
+            for user in User.objects.filter(role='student').select_related('student_profile').iterator(chunk_size=2000)
+        ),
+        batch_size=1000,
+    )
+    return StudentSearchDocument.objects.count()
+
+
+def _words(query):
+    return re.findall(r'\w+', query.lower())[:8]
+
+
+def _documents(within):
+    documents = StudentSearchDocument.objects.all()
+    if within is not None:
+        documents = documents.filter(student__in=within.values('pk'))
+    return documents
+
+
+def _search_postgresql(query, limit, within):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    rows = (
+        _documents(within)
+        .annotate(score=TrigramWordSimilarity(query, 'document'))
+        .filter(document__trigram_word_similar=query)
+        .order_by('-score')
+        .values_list('student_id', 'score')[:limit]
+    )
+    return list(rows)
+
+
+def _search_sqlite(words, limit, within):
+    match = ' '.join(f'"{w}"*' for w in words)
+    restrict, params = '', []
+    if within is not None:
+        sql, params = within.values('pk').query.sql_with_params()
+        restrict = f'AND rowid IN ({sql}) '
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT rowid, -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s {restrict}ORDER BY bm25({FTS_TABLE}) LIMIT %s',
+            [match, *params, limit],
+        )
+        return cursor.fetchall()
+
+
+def _search_fallback(words, limit, within):
+    documents = _documents(within)
+    for w in words:
+        documents = documents.filter(document__icontains=w)
+    return [(pk, 1.0) for pk in documents.values_list('student_id', flat=True)[:limit]]
+
+
+def search(query, limit=20, within=None):
+    """Best matching students for ``query`` as ``[(user_id, score), ...]``, best first.
+
+    ``within`` (a ``User`` queryset) restricts the ranking to those students,
+    inside the search query, so the ``limit`` best are taken among them.
+    """
+    words = _words(query)
+    if not words:
+        return []
+    if connection.vendor == 'postgresql':
+        return _search_postgresql(' '.join(words), limit, within)
+    if connection.vendor == 'sqlite':
+        return _search_sqlite(words, limit, within)
+    return _search_fallback(words, limit, within)
+
+
+def search_ids(query, limit=20, within=None):
+    return [pk for pk, _ in search(query, limit, within)]
@@ -0,0 +1,284 @@
+"""
+Signal handlers keeping derived data (the marks cube, data version counters,
+search documents, the change log) in step with writes, creating upcoming Attendance
+partitions after migrate, flushing connection pool counters and request
+metrics into the shared counters, and adding the slow-query log to new
+database connections.
+"""
+import time
+
+from django.conf import settings
+from django.core.signals import request_finished
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import changefeed, cube, metrics, partitions, scope, search, slow_queries, versioning
+from accounts.models import User
+from .models import (
+    Assessment, AssessmentSubmission, Attendance, ClassRoom, Marks, Notification, StudentProfile, Subject,
+)
+
+
+# --- Marks -> cube ---------------------------------------------------------
+
+@receiver(pre_save, sender=Marks)
+def _marks_pre_save(sender, instance, raw=False, **kwargs):
+    instance._cube_old_rows = []
+    if instance.pk and not raw:
+        instance._cube_old_rows = list(cube.marks_rows(pk=instance.pk))
+
+
+@receiver(post_save, sender=Marks)
+def _marks_post_save(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    cube.apply(getattr(instance, '_cube_old_rows', []), sign=-1)
+    cube.apply([cube.mark_row(instance)])
+
+
+@receiver(post_delete, sender=Marks)
+def _marks_post_delete(sender, instance, **kwargs):
+    cube.apply([cube.mark_row(instance)], sign=-1)
+
+
+# --- Changes that move existing marks between cells ---------------------------
+# The old contribution is removed before the change and re-added after it, so
+# marks are re-resolved against the new classroom membership / max marks.
+
+def _detach(instance, **filters):
+    instance._cube_filters = filters
+    cube.apply(cube.marks_rows(**filters), sign=-1)
+
+
+def _reattach(instance):
+    filters = getattr(instance, '_cube_filters', None)
+    if filters:
+        instance._cube_filters = None
+        cube.apply(cube.marks_rows(**filters))
+
+
+def _classroom_students(classroom_ids):
+    return list(
+        ClassRoom.students.through.objects
+        .filter(classroom_id__in=classroom_ids)
+        .values_list('user_id', flat=True)
+        .distinct()
+    )
+
+
+@receiver(m2m_changed, sender=ClassRoom.students.through)
+def _enrolment_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('pre_'):
+        if reverse:
+            student_ids = [instance.pk]
+        elif action == 'pre_clear':
+            student_ids = _classroom_students([instance.pk])
+        else:
+            student_ids = list(pk_set)
+        _detach(instance, student_id__in=student_ids)
+    else:
+        _reattach(instance)
+
+
+@receiver(m2m_changed, sender=ClassRoom.subjects.through)
+def _classroom_subjects_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action.startswith('pre_'):
+        if not reverse:
+            classroom_ids = [instance.pk]
+        elif action == 'pre_clear':
+            classroom_ids = list(instance.classrooms.values_list('pk', flat=True))
+        else:
+            classroom_ids = list(pk_set)
+        _detach(instance, student_id__in=_classroom_students(classroom_ids))
+    else:
+        _reattach(instance)
+
+
+@receiver(pre_save, sender=ClassRoom)
+def _classroom_pre_save(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        old_year = ClassRoom.objects.filter(pk=instance.pk).values_list('academic_year', flat=True).first()
+        if old_year is not None and old_year != instance.academic_year:
+            _detach(instance, student_id__in=_classroom_students([instance.pk]))
+
+
+@receiver(pre_delete, sender=ClassRoom)
+def _classroom_pre_delete(sender, instance, **kwargs):
+    _detach(instance, student_id__in=_classroom_students([instance.pk]))
+
+
+@receiver(post_save, sender=ClassRoom)
+@receiver(post_delete, sender=ClassRoom)
+def _classroom_changed(sender, instance, **kwargs):
+    _reattach(instance)
+
+
+@receiver(pre_save, sender=Subject)
+def _subject_pre_save(sender, instance, raw=False, **kwargs):
+    if instance.pk and not raw:
+        old_max = Subject.objects.filter(pk=instance.pk).values_list('max_marks', flat=True).first()
+        if old_max is not None and old_max != instance.max_marks:
+            _detach(instance, subject_id=instance.pk)
+
+
+@receiver(post_save, sender=Subject)
+def _subject_post_save(sender, instance, **kwargs):
+    _reattach(instance)
+
+
+# --- Data versions (fragment cache invalidation) -----------------------------
+
+def _touched(student_id, subject_id, classroom_ids=()):
+    pairs = [versioning.SCHOOL, ('student', student_id)] + ([('subject', subject_id)] if subject_id else [])
+    classroom_ids = set(classroom_ids) | set(
+        ClassRoom.students.through.objects.filter(user_id=student_id).values_list('classroom_id', flat=True)
+    )
+    return pairs + [('classroom', pk) for pk in classroom_ids]
+
+
+def _record_touched(instance):
+    if isinstance(instance, AssessmentSubmission):
+        assessment = Assessment.objects.filter(pk=instance.assessment_id).values('subject_id', 'classroom_id').first()
+        pairs = [('assessment', instance.assessment_id)]
+        if assessment is None:
+            return pairs + _touched(instance.student_id, None)
+        return pairs + _touched(instance.student_id, assessment['subject_id'], [assessment['classroom_id']])
+    return _touched(instance.student_id, instance.subject_id)
+
+
+@receiver(pre_save, sender=Marks)
+@receiver(pre_save, sender=Attendance)
+@receiver(pre_save, sender=AssessmentSubmission)
+def _versioned_pre_save(sender, instance, raw=False, **kwargs):
+    instance._versions_old = []
+    if instance.pk and not raw:
+        old = sender.objects.filter(pk=instance.pk).first()
+        if old is not None:
+            instance._versions_old = _record_touched(old)
+
+
+@receiver(post_save, sender=Marks)
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=AssessmentSubmission)
+@receiver(post_delete, sender=Marks)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=AssessmentSubmission)
+def _versioned_changed(sender, instance, **kwargs):
+    versioning.bump(getattr(instance, '_versions_old', []) + _record_touched(instance))
+
+
+@receiver(m2m_changed, sender=ClassRoom.students.through)
+def _enrolment_versions(sender, instance, action, reverse, pk_set, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        entity = 'student' if reverse else 'classroom'
+        other = 'classroom' if reverse else 'student'
+        versioning.bump(
+            [versioning.SCHOOL, (entity, instance.pk)] + [(other, pk) for pk in pk_set or ()]
+        )
+
+
+@receiver(post_save, sender=Subject)
+def _subject_versions(sender, instance, created=False, **kwargs):
+    # Names show up on every student page listing the subject's marks or
+    # attendance; max marks change the percentages of those marks, classroom
+    # averages included.
+    pairs = [versioning.SCHOOL, ('subject', instance.pk)]
+    if not created:
+        marked = Marks.objects.filter(subject=instance).values('student_id')
+        attended = Attendance.objects.filter(subject=instance).values_list('student_id', flat=True).distinct()
+        pairs += [('student', pk) for pk in set(marked.values_list('student_id', flat=True)) | set(attended)]
+        pairs += [
+            ('classroom', pk) for pk in
+            ClassRoom.students.through.objects.filter(user_id__in=marked).values_list('classroom_id', flat=True).distinct()
+        ]
+    versioning.bump(pairs)
+
+
+@receiver(post_save, sender=Assessment)
+def _assessment_versions(sender, instance, **kwargs):
+    versioning.bump([versioning.SCHOOL, ('assessment', instance.pk)])
+
+
+@receiver(post_save, sender=User)
+def _user_versions(sender, instance, update_fields=None, **kwargs):
+    # Names and roles appear in page chrome and on other users' reports.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    versioning.bump([('user', instance.pk), ('student', instance.pk), versioning.USER_NAMES])
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def _notification_versions(sender, instance, **kwargs):
+    versioning.bump([('notifications', instance.recipient_id)])
+
+
+@receiver(m2m_changed, sender=Subject.teachers.through)
+@receiver(m2m_changed, sender=ClassRoom.subjects.through)
+@receiver(m2m_changed, sender=ClassRoom.students.through)
+def _scope_membership_changed(sender, action, **kwargs):
+    if action.startswith('post_'):
+        scope.invalidate()
+
+
+@receiver(post_save, sender=ClassRoom)
+@receiver(post_delete, sender=ClassRoom)
+@receiver(post_delete, sender=Subject)
+def _scope_changed(sender, **kwargs):
+    scope.invalidate()
+
+
+# --- Student search ---------------------------------------------------------
+
+@receiver(post_save, sender=User)
+@receiver(post_save, sender=StudentProfile)
+@receiver(post_delete, sender=StudentProfile)
+def _student_search_changed(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    user_id = instance.pk if sender is User else instance.user_id
+    # After commit: a profile deleted along with its user must not re-create
+    # the user's document.
+    transaction.on_commit(lambda: search.index_students([user_id]))
+
+
+# --- Change feed ------------------------------------------------------------
+
+@receiver(post_save, sender=Marks)
+@receiver(post_save, sender=Attendance)
+@receiver(post_save, sender=AssessmentSubmission)
+def _log_saved(sender, instance, created=False, using=None, **kwargs):
+    changefeed.record(instance, 'create' if created else 'update', using)
+
+
+@receiver(post_delete, sender=Marks)
+@receiver(post_delete, sender=Attendance)
+@receiver(post_delete, sender=AssessmentSubmission)
+def _log_deleted(sender, instance, using=None, **kwargs):
+    changefeed.record(instance, 'delete', using)
+
+
+@receiver(post_migrate)
+def _attendance_partitions(sender, app_config=None, using=DEFAULT_DB_ALIAS, **kwargs):
+    if app_config is not None and app_config.name == 'analytics' and partitions.is_partitioned(using):
+        partitions.ensure_partitions(using=using)
+
+
+_metrics_flushed = time.monotonic()
+
+
+@receiver(request_finished)
+def _flush_metrics(sender, **kwargs):
+    global _metrics_flushed
+    if time.monotonic() - _metrics_flushed < settings.METRICS_FLUSH_INTERVAL:
+        return
+    _metrics_flushed = time.monotonic()
+    metrics.record_pool_stats()
+    metrics.flush()
+
+
+@receiver(connection_created)
+def _log_slow_queries(sender, connection, **kwargs):
+    slow_queries.install(connection)
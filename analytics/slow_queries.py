@@ -0,0 +1,180 @@
+"""
+Slow-query log.
+
+Every database connection gets an execute wrapper (installed from the
+``connection_created`` signal) that times each statement. Statements slower
+than ``SLOW_QUERY_MS`` are handed to a background thread, which aggregates
+them per fingerprint (the SQL with literals and placeholder lists collapsed)
+into ``SlowQuery``: count, total and maximum time, plus the view and function
+that ran the slowest execution. For new fingerprints and new maximums it
+captures the query plan (``EXPLAIN`` without ``ANALYZE``, so nothing is run
+again) on its own connection, after the request has moved on.
+
+Fast statements only pay for two ``perf_counter`` calls. A full queue (the
+database being slow across the board) drops entries rather than block
+requests; entries still queued when a process exits are lost.
+"""
+import hashlib
+import logging
+import queue
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, connections
+from django.db.models import F
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Pending slow statements; put_nowait drops them once this many are waiting.
+QUEUE_SIZE = 1000
+
+EXPLAIN = {
+    'postgresql': 'EXPLAIN (ANALYZE off) ',
+    'sqlite': 'EXPLAIN QUERY PLAN ',
+}
+
+_string = re.compile(r"'(?:[^']|'')*'")
+_number = re.compile(r'(?<![\w"])-?\d+(?:\.\d+)?\b')
+_placeholder_list = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_values = re.compile(r'\bVALUES\s*\(.*\)', re.S | re.I)
+_space = re.compile(r'\s+')
+
+_queue = queue.Queue(maxsize=QUEUE_SIZE)
+_worker = None
+_worker_lock = threading.Lock()
+_project_modules = None
+
+
+def normalize(sql):
+    """``sql`` with literals, ``IN`` lists and ``VALUES`` rows collapsed to placeholders."""
+    sql = sql.replace('%s', '?')
+    sql = _string.sub('?', sql)
+    sql = _number.sub('?', sql)
+    sql = _placeholder_list.sub('(...)', sql)
+    sql = _values.sub('VALUES (...)', sql)
+    return _space.sub(' ', sql).strip()
+
+
+def fingerprint(statement):
+    return hashlib.md5(statement.encode()).hexdigest()
+
+
+def _is_project(module):
+    global _project_modules
+    if _project_modules is None:
+        _project_modules = tuple(
+            f'{app.name}.' for app in apps.get_app_configs() if Path(app.path).is_relative_to(settings.BASE_DIR)
+        ) + ('student_analytics.',)
+    return module.startswith(_project_modules) and module != __name__
+
+
+def callers():
+    """The outermost view or management command and the innermost project
+    function on the current stack, as ``module.function`` names."""
+    view = caller = ''
+    frame = sys._getframe(2)
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if _is_project(module):
+            name = f'{module}.{frame.f_code.co_qualname}'
+            caller = caller or f'{name}:{frame.f_lineno}'
+            if module.endswith(('.views', '.async_views')) or '.management.commands.' in module:
+                view = name
+        frame = frame.f_back
+    return view, caller
+
+
+def timed_execute(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        if ms >= settings.SLOW_QUERY_MS and threading.current_thread() is not _worker:
+            _submit(context['connection'], sql, params, many, ms)
+
+
+def install(connection):
+    """Add the slow-query wrapper to ``connection`` (once)."""
+    if settings.SLOW_QUERY_MS and timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(timed_execute)
+
+
+def _submit(connection, sql, params, many, ms):
+    view, caller = callers()
+    entry = {
+        'alias': connection.alias, 'sql': sql, 'params': None if many else params, 'ms': ms,
+        'view': view, 'caller': caller, 'at': timezone.now(),
+    }
+    try:
+        _queue.put_nowait(entry)
+    except queue.Full:
+        return
+    _ensure_worker()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        # A worker started before a fork does not exist in the child.
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name='slow-query-log', daemon=True)
+            _worker.start()
+
+
+def _run():
+    while True:
+        entry = _queue.get()
+        try:
+            record(entry)
+        except Exception:
+            logger.exception('Could not record slow query %.60r', entry['sql'])
+        finally:
+            close_old_connections()
+
+
+def record(entry):
+    """Add one slow execution to its fingerprint's totals; capture a plan if it is the slowest."""
+    from .models import SlowQuery
+
+    statement = normalize(entry['sql'])
+    key = fingerprint(statement)
+    slowest = {
+        'max_ms': entry['ms'], 'database': entry['alias'], 'sql': entry['sql'],
+        'view': entry['view'], 'caller': entry['caller'],
+    }
+    totals = SlowQuery.objects.filter(fingerprint=key)
+    if not totals.update(count=F('count') + 1, total_ms=F('total_ms') + entry['ms'], last_seen=entry['at']):
+        try:
+            SlowQuery.objects.create(
+                fingerprint=key, statement=statement, count=1, total_ms=entry['ms'], last_seen=entry['at'], **slowest,
+            )
+            new_max = True
+        except IntegrityError:  # another process created it meanwhile
+            return record(entry)
+    else:
+        new_max = totals.filter(max_ms__lt=entry['ms']).update(**slowest)
+    if new_max and entry['params'] is not None:
+        totals.update(plan=explain(entry['alias'], entry['sql'], entry['params']), plan_at=entry['at'])
+
+
+def explain(alias, sql, params):
+    """The plan ``alias`` would use for ``sql``; only SELECTs are explained."""
+    connection = connections[alias]
+    prefix = EXPLAIN.get(connection.vendor)
+    if prefix is None or not sql.lstrip().upper().startswith(('SELECT', 'WITH')):
+        return ''
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(prefix + sql, params)
+            return '\n'.join(str(row[-1]) for row in cursor.fetchall())
+    except Exception as e:
+        return f'EXPLAIN failed: {e}'
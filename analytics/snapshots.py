@@ -0,0 +1,216 @@
+"""
+Columnar snapshots of Marks, Attendance and AssessmentSubmission for offline
+analytics.
+
+``export()`` streams one table and academic year out of the database in
+chunks into a Parquet (zstd) or Arrow IPC file, laid out as
+``<directory>/<academic year>/<table>.parquet|.arrow``. Repeated labels
+(subject codes, exam types, roll numbers, statuses) are dictionary encoded
+against dictionaries built once per file, so they cost a small integer per row.
+
+``read()`` loads snapshots back without touching the database: Arrow files
+are memory-mapped and read zero-copy (they are written uncompressed for that
+reason), Parquet files are memory-mapped and decoded.
+
+    from analytics import snapshots
+    marks = snapshots.read('snapshots', 'marks', ['2024-2025'])
+    marks.group_by('subject_code').aggregate([('marks_obtained', 'mean')])
+"""
+import os
+from collections import namedtuple
+from datetime import datetime, timezone
+from pathlib import Path
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+from django.db.models import Max, Min
+
+from .cube import academic_year_for
+from .models import Assessment, Attendance, AssessmentSubmission, ExamType, Marks, StudentProfile, Subject
+from .partitions import academic_year_range
+
+FORMATS = {'parquet': '.parquet', 'arrow': '.arrow'}
+
+# ``dictionary``: callable returning every value the column can hold.
+Column = namedtuple('Column', 'name lookup type dictionary', defaults=[None])
+
+
+def _choices(choices):
+    return lambda: [value for value, _ in choices]
+
+
+def _subject_codes():
+    return list(Subject.objects.values_list('code', flat=True))
+
+
+def _roll_numbers():
+    return list(StudentProfile.objects.values_list('roll_number', flat=True))
+
+
+LABEL = pa.dictionary(pa.int32(), pa.string())
+TIMESTAMP = pa.timestamp('us', tz='UTC')
+SCORE = pa.decimal128(5, 2)
+
+Table = namedtuple('Table', 'model date_lookup columns')
+
+TABLES = {
+    'marks': Table(Marks, 'date', [
+        Column('id', 'id', pa.int64()),
+        Column('student_id', 'student_id', pa.int64()),
+        Column('roll_number', 'student__student_profile__roll_number', LABEL, _roll_numbers),
+        Column('subject_id', 'subject_id', pa.int32()),
+        Column('subject_code', 'subject__code', LABEL, _subject_codes),
+        Column('max_marks', 'subject__max_marks', pa.int32()),
+        Column('exam_type_id', 'exam_type_id', pa.int32()),
+        Column('exam_type', 'exam_type__name', LABEL, lambda: list(ExamType.objects.values_list('name', flat=True))),
+        Column('marks_obtained', 'marks_obtained', SCORE),
+        Column('date', 'date', pa.date32()),
+        Column('recorded_by_id', 'recorded_by_id', pa.int64()),
+        Column('created_at', 'created_at', TIMESTAMP),
+    ]),
+    'attendance': Table(Attendance, 'date', [
+        Column('id', 'id', pa.int64()),
+        Column('student_id', 'student_id', pa.int64()),
+        Column('roll_number', 'student__student_profile__roll_number', LABEL, _roll_numbers),
+        Column('subject_id', 'subject_id', pa.int32()),
+        Column('subject_code', 'subject__code', LABEL, _subject_codes),
+        Column('date', 'date', pa.date32()),
+        Column('status', 'status', LABEL, _choices(Attendance.STATUS_CHOICES)),
+        Column('marked_by_id', 'marked_by_id', pa.int64()),
+    ]),
+    'submissions': Table(AssessmentSubmission, 'assessment__due_date', [
+        Column('id', 'id', pa.int64()),
+        Column('assessment_id', 'assessment_id', pa.int64()),
+        Column('assessment_type', 'assessment__assessment_type', LABEL, _choices(Assessment.ASSESSMENT_TYPES)),
+        Column('subject_id', 'assessment__subject_id', pa.int32()),
+        Column('subject_code', 'assessment__subject__code', LABEL, _subject_codes),
+        Column('classroom_id', 'assessment__classroom_id', pa.int32()),
+        Column('student_id', 'student_id', pa.int64()),
+        Column('roll_number', 'student__student_profile__roll_number', LABEL, _roll_numbers),
+        Column('score', 'score', SCORE),
+        Column('max_score', 'assessment__max_score', pa.int32()),
+        Column('due_date', 'assessment__due_date', pa.date32()),
+        Column('submitted_at', 'submitted_at', TIMESTAMP),
+        Column('graded_at', 'graded_at', TIMESTAMP),
+        Column('status', 'status', LABEL, _choices(AssessmentSubmission._meta.get_field('status').choices)),
+    ]),
+}
+
+
+def path_for(directory, table, academic_year, fmt='parquet'):
+    return Path(directory) / academic_year / f'{table}{FORMATS[fmt]}'
+
+
+def academic_years(table):
+    """Academic years spanned by the rows of ``table``, oldest first."""
+    spec = TABLES[table]
+    span = spec.model.objects.aggregate(first=Min(spec.date_lookup), last=Max(spec.date_lookup))
+    if span['first'] is None:
+        return []
+    first, last = academic_year_for(span['first']), academic_year_for(span['last'])
+    start, stop = int(first[:4]), int(last[:4])
+    return [f'{year}-{year + 1}' for year in range(start, stop + 1)]
+
+
+def _encoder(column):
+    """Turn a chunk of Python values into an Arrow array for ``column``."""
+    if column.dictionary is None:
+        return lambda values: pa.array(values, type=column.type)
+    dictionary = pa.array(column.dictionary(), type=pa.string())
+    index = {value: i for i, value in enumerate(dictionary.to_pylist())}
+
+    def encode(values):
+        try:
+            indices = [None if v is None else index[v] for v in values]
+        except KeyError as exc:
+            # A label created after the dictionary was built. An Arrow IPC
+            # file cannot replace its dictionary mid-file, so fail rather
+            # than write the row out as null.
+            raise ValueError(f'{column.name}: {exc.args[0]!r} is not in the snapshot dictionary; re-run the export') from None
+        return pa.DictionaryArray.from_arrays(pa.array(indices, type=pa.int32()), dictionary)
+
+    return encode
+
+
+def export(table, academic_year, directory, fmt='parquet', chunk_size=65536):
+    """Write the rows of ``table`` dated in ``academic_year``. Returns ``(path, rows)``."""
+    spec = TABLES[table]
+    start, end = academic_year_range(academic_year)
+    schema = pa.schema(
+        [pa.field(c.name, c.type) for c in spec.columns],
+        metadata={
+            'table': table,
+            'academic_year': academic_year,
+            'exported_at': datetime.now(timezone.utc).isoformat(),
+        },
+    )
+    encoders = [_encoder(c) for c in spec.columns]
+    rows = (
+        spec.model.objects
+        .filter(**{f'{spec.date_lookup}__gte': start, f'{spec.date_lookup}__lt': end})
+        .order_by(spec.date_lookup, 'id')
+        .values_list(*(c.lookup for c in spec.columns))
+        .iterator(chunk_size=chunk_size)
+    )
+
+    path = path_for(directory, table, academic_year, fmt)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_name(path.name + '.partial')
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(partial, schema, compression='zstd')
+    else:
+        writer = pa.ipc.new_file(str(partial), schema)
+
+    total = 0
+    chunk = []
+    try:
+        with writer:
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_size:
+                    writer.write_batch(_batch(chunk, encoders, schema))
+                    total += len(chunk)
+                    chunk = []
+            if chunk or not total:
+                writer.write_batch(_batch(chunk, encoders, schema))
+                total += len(chunk)
+    except BaseException:
+        partial.unlink(missing_ok=True)
+        raise
+    os.replace(partial, path)
+    return path, total
+
+
+def _batch(chunk, encoders, schema):
+    columns = list(zip(*chunk)) if chunk else [()] * len(encoders)
+    return pa.RecordBatch.from_arrays([encode(list(values)) for encode, values in zip(encoders, columns)], schema=schema)
+
+
+def available(directory, table):
+    """``{academic_year: path}`` of the snapshots of ``table``; Arrow wins over Parquet."""
+    found = {}
+    for fmt in ('parquet', 'arrow'):
+        for path in Path(directory).glob(f'*/{table}{FORMATS[fmt]}'):
+            found[path.parent.name] = path
+    return dict(sorted(found.items()))
+
+
+def _read_file(path, columns=None):
+    if path.suffix == '.arrow':
+        data = pa.ipc.open_file(pa.memory_map(str(path))).read_all()
+        return data.select(columns) if columns else data
+    return pq.read_table(path, columns=columns, memory_map=True)
+
+
+def read(directory, table, academic_years=None, columns=None):
+    """Load the snapshots of ``table`` (all years, or ``academic_years``) as one ``pyarrow.Table``."""
+    found = available(directory, table)
+    if academic_years is not None:
+        missing = set(academic_years) - found.keys()
+        if missing:
+            raise FileNotFoundError(f"No {table} snapshot for {', '.join(sorted(missing))} in {directory}")
+        found = {year: found[year] for year in academic_years}
+    parts = [_read_file(path, columns) for path in found.values()]
+    if not parts:
+        raise FileNotFoundError(f'No {table} snapshots in {directory}')
+    return pa.concat_tables([part.replace_schema_metadata(None) for part in parts])
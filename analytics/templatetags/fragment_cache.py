@@ -0,0 +1,68 @@
+"""
+``{% versioned_cache %}``: template fragment caching keyed by data versions.
+
+    {% load fragment_cache %}
+    {% versioned_cache 'student_marks' student=student.pk %}
+        ... expensive table ...
+    {% endversioned_cache %}
+
+Every ``entity=pk`` argument adds that entity's current version (see
+``analytics.versioning``) to the cache key; extra positional arguments are
+added as-is. Hits and misses are counted per fragment name. Fragments are
+not cached while a replica may still lag behind their latest change, nor at
+all unless the version counters are shared by every worker.
+"""
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+
+from analytics import metrics, versioning
+from student_analytics.db_router import replica_may_be_behind
+
+register = template.Library()
+
+
+class VersionedCacheNode(template.Node):
+    def __init__(self, nodelist, name, entities, vary):
+        self.nodelist = nodelist
+        self.name = name
+        self.entities = entities
+        self.vary = vary
+
+    def render(self, context):
+        if not versioning.is_shared():
+            # Other workers would never see this fragment's versions change.
+            return self.nodelist.render(context)
+        name = self.name.resolve(context)
+        entities = [(entity, value.resolve(context)) for entity, value in self.entities]
+        if replica_may_be_behind(versioning.last_modified(entities).timestamp()):
+            # Read from a replica that may not have this version's data yet.
+            return self.nodelist.render(context)
+        key = versioning.fragment_key(name, entities, [v.resolve(context) for v in self.vary])
+        content = cache.get(key)
+        if content is None:
+            metrics.incr('fragment_cache_misses', fragment=name)
+            content = self.nodelist.render(context)
+            cache.set(key, content, settings.FRAGMENT_CACHE_TIMEOUT)
+        else:
+            metrics.incr('fragment_cache_hits', fragment=name)
+        return content
+
+
+@register.tag('versioned_cache')
+def do_versioned_cache(parser, token):
+    bits = token.split_contents()
+    entities, vary = [], []
+    for bit in bits[2:]:
+        entity, sep, value = bit.partition('=')
+        if sep:
+            entities.append((entity, parser.compile_filter(value)))
+        else:
+            vary.append(parser.compile_filter(bit))
+    if len(bits) < 2 or not entities:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' takes a fragment name and at least one entity=pk argument."
+        )
+    nodelist = parser.parse(('endversioned_cache',))
+    parser.delete_first_token()
+    return VersionedCacheNode(nodelist, parser.compile_filter(bits[1]), entities, vary)
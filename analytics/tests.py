@@ -0,0 +1,223 @@
+import threading
+import unittest
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.models import User
+from . import changefeed, cube
+from .models import ChangeLog, ClassRoom, ExamType, Marks, MarksCubeCell, Subject
+from .scope import TeacherScope
+
+
+def _cells():
+    return sorted(
+        (c.academic_year, c.month, c.subject_id, c.classroom_id, c.exam_type_id,
+         c.count, round(c.total, 6), round(c.total_sq, 6))
+        for c in MarksCubeCell.objects.all()
+    )
+
+
+class CubeTests(TestCase):
+    """The incrementally maintained cube always equals a full rebuild."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        cls.student = User.objects.create_user('student', password='x', role='student')
+        cls.maths = Subject.objects.create(name='Maths', code='MATH', max_marks=100)
+        cls.physics = Subject.objects.create(name='Physics', code='PHY', max_marks=50)
+        cls.midterm = ExamType.objects.create(name='Mid-term', weightage=Decimal('0.5'))
+        cls.room = ClassRoom.objects.create(name='10', section='A', academic_year='2024-2025')
+        cls.room.students.add(cls.student)
+        cls.room.subjects.add(cls.maths)
+
+    def assertMatchesRebuild(self):
+        incremental = _cells()
+        cube.rebuild()
+        self.assertEqual(incremental, _cells())
+
+    def add_mark(self, subject, obtained, day=date(2024, 9, 10)):
+        return Marks.objects.create(
+            student=self.student, subject=subject, exam_type=self.midterm,
+            marks_obtained=Decimal(obtained), date=day, recorded_by=self.teacher,
+        )
+
+    def test_create(self):
+        self.add_mark(self.maths, '80')
+        self.add_mark(self.physics, '20', date(2024, 10, 3))
+        self.assertEqual(MarksCubeCell.objects.count(), 2)
+        self.assertMatchesRebuild()
+
+    def test_update(self):
+        mark = self.add_mark(self.maths, '80')
+        mark.marks_obtained = Decimal('65')
+        mark.date = date(2025, 2, 1)
+        mark.save()
+        self.assertMatchesRebuild()
+
+        mark.subject = self.physics
+        mark.marks_obtained = Decimal('40')
+        mark.save()
+        self.assertMatchesRebuild()
+
+    def test_delete(self):
+        kept = self.add_mark(self.maths, '80')
+        self.add_mark(self.maths, '70', date(2024, 9, 20)).delete()
+        self.assertMatchesRebuild()
+        kept.delete()
+        self.assertFalse(MarksCubeCell.objects.exists())
+
+    def test_max_marks_and_enrolment_changes(self):
+        self.add_mark(self.maths, '80')
+        self.add_mark(self.physics, '20')
+        self.maths.max_marks = 80
+        self.maths.save()
+        self.assertMatchesRebuild()
+
+        other = ClassRoom.objects.create(name='10', section='B', academic_year='2024-2025')
+        other.subjects.add(self.physics)
+        other.students.add(self.student)
+        self.assertMatchesRebuild()
+        self.room.students.remove(self.student)
+        self.assertMatchesRebuild()
+
+
+class ChangeFeedFixture:
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        cls.subject = Subject.objects.create(name='Maths', code='MATH', max_marks=100)
+        cls.exam_type = ExamType.objects.create(name='Mid-term', weightage=Decimal('0.5'))
+
+    def add_mark(self, name, day=date(2024, 9, 10)):
+        return Marks.objects.create(
+            student=User.objects.create_user(name, password='x', role='student'),
+            subject=self.subject, exam_type=self.exam_type,
+            marks_obtained=Decimal('50'), date=day, recorded_by=self.teacher,
+        )
+
+
+@unittest.skipIf(connection.vendor == 'postgresql', 'PostgreSQL passes gaps by transaction id')
+class ChangeFeedSettleTests(ChangeFeedFixture, TestCase):
+    """Without transaction ids a gap is passed once the entry after it is old enough."""
+
+    def test_read_stops_before_a_fresh_gap(self):
+        start = ChangeLog.objects.order_by('pk').values_list('pk', flat=True).last() or 0
+        for name in ('s1', 's2', 's3'):
+            self.add_mark(name)
+        first, gap, after_gap = ChangeLog.objects.filter(pk__gt=start).order_by('pk')
+        gap.delete()
+
+        entries, position = changefeed.read(after=start)
+        self.assertEqual([e.pk for e in entries], [first.pk])
+        self.assertEqual(position, first.pk)
+
+        with self.settings(CHANGEFEED_SETTLE_SECONDS=10):
+            ChangeLog.objects.filter(pk=after_gap.pk).update(changed_at=timezone.now() - timedelta(seconds=11))
+            entries, position = changefeed.read(after=position)
+        self.assertEqual([e.pk for e in entries], [after_gap.pk])
+        self.assertEqual(position, after_gap.pk)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'needs concurrent write transactions')
+class ChangeFeedGapTests(ChangeFeedFixture, TransactionTestCase):
+    """An entry committed behind a still-open transaction's entry is held back."""
+
+    def setUp(self):
+        self.setUpTestData()
+
+    def test_read_holds_entries_behind_an_open_transaction(self):
+        start = ChangeLog.objects.order_by('pk').values_list('pk', flat=True).last() or 0
+        recorded, release = threading.Event(), threading.Event()
+
+        def slow_writer():
+            try:
+                with transaction.atomic():
+                    self.add_mark('slow')
+                    recorded.set()
+                    release.wait(10)
+            finally:
+                connection.close()
+
+        writer = threading.Thread(target=slow_writer)
+        writer.start()
+        try:
+            self.assertTrue(recorded.wait(10))
+            self.add_mark('fast', date(2024, 10, 10))  # another cube cell, so no row lock wait
+            self.assertEqual(ChangeLog.objects.filter(pk__gt=start).count(), 1)
+
+            entries, position = changefeed.read(after=start)
+            self.assertEqual((entries, position), ([], start))
+        finally:
+            release.set()
+            writer.join()
+
+        entries, position = changefeed.read(after=start)
+        self.assertEqual(len(entries), 2)
+        self.assertEqual(position, entries[-1].pk)
+
+
+class TeacherScopeTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.teacher = User.objects.create_user('teacher', password='x', role='teacher')
+        other_teacher = User.objects.create_user('other', password='x', role='teacher')
+        cls.mine = User.objects.create_user('mine', password='x', role='student')
+        cls.theirs = User.objects.create_user('theirs', password='x', role='student')
+        cls.maths = Subject.objects.create(name='Maths', code='MATH', max_marks=100)
+        cls.maths.teachers.add(cls.teacher)
+        cls.physics = Subject.objects.create(name='Physics', code='PHY', max_marks=100)
+        cls.physics.teachers.add(other_teacher)
+        cls.exam_type = ExamType.objects.create(name='Mid-term', weightage=Decimal('0.5'))
+
+        cls.my_room = ClassRoom.objects.create(name='10', section='A', academic_year='2024-2025')
+        cls.my_room.subjects.add(cls.maths)
+        cls.my_room.students.add(cls.mine)
+        cls.their_room = ClassRoom.objects.create(
+            name='10', section='B', academic_year='2024-2025', class_teacher=other_teacher,
+        )
+        cls.their_room.subjects.add(cls.physics)
+        cls.their_room.students.add(cls.theirs)
+
+    def setUp(self):
+        self.client.force_login(self.teacher)
+
+    def test_scope(self):
+        scope = TeacherScope.for_user(self.teacher)
+        self.assertEqual(scope.student_ids, {self.mine.pk})
+        self.assertEqual(scope.classroom_ids, {self.my_room.pk})
+        self.assertEqual(list(scope.students()), [self.mine])
+        self.assertEqual(list(scope.classrooms()), [self.my_room])
+        self.assertEqual(list(scope.subjects()), [self.maths])
+
+    def test_scope_follows_enrolment(self):
+        self.my_room.students.add(self.theirs)
+        self.assertIn(self.theirs.pk, TeacherScope.for_user(self.teacher).student_ids)
+        self.my_room.students.remove(self.theirs)
+        self.assertNotIn(self.theirs, TeacherScope.for_user(self.teacher).students())
+
+    def test_student_list(self):
+        response = self.client.get(reverse('student_list'))
+        self.assertEqual([row['student'] for row in response.context['student_data']], [self.mine])
+        self.assertEqual(list(response.context['classrooms']), [self.my_room])
+
+    def test_cannot_record_marks_out_of_scope(self):
+        response = self.client.post(reverse('add_marks'), {
+            'student': self.theirs.pk, 'subject': self.physics.pk, 'exam_type': self.exam_type.pk,
+            'marks_obtained': '50', 'date': '2024-09-10',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.context['form'].errors), {'student', 'subject'})
+        self.assertFalse(Marks.objects.exists())
+
+    def test_classroom_report_cards(self):
+        response = self.client.get(reverse('classroom_report_cards', args=[self.their_room.pk]))
+        self.assertRedirects(response, reverse('student_list'), fetch_redirect_response=False)
+        response = self.client.get(reverse('classroom_report_cards', args=[self.my_room.pk]))
+        self.assertEqual(response.status_code, 200)
+        b''.join(response.streaming_content)
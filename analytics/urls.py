@@ -1,8 +1,12 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Under ASGI the dashboard and chart APIs are served by their async versions.
+dashboard_views = async_views if settings.ASYNC_VIEWS else views
 
 urlpatterns = [
-    path('dashboard/', views.dashboard, name='dashboard'),
+    path('dashboard/', dashboard_views.dashboard, name='dashboard'),
     path('students/', views.student_list, name='student_list'),
     path('students/<int:pk>/', views.student_detail, name='student_detail'),
     path('marks/', views.marks_list, name='marks_list'),
@@ -13,8 +17,14 @@ urlpatterns = [
     path('assessments/create/', views.create_assessment, name='create_assessment'),
     path('assessments/<int:pk>/', views.assessment_detail, name='assessment_detail'),
     path('reports/subject/<int:pk>/', views.subject_report, name='subject_report'),
+    path('reports/classroom/<int:pk>/report-cards/', views.classroom_report_cards, name='classroom_report_cards'),
+    path('reports/cube/', views.cube_report, name='cube_report'),
     path('notifications/', views.notifications_view, name='notifications'),
+    path('metrics', views.metrics_endpoint, name='metrics'),
     # API
-    path('api/student/<int:pk>/trend/', views.api_student_trend, name='api_student_trend'),
-    path('api/class-performance/', views.api_class_performance, name='api_class_performance'),
+    path('api/student/<int:pk>/trend/', dashboard_views.api_student_trend, name='api_student_trend'),
+    path('api/class-performance/', dashboard_views.api_class_performance, name='api_class_performance'),
+    path('api/dashboard/<slug:section>/', views.api_dashboard_section, name='api_dashboard_section'),
+    path('api/cohorts/', views.api_cohort_comparison, name='api_cohort_comparison'),
+    path('api/students/search/', views.api_student_search, name='api_student_search'),
 ]
@@ -0,0 +1,97 @@
+"""
+Per-entity data version counters.
+
+Writes to Marks, Attendance and AssessmentSubmission bump the version of the
+student, subject, classroom(s) and assessment they touch, plus the
+school-wide version (see ``analytics.signals``). Cached fragments and the
+ETag / Last-Modified headers of report pages are derived from the current
+versions, so they change exactly when the data behind them changes instead of
+after a guessed TTL.
+
+The counters are only meaningful when every process reads the same cache
+(``CACHE_IS_SHARED``): with a per-process cache a write bumps the counters of
+the worker that handled it alone. ``is_shared()`` tells callers whether they
+may serve anything derived from the versions without recomputing it.
+"""
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.cache import cache
+
+SCHOOL = ('school', 'all')
+
+# Bumped whenever any user is saved: pages listing other users' names.
+USER_NAMES = ('user_names', 'all')
+
+
+def is_shared():
+    """Whether every process sees the same counters."""
+    return settings.CACHE_IS_SHARED
+
+
+def _key(entity, pk):
+    return f'version:{entity}:{pk}'
+
+
+def _at_key(entity, pk):
+    return f'version:{entity}:{pk}:at'
+
+
+def _fresh():
+    # A time-based start value means a counter lost to cache eviction never
+    # restarts at a number an old fragment key was built from.
+    return time.time_ns() // 1000
+
+
+def get_versions(pairs):
+    """Current versions for ``[(entity, pk), ...]``, initialising missing counters."""
+    keys = {_key(entity, pk): (entity, pk) for entity, pk in pairs}
+    found = cache.get_many(keys)
+    for key in keys.keys() - found.keys():
+        cache.add(key, _fresh(), None)
+        found[key] = cache.get(key)
+    return {keys[key]: found[key] for key in keys}
+
+
+def get_version(entity, pk):
+    return get_versions([(entity, pk)])[(entity, pk)]
+
+
+def bump(pairs):
+    """Invalidate everything derived from the given ``(entity, pk)`` pairs."""
+    pairs = set(pairs)
+    for entity, pk in pairs:
+        try:
+            cache.incr(_key(entity, pk))
+        except ValueError:
+            cache.set(_key(entity, pk), _fresh(), None)
+    now = time.time()
+    cache.set_many({_at_key(entity, pk): now for entity, pk in pairs}, None)
+
+
+def last_modified(pairs):
+    """Latest bump time of ``pairs``; counters with no known time count as changed now."""
+    keys = [_at_key(entity, pk) for entity, pk in pairs]
+    found = cache.get_many(keys)
+    for key in set(keys) - found.keys():
+        cache.add(key, time.time(), None)
+        found[key] = cache.get(key) or time.time()
+    return datetime.fromtimestamp(max(found.values()), tz=timezone.utc)
+
+
+def etag(pairs):
+    """Opaque ETag for a response built from ``pairs`` (and the deployed release)."""
+    versions = get_versions(pairs)
+    parts = [settings.RELEASE_VERSION] + [f'{entity}={pk}@{versions[(entity, pk)]}' for entity, pk in pairs]
+    return hashlib.md5('|'.join(parts).encode()).hexdigest()
+
+
+def fragment_key(name, entities, vary=()):
+    """Cache key for a template fragment depending on ``entities`` (and ``vary`` values)."""
+    versions = get_versions(entities)
+    parts = [f'{entity}={pk}@{versions[(entity, pk)]}' for entity, pk in entities]
+    parts += [str(v) for v in vary]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'fragment:{name}:{digest}'
@@ -1,18 +1,27 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.http import JsonResponse
-from django.db.models import Avg, Count, Max, Min, Q
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+from django.db.models import Count, Max, Min, Q
 from django.utils import timezone
-from datetime import timedelta, date
+from django.utils.crypto import constant_time_compare
+from django.utils.text import slugify
 import json
 
 from accounts.models import User
+from student_analytics.db_router import replica_may_be_behind, replica_reads
 from .models import (
     Subject, ClassRoom, Marks, Attendance, Assessment,
-    AssessmentSubmission, StudentProfile, ExamType, Notification
+    StudentProfile, ExamType, Notification, MarksCubeCell, student_stats
 )
 from .forms import MarksForm, AttendanceForm, AssessmentForm, SubmissionGradeForm
+from . import cohorts, cube, dashboard_sections, metrics, report_cards, reports, search, versioning
+from .scope import TeacherScope
+from .widgets import student_label
 
 
 def role_required(*roles):
@@ -28,7 +37,44 @@ def role_required(*roles):
     return decorator
 
 
+def versioned_condition(entities):
+    """Conditional GET (ETag/Last-Modified) driven by data version counters.
+
+    ``entities(request, *args, **kwargs)`` returns the ``(entity, pk)`` pairs
+    the page is built from, or None to skip conditional handling. The viewer's
+    own user and notification versions are always included since they show up
+    in the page chrome. No validators are sent unless the version counters are
+    shared by every worker (one that missed a bump would answer 304 for a
+    changed page), while the page may be read from a replica that has not
+    caught up with the latest change yet, or while flash messages are pending:
+    a 304 would leave them queued for a later page.
+    """
+    def pairs(request, *args, **kwargs):
+        if not versioning.is_shared():
+            return None
+        if len(messages.get_messages(request)):
+            return None  # len() does not mark the messages as shown
+        page = entities(request, *args, **kwargs)
+        if page is None:
+            return None
+        page = page + [('user', request.user.pk), ('notifications', request.user.pk)]
+        if replica_may_be_behind(versioning.last_modified(page).timestamp()):
+            return None  # the page may be rendered from pre-write data
+        return page
+
+    def etag_func(request, *args, **kwargs):
+        p = pairs(request, *args, **kwargs)
+        return versioning.etag(p) if p else None
+
+    def last_modified_func(request, *args, **kwargs):
+        p = pairs(request, *args, **kwargs)
+        return versioning.last_modified(p) if p else None
+
+    return condition(etag_func=etag_func, last_modified_func=last_modified_func)
+
+
 @login_required
+@replica_reads
 def dashboard(request):
     user = request.user
     context = {'user': user}
@@ -44,80 +90,23 @@ def dashboard(request):
 
 
 def _admin_dashboard_data():
-    total_students = User.objects.filter(role='student').count()
-    total_teachers = User.objects.filter(role='teacher').count()
-    total_subjects = Subject.objects.count()
-    total_classes = ClassRoom.objects.count()
-
-    # Recent marks distribution
-    all_marks = Marks.objects.all()
-    grade_dist = {'A+': 0, 'A': 0, 'B+': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
-    for m in all_marks:
-        grade_dist[m.get_grade()] += 1
-
-    # Subject-wise average
-    subject_avgs = []
-    for subj in Subject.objects.all():
-        avg = subj.marks.aggregate(avg=Avg('marks_obtained'))['avg']
-        if avg:
-            subject_avgs.append({'name': subj.name, 'avg': round(avg, 1)})
-
-    # Attendance overview
-    today = date.today()
-    week_ago = today - timedelta(days=7)
-    recent_attendance = Attendance.objects.filter(date__gte=week_ago)
-    total_att = recent_attendance.count()
-    present_att = recent_attendance.filter(status='present').count()
-    att_rate = round((present_att / total_att) * 100, 1) if total_att else 0
-
-    # Top performers
-    top_students = []
-    for student in User.objects.filter(role='student')[:20]:
-        marks = student.marks.all()
-        if marks:
-            avg = sum((m.marks_obtained / m.subject.max_marks) * 100 for m in marks) / marks.count()
-            top_students.append({'student': student, 'avg': round(avg, 1)})
-    top_students = sorted(top_students, key=lambda x: x['avg'], reverse=True)[:5]
-
+    # Charts, top performers and the attendance rate load from api_dashboard_section.
     return {
-        'total_students': total_students,
-        'total_teachers': total_teachers,
-        'total_subjects': total_subjects,
-        'total_classes': total_classes,
-        'grade_dist': json.dumps(grade_dist, default=float),
-        'subject_avgs': json.dumps(subject_avgs, default=float),        'att_rate': att_rate,
-        'top_students': top_students,
+        'total_students': User.objects.filter(role='student').count(),
+        'total_teachers': User.objects.filter(role='teacher').count(),
+        'total_subjects': Subject.objects.count(),
+        'total_classes': ClassRoom.objects.count(),
         'recent_marks': Marks.objects.select_related('student', 'subject')[:10],
     }
 
 
 def _teacher_dashboard_data(user):
-    subjects = user.teaching_subjects.all()
-    classes = ClassRoom.objects.filter(
-        Q(class_teacher=user) | Q(subjects__in=subjects)
-    ).distinct()
-
-    # Students in teacher's classes
-    student_ids = set()
-    for cls in classes:
-        for s in cls.students.all():
-            student_ids.add(s.id)
-    students = User.objects.filter(id__in=student_ids)
+    scope = TeacherScope.for_user(user)
 
     # Recent marks entered by teacher
     recent_marks = Marks.objects.filter(
         recorded_by=user
-    ).select_related('student', 'subject').order_by('-created_at')[:10]
-
-    # Subject performance
-    subject_data = []
-    for subj in subjects:
-        avg = subj.marks.aggregate(avg=Avg('marks_obtained'))['avg']
-        subject_data.append({
-            'name': subj.name,
-            'avg': round(avg, 1) if avg else 0,
-            'students': subj.marks.values('student').distinct().count()
-        })
+    ).select_related('student', 'subject', 'exam_type').order_by('-created_at')[:10]
 
     # Pending assessments
     pending_assessments = Assessment.objects.filter(
@@ -127,82 +116,31 @@ def _teacher_dashboard_data(user):
     ).order_by('-due_date')[:5]
 
     return {
-        'subjects': subjects,
-        'classes': classes,
-        'student_count': len(student_ids),
+        'subjects': scope.subjects(),
+        'classes': scope.classrooms(),
+        'student_count': len(scope.student_ids),
         'recent_marks': recent_marks,
-        'subject_data': json.dumps(subject_data, default=float),
         'pending_assessments': pending_assessments,
     }
 
 
 def _student_dashboard_data(user):
-    marks = user.marks.select_related('subject', 'exam_type').all()
-
-    # Calculate overall average
-    overall_avg = 0
-    if marks:
-        overall_avg = sum((m.marks_obtained / m.subject.max_marks) * 100 for m in marks) / marks.count()
-        overall_avg = round(overall_avg, 1)
-
-    # Subject-wise performance for chart
-    subject_perf = {}
-    for m in marks:
-        if m.subject.name not in subject_perf:
-            subject_perf[m.subject.name] = []
-        subject_perf[m.subject.name].append(float((m.marks_obtained / m.subject.max_marks) * 100))
-
-    subject_chart = [
-        {'subject': s, 'avg': round(sum(v) / len(v), 1)}
-        for s, v in subject_perf.items()
-    ]
-
-    # Attendance
-    attendance = user.attendance_records.all()
-    total_att = attendance.count()
-    present_att = attendance.filter(status='present').count()
-    att_pct = round((present_att / total_att) * 100, 1) if total_att else 0
-
-    # Attendance by subject for chart
-    att_by_subject = []
-    for subj in Subject.objects.filter(attendance__student=user).distinct():
-        subj_att = attendance.filter(subject=subj)
-        total = subj_att.count()
-        present = subj_att.filter(status='present').count()
-        att_by_subject.append({
-            'subject': subj.name,
-            'pct': round((present / total) * 100, 1) if total else 0
-        })
-
-    # Grade trend over time
-    recent_marks = marks.order_by('date')[:12]
-    trend_data = [
-        {'date': str(m.date), 'pct': float(m.get_percentage()), 'subject': m.subject.name}
-        for m in recent_marks
-    ]
-
-    # Pending submissions
-    pending_subs = AssessmentSubmission.objects.filter(
-        student=user, status__in=['pending', 'submitted']
-    ).select_related('assessment', 'assessment__subject')[:5]
-
-    # Generate improvement suggestions
-    suggestions = _generate_suggestions(user, marks, att_pct)
-
+    # Averages, attendance, trend, suggestions and submissions load as sections.
     return {
-        'overall_avg': overall_avg,
-        'att_pct': att_pct,
-        'total_att': total_att,
-        'present_att': present_att,
-        'subject_chart': json.dumps(subject_chart, default=float),
-        'att_by_subject': json.dumps(att_by_subject, default=float),
-        'trend_data': json.dumps(trend_data, default=float),
-        'recent_marks': marks[:5],
-        'pending_submissions': pending_subs,
-        'suggestions': suggestions,
+        'recent_marks': user.marks.select_related('subject', 'exam_type')[:5],
     }
 
 
+@login_required
+@replica_reads
+def api_dashboard_section(request, section):
+    if not dashboard_sections.is_available(section, request.user):
+        return JsonResponse({'error': 'Unknown dashboard section'}, status=404)
+    response = JsonResponse(dashboard_sections.get_section(section, request.user))
+    patch_cache_control(response, private=True, max_age=settings.DASHBOARD_SECTION_TIMEOUT)
+    return response
+
+
 def _generate_suggestions(user, marks, att_pct):
     suggestions = []
 
@@ -258,43 +196,55 @@ def _generate_suggestions(user, marks, att_pct):
 
 
 @login_required
+@replica_reads
 def student_list(request):
     if request.user.is_student_user():
         return redirect('dashboard')
 
     students = User.objects.filter(role='student').select_related('student_profile')
-    classroom_filter = request.GET.get('classroom')
+    classrooms = ClassRoom.objects.all()
+    if request.user.is_teacher():
+        scope = TeacherScope.for_user(request.user)
+        students = scope.students().select_related('student_profile')
+        classrooms = scope.classrooms()
 
+    classroom_filter = request.GET.get('classroom')
     if classroom_filter:
         students = students.filter(enrolled_classes__id=classroom_filter)
 
-    classrooms = ClassRoom.objects.all()
+    students = students.annotate(**student_stats('pk'))
+    query = request.GET.get('q', '').strip()
+    if query:
+        ranked = search.search_ids(query, limit=50, within=students)
+        students = sorted(students.filter(pk__in=ranked), key=lambda s: ranked.index(s.pk))
 
-    # Add computed stats
-    student_data = []
-    for student in students:
-        marks = student.marks.all()
-        avg = 0
-        if marks:
-            avg = sum((m.marks_obtained / m.subject.max_marks) * 100 for m in marks) / marks.count()
-        att = student.attendance_records.all()
-        att_pct = 0
-        if att:
-            att_pct = (att.filter(status='present').count() / att.count()) * 100
-        student_data.append({
+    student_data = [
+        {
             'student': student,
-            'avg': round(avg, 1),
-            'att_pct': round(att_pct, 1),
-        })
+            'avg': round(student.avg_percentage or 0, 1),
+            'att_pct': round(student.attendance_percentage or 0, 1),
+        }
+        for student in students
+    ]
 
     return render(request, 'analytics/student_list.html', {
         'student_data': student_data,
         'classrooms': classrooms,
         'classroom_filter': classroom_filter,
+        'query': query,
     })
 
 
+def _student_detail_entities(request, pk):
+    if request.user.is_student_user() and request.user.pk != pk:
+        return None
+    return [('student', pk)]
+
+
 @login_required
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@versioned_condition(_student_detail_entities)
 def student_detail(request, pk):
     student = get_object_or_404(User, pk=pk, role='student')
 
@@ -306,66 +256,19 @@ def student_detail(request, pk):
     marks = student.marks.select_related('subject', 'exam_type').order_by('-date')
     attendance = student.attendance_records.select_related('subject').order_by('-date')
     submissions = student.submissions.select_related('assessment', 'assessment__subject')
-
-    # Per-subject analysis
-    subject_analysis = {}
-    for m in marks:
-        sn = m.subject.name
-        if sn not in subject_analysis:
-            subject_analysis[sn] = {'marks': [], 'subject': m.subject}
-        subject_analysis[sn]['marks'].append(m)
-
-    for sn, data in subject_analysis.items():
-        ms = data['marks']
-        percs = [(m.marks_obtained / m.subject.max_marks) * 100 for m in ms]
-        data['avg'] = round(sum(percs) / len(percs), 1)
-        data['max'] = round(max(percs), 1)
-        data['min'] = round(min(percs), 1)
-        data['grade'] = ms[0].get_grade() if ms else 'N/A'
-
-    # Attendance by subject
-    att_analysis = {}
-    for a in attendance:
-        sn = a.subject.name
-        if sn not in att_analysis:
-            att_analysis[sn] = {'total': 0, 'present': 0}
-        att_analysis[sn]['total'] += 1
-        if a.status == 'present':
-            att_analysis[sn]['present'] += 1
-
-    for sn in att_analysis:
-        d = att_analysis[sn]
-        d['pct'] = round((d['present'] / d['total']) * 100, 1) if d['total'] else 0
-
-    # Chart data
-    trend_data = [
-        {'date': str(m.date), 'pct': float(m.get_percentage()), 'subject': m.subject.name}
-        for m in marks.order_by('date')[:20]
-    ]
-
-    overall_avg = 0
-    if marks:
-        overall_avg = sum((m.marks_obtained / m.subject.max_marks) * 100 for m in marks) / marks.count()
-        overall_avg = round(overall_avg, 1)
-
-    total_att = attendance.count()
-    att_pct = 0
-    if total_att:
-        att_pct = round((attendance.filter(status='present').count() / total_att) * 100, 1)
-
-    suggestions = _generate_suggestions(student, marks, att_pct)
+    summary = reports.summary('student', pk)
 
     return render(request, 'analytics/student_detail.html', {
         'student': student,
         'marks': marks[:20],
         'attendance': attendance[:20],
         'submissions': submissions,
-        'subject_analysis': subject_analysis,
-        'att_analysis': att_analysis,
-        'trend_data': json.dumps(trend_data, default=float),
-        'overall_avg': overall_avg,
-        'att_pct': att_pct,
-        'suggestions': suggestions,
+        'subject_analysis': summary['subject_analysis'],
+        'att_analysis': summary['att_analysis'],
+        'trend_data': json.dumps(summary['trend'], default=float),
+        'overall_avg': summary['overall_avg'],
+        'att_pct': summary['att_pct'],
+        'suggestions': summary['suggestions'],
     })
 
 
@@ -386,17 +289,27 @@ def add_marks(request):
 @role_required('admin', 'teacher')
 def marks_list(request):
     marks = Marks.objects.select_related('student', 'subject', 'exam_type').order_by('-date')
+    subjects = Subject.objects.all()
+    students = User.objects.filter(role='student')
+    if request.user.is_teacher():
+        scope = TeacherScope.for_user(request.user)
+        marks = marks.filter(subject__in=scope.subjects())
+        subjects = scope.subjects()
+        students = scope.students()
+
     subject_filter = request.GET.get('subject')
     student_filter = request.GET.get('student')
+    selected_student = None
     if subject_filter:
         marks = marks.filter(subject_id=subject_filter)
     if student_filter:
         marks = marks.filter(student_id=student_filter)
+        selected_student = students.filter(pk=student_filter).select_related('student_profile').first()
 
     return render(request, 'analytics/marks_list.html', {
         'marks': marks[:50],
-        'subjects': Subject.objects.all(),
-        'students': User.objects.filter(role='student'),
+        'subjects': subjects,
+        'selected_student': selected_student,
         'subject_filter': subject_filter,
         'student_filter': student_filter,
     })
@@ -421,6 +334,8 @@ def attendance_list(request):
         attendance = request.user.attendance_records.select_related('subject').order_by('-date')
     else:
         attendance = Attendance.objects.select_related('student', 'subject').order_by('-date')
+        if request.user.is_teacher():
+            attendance = attendance.filter(subject__in=TeacherScope.for_user(request.user).subjects())
 
     return render(request, 'analytics/attendance_list.html', {'attendance': attendance[:50]})
 
@@ -455,6 +370,8 @@ def create_assessment(request):
 
 
 @login_required
+@cache_control(private=True, no_cache=True)
+@versioned_condition(lambda request, pk: [('assessment', pk), versioning.USER_NAMES])
 def assessment_detail(request, pk):
     assessment = get_object_or_404(Assessment, pk=pk)
     submissions = assessment.submissions.select_related('student').all()
@@ -465,49 +382,112 @@ def assessment_detail(request, pk):
 
 
 @login_required
+@replica_reads
+@cache_control(private=True, no_cache=True)
+@versioned_condition(lambda request, pk: [('subject', pk), versioning.USER_NAMES])
 def subject_report(request, pk):
     subject = get_object_or_404(Subject, pk=pk)
     marks = subject.marks.select_related('student', 'exam_type').order_by('-date')
+    summary = reports.summary('subject', pk)
 
-    # Grade distribution
-    grade_dist = {'A+': 0, 'A': 0, 'B+': 0, 'B': 0, 'C': 0, 'D': 0, 'F': 0}
-    for m in marks:
-        grade_dist[m.get_grade()] += 1
+    return render(request, 'analytics/subject_report.html', {
+        'subject': subject,
+        'marks': marks[:20],
+        'grade_dist': json.dumps(summary['grade_dist'], default=float),
+        'student_summary': summary['students'],
+        'overall_avg': summary['overall_avg'],
+    })
 
-    # Student-wise averages
-    student_avgs = {}
-    for m in marks:
-        sid = m.student.id
-        if sid not in student_avgs:
-            student_avgs[sid] = {'student': m.student, 'marks': []}
-        student_avgs[sid]['marks'].append(float(m.get_percentage()))
 
-    student_summary = []
-    for sid, data in student_avgs.items():
-        avg = sum(data['marks']) / len(data['marks'])
-        student_summary.append({'student': data['student'], 'avg': round(avg, 1)})
-    student_summary.sort(key=lambda x: x['avg'], reverse=True)
+@login_required
+@role_required('admin', 'teacher')
+def classroom_report_cards(request, pk):
+    classroom = get_object_or_404(ClassRoom, pk=pk)
+    if request.user.is_teacher() and classroom.pk not in TeacherScope.for_user(request.user).classroom_ids:
+        messages.error(request, "Access denied.")
+        return redirect('student_list')
+    response = StreamingHttpResponse(report_cards.stream_zip(classroom), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="report-cards-{slugify(str(classroom))}.zip"'
+    return response
 
-    overall_avg = marks.aggregate(avg=Avg('marks_obtained'))['avg']
 
-    return render(request, 'analytics/subject_report.html', {
-        'subject': subject,
-        'marks': marks[:20],
-        'grade_dist': json.dumps(grade_dist, default=float),
-        'student_summary': student_summary,
-        'overall_avg': round(overall_avg, 1) if overall_avg else 0,
+CUBE_AXES = [
+    ('subject', 'Subject'),
+    ('classroom', 'Classroom'),
+    ('exam_type', 'Exam Type'),
+    ('month', 'Month'),
+    ('academic_year', 'Academic Year'),
+]
+
+
+@login_required
+@role_required('admin', 'teacher')
+@replica_reads
+def cube_report(request):
+    axes = dict(CUBE_AXES)
+    rows_dim = request.GET.get('rows') if request.GET.get('rows') in axes else 'subject'
+    cols_dim = request.GET.get('cols') if request.GET.get('cols') in axes else 'exam_type'
+    if cols_dim == rows_dim:
+        cols_dim = 'academic_year' if rows_dim != 'academic_year' else 'subject'
+
+    filters = {}
+    year_filter = request.GET.get('academic_year', '')
+    if year_filter:
+        filters['academic_year'] = year_filter
+    selected = {}
+    for dim in ('subject', 'classroom', 'exam_type'):
+        value = request.GET.get(dim, '')
+        if value.isdigit():
+            filters[f'{dim}_id'] = value
+        selected[dim] = value
+    if request.user.is_teacher():
+        filters['subject__in'] = request.user.teaching_subjects.all()
+
+    # Everything below reads the pre-aggregated cube, never the Marks table.
+    cells = {(r[rows_dim], r[cols_dim]): r for r in cube.rollup([rows_dim, cols_dim], **filters)}
+    row_totals = {r[rows_dim]: r for r in cube.rollup([rows_dim], **filters)}
+    col_totals = {r[cols_dim]: r for r in cube.rollup([cols_dim], **filters)}
+    grand_total = cube.rollup([], **filters)
+
+    row_labels = cube.dimension_labels(rows_dim, row_totals)
+    col_labels = cube.dimension_labels(cols_dim, col_totals)
+    table = [
+        {
+            'label': row_labels.get(rk, 'Unassigned'),
+            'cells': [cells.get((rk, ck)) for ck in col_totals],
+            'total': total,
+        }
+        for rk, total in row_totals.items()
+    ]
+
+    return render(request, 'analytics/cube_report.html', {
+        'axes': CUBE_AXES,
+        'rows_dim': rows_dim,
+        'cols_dim': cols_dim,
+        'columns': [col_labels.get(ck, 'Unassigned') for ck in col_totals],
+        'column_totals': list(col_totals.values()),
+        'table': table,
+        'grand_total': grand_total[0] if grand_total else None,
+        'years': MarksCubeCell.objects.values_list('academic_year', flat=True).distinct().order_by('-academic_year'),
+        'subjects': Subject.objects.all(),
+        'classrooms': ClassRoom.objects.all(),
+        'exam_types': ExamType.objects.all(),
+        'year_filter': year_filter,
+        'selected': selected,
     })
 
 
 @login_required
 def notifications_view(request):
     notifs = request.user.notifications.all()
-    notifs.filter(is_read=False).update(is_read=True)
+    if notifs.filter(is_read=False).update(is_read=True):
+        versioning.bump([('notifications', request.user.pk)])
     return render(request, 'analytics/notifications.html', {'notifications': notifs})
 
 
 # API Views for AJAX chart data
 @login_required
+@replica_reads
 def api_student_trend(request, pk):
     student = get_object_or_404(User, pk=pk, role='student')
     marks = student.marks.select_related('subject').order_by('date')
@@ -519,15 +499,57 @@ def api_student_trend(request, pk):
 
 
 @login_required
+@replica_reads
 def api_class_performance(request):
     classroom_id = request.GET.get('classroom_id')
     if classroom_id:
         classroom = get_object_or_404(ClassRoom, pk=classroom_id)
-        data = []
-        for student in classroom.students.all():
-            marks = student.marks.all()
-            if marks:
-                avg = sum(float(m.get_percentage()) for m in marks) / marks.count()
-                data.append({'name': student.get_full_name(), 'avg': round(avg, 1)})
-        return JsonResponse({'data': data})
+        return JsonResponse({'data': reports.summary('classroom', classroom.pk)['students']})
     return JsonResponse({'data': []})
+
+
+@login_required
+@role_required('admin', 'teacher')
+@replica_reads
+def api_cohort_comparison(request):
+    """Compare closed-year cohorts: ?subject=&class_name= across years, or ?subject=&academic_year= by section."""
+    subject_id = request.GET.get('subject', '')
+    class_name = request.GET.get('class_name')
+    academic_year = request.GET.get('academic_year')
+    if not subject_id.isdigit() or not (class_name or academic_year):
+        return JsonResponse({'error': 'subject and either class_name or academic_year are required'}, status=400)
+    data = cohorts.compare(int(subject_id), class_name=class_name, academic_year=academic_year)
+    return JsonResponse({'data': data})
+
+
+@login_required
+@role_required('admin', 'teacher')
+@replica_reads
+def api_student_search(request):
+    """Prefix search on student names, username and roll number (every word must match)."""
+    terms = request.GET.get('q', '').split()[:4]
+    if not terms:
+        return JsonResponse({'data': []})
+    students = User.objects.filter(role='student')
+    if request.user.is_teacher():
+        students = TeacherScope.for_user(request.user).students()
+    for term in terms:
+        # Name columns and roll number as two lookups, each served by its own
+        # UPPER(...) prefix indexes, rather than one OR across the profile join.
+        names = User.objects.filter(
+            Q(first_name__istartswith=term) | Q(last_name__istartswith=term) | Q(username__istartswith=term)
+        ).values('pk')
+        rolls = StudentProfile.objects.filter(roll_number__istartswith=term).values('user_id')
+        students = students.filter(pk__in=names.union(rolls))
+    students = students.select_related('student_profile').order_by('first_name', 'last_name', 'username')[:20]
+    return JsonResponse({'data': [{'id': s.pk, 'label': student_label(s)} for s in students]})
+
+
+def metrics_endpoint(request):
+    """Prometheus scrape target; see ``analytics.metrics``."""
+    if settings.METRICS_TOKEN:
+        if not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {settings.METRICS_TOKEN}'):
+            return HttpResponseForbidden()
+    elif request.META.get('REMOTE_ADDR') not in ('127.0.0.1', '::1'):
+        return HttpResponseForbidden()
+    return HttpResponse(metrics.exposition(), content_type='text/plain; version=0.0.4; charset=utf-8')
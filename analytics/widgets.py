@@ -0,0 +1,38 @@
+"""
+Form widgets.
+"""
+from django import forms
+from django.urls import reverse_lazy
+
+
+def student_label(user):
+    """How a student is shown in pickers: full name (or username) and roll number."""
+    label = user.get_full_name() or user.username
+    profile = getattr(user, 'student_profile', None)
+    return f"{label} ({profile.roll_number})" if profile else label
+
+
+class StudentAutocomplete(forms.Select):
+    """A student ``<select>`` that only renders the selected option.
+
+    The script in ``base.html`` turns every ``select[data-autocomplete]`` into
+    a search box backed by ``api_student_search``, so the page no longer
+    carries an option per student.
+    """
+
+    def __init__(self, attrs=None):
+        super().__init__({'class': 'form-select', 'data-autocomplete': reverse_lazy('api_student_search'), **(attrs or {})})
+
+    def optgroups(self, name, value, attrs=None):
+        choices = self.choices
+        selected = [v for v in value if str(v).isdigit()]
+        queryset = getattr(choices, 'queryset', None)
+        if queryset is not None:
+            self.choices = [('', '---------')] + [
+                (user.pk, student_label(user))
+                for user in queryset.filter(pk__in=selected).select_related('student_profile')
+            ]
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = choices
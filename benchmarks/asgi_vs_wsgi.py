@@ -0,0 +1,53 @@
+"""
+Benchmark the sync dashboard/API views under gunicorn sync workers (WSGI)
+against their async versions under uvicorn workers (ASGI).
+
+Both servers use the same settings and database, so seed it first:
+
+    python manage.py seed_data
+    python benchmarks/asgi_vs_wsgi.py --workers 4 --concurrency 16 --requests 400
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import SEED_USERS, Session, free_port, gunicorn, run_endpoint, serve  # noqa: E402
+
+SERVERS = [
+    ('wsgi/sync', 'student_analytics.wsgi:application', None, {'ASYNC_VIEWS': '0'}),
+    ('asgi/uvicorn', 'student_analytics.asgi:application', 'uvicorn_worker.UvicornWorker', {}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400, help='requests per endpoint and role')
+    parser.add_argument('--student-id', type=int, default=5, help='pk used for api_student_trend')
+    parser.add_argument('--classroom-id', type=int, default=1, help='pk used for api_class_performance')
+    args = parser.parse_args()
+
+    endpoints = [
+        ('admin', '/dashboard/'),
+        ('teacher', '/dashboard/'),
+        ('student', '/dashboard/'),
+        ('admin', f'/api/student/{args.student_id}/trend/'),
+        ('admin', f'/api/class-performance/?classroom_id={args.classroom_id}'),
+    ]
+
+    print(f"{'server':<14}{'role':<9}{'endpoint':<42}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, app, worker_class, env in SERVERS:
+        port = free_port()
+        with serve(gunicorn(app, port, args.workers, worker_class), port, env) as base_url:
+            sessions = {role: Session(base_url).login(*creds) for role, creds in SEED_USERS.items()}
+            for role, path in endpoints:
+                sessions[role].get(path)  # warm-up
+                r = run_endpoint(sessions[role], path, args.requests, args.concurrency)
+                print(f"{name:<14}{role:<9}{path:<42}{r['rps']:>8.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
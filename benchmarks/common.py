@@ -0,0 +1,139 @@
+"""
+Shared helpers for the benchmark scripts: starting a local server, logging in
+as a seeded user over plain HTTP, and summarising latencies.
+
+Only the standard library is used so the scripts run anywhere the project does.
+"""
+import http.cookiejar
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+# Credentials created by `python manage.py seed_data`.
+SEED_USERS = {
+    'admin': ('admin', 'admin123'),
+    'teacher': ('teacher1', 'teacher123'),
+    'student': ('student1', 'student123'),
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Server on port {port} did not come up within {timeout:.0f}s')
+
+
+@contextmanager
+def serve(args, port, env=None):
+    """Run a server command (e.g. gunicorn) from the project dir until the block exits."""
+    proc = subprocess.Popen(
+        args, cwd=PROJECT_DIR, env={**os.environ, **(env or {})},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for_port(port)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def gunicorn(app, port, workers, worker_class=None, extra=()):
+    args = [sys.executable, '-m', 'gunicorn', app, '--bind', f'127.0.0.1:{port}', '--workers', str(workers)]
+    if worker_class:
+        args += ['--worker-class', worker_class]
+    return args + list(extra)
+
+
+class Session:
+    """A cookie-keeping HTTP client logged in through the normal login form."""
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies))
+
+    def _cookie(self, name):
+        return next((c.value for c in self.cookies if c.name == name), '')
+
+    def get(self, path, headers=None):
+        status, _, body = self.fetch(path, headers)
+        return status, body
+
+    def fetch(self, path, headers=None):
+        """GET ``path``; returns ``(status, headers, body)`` with the body as sent (still encoded)."""
+        request = urllib.request.Request(self.base_url + path, headers=headers or {})
+        with self.opener.open(request, timeout=60) as response:
+            return response.status, response.headers, response.read()
+
+    def post(self, path, data):
+        status, _, body = self.submit(path, data)
+        return status, body
+
+    def submit(self, path, data):
+        """POST a form to ``path``; returns ``(status, final_path, body)`` after any redirect."""
+        url = self.base_url + path
+        body = urllib.parse.urlencode({'csrfmiddlewaretoken': self._cookie('csrftoken'), **data}).encode()
+        request = urllib.request.Request(url, data=body, headers={'Referer': url})
+        with self.opener.open(request, timeout=60) as response:
+            return response.status, urllib.parse.urlsplit(response.url).path, response.read()
+
+    def login(self, username, password):
+        self.get('/accounts/login/')
+        self.post('/accounts/login/', {'username': username, 'password': password})
+        if not self._cookie('sessionid'):
+            raise RuntimeError(f'Login failed for {username!r}; did you run `manage.py seed_data`?')
+        return self
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def summarise(latencies, elapsed):
+    """Throughput and latency percentiles (ms) for a list of per-request seconds."""
+    ms = [t * 1000 for t in latencies]
+    return {
+        'requests': len(ms),
+        'rps': len(ms) / elapsed if elapsed else 0.0,
+        'p50': percentile(ms, 50),
+        'p95': percentile(ms, 95),
+        'p99': percentile(ms, 99),
+    }
+
+
+def run_endpoint(session, path, total, concurrency):
+    """GET ``path`` ``total`` times from ``concurrency`` threads and summarise."""
+    def one(_):
+        started = time.perf_counter()
+        session.get(path)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(total)))
+    return summarise(latencies, time.perf_counter() - started)
@@ -0,0 +1,83 @@
+"""
+Measure bytes on the wire for dashboard, student_detail and chart API responses
+without compression, with gzip and with Brotli, plus a hashed static file.
+
+Runs gunicorn with DEBUG off against the configured database, so seed it and
+collect the static files first:
+
+    python manage.py seed_data
+    python manage.py collectstatic --noinput
+    python benchmarks/compression.py --student-id 5 --requests 20
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import PROJECT_DIR, SEED_USERS, Session, free_port, gunicorn, percentile, serve  # noqa: E402
+
+ENCODINGS = [('identity', 'identity'), ('gzip', 'gzip'), ('br', 'gzip, deflate, br')]
+
+
+def measure(session, path, accept, requests):
+    timings = []
+    for _ in range(requests):
+        started = time.perf_counter()
+        status, headers, body = session.fetch(path, {'Accept-Encoding': accept})
+        timings.append((time.perf_counter() - started) * 1000)
+    return status, headers, len(body), percentile(timings, 50)
+
+
+def hashed_static_file(name='admin/css/base.css'):
+    manifest = PROJECT_DIR / 'staticfiles' / 'staticfiles.json'
+    if not manifest.exists():
+        return None
+    return '/static/' + json.loads(manifest.read_text())['paths'][name]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--student-id', type=int, default=5, help='pk used for student_detail')
+    parser.add_argument('--classroom-id', type=int, default=1, help='pk used for api_class_performance')
+    parser.add_argument('--requests', type=int, default=20, help='requests per endpoint and encoding (for the p50)')
+    args = parser.parse_args()
+
+    endpoints = [
+        ('admin', '/dashboard/'),
+        ('student', '/dashboard/'),
+        ('admin', f'/students/{args.student_id}/'),
+        ('admin', '/marks/'),
+        ('admin', f'/api/class-performance/?classroom_id={args.classroom_id}'),
+        ('admin', '/api/dashboard/top-students/'),
+    ]
+    static = hashed_static_file()
+
+    port = free_port()
+    env = {'DJANGO_DEBUG': '0', 'ASYNC_VIEWS': '0'}
+    print(f"{'role':<9}{'endpoint':<44}{'encoding':<10}{'bytes':>9}{'saved':>8}{'p50 ms':>9}")
+    with serve(gunicorn('student_analytics.wsgi:application', port, 2), port, env) as base_url:
+        sessions = {role: Session(base_url).login(*creds) for role, creds in SEED_USERS.items()}
+        for role, path in endpoints:
+            plain = None
+            for name, accept in ENCODINGS:
+                _, headers, size, p50 = measure(sessions[role], path, accept, args.requests)
+                plain = plain or size
+                encoding = headers.get('Content-Encoding') or 'none'
+                print(f"{role:<9}{path:<44}{encoding:<10}{size:>9}{1 - size / plain:>8.0%}{p50:>9.1f}")
+        if static:
+            plain = None
+            for name, accept in ENCODINGS:
+                _, headers, size, p50 = measure(sessions['admin'], static, accept, args.requests)
+                plain = plain or size
+                encoding = headers.get('Content-Encoding') or 'none'
+                print(f"{'-':<9}{static[-44:]:<44}{encoding:<10}{size:>9}{1 - size / plain:>8.0%}{p50:>9.1f}")
+            print(f"Cache-Control: {headers.get('Cache-Control')}")
+        else:
+            print('(run collectstatic to include a static file)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Benchmark request latency with a new database connection per request,
+persistent per-thread connections (CONN_MAX_AGE) and the psycopg pool.
+
+Runs gunicorn against the configured PostgreSQL database, so seed it first:
+
+    python manage.py seed_data
+    python benchmarks/db_connections.py --workers 4 --threads 4 --concurrency 16 --requests 400
+"""
+import argparse
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import SEED_USERS, Session, free_port, gunicorn, run_endpoint, serve  # noqa: E402
+
+MODES = [
+    ('per-request', {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '0'}),
+    ('persistent', {'DB_POOL': '0', 'DB_CONN_MAX_AGE': '60'}),
+    ('pool', {'DB_POOL': '1'}),
+]
+
+# Cheap pages, so connection setup is a visible share of the latency.
+ENDPOINTS = [
+    ('student', '/api/dashboard/pending-submissions/'),
+    ('student', '/notifications/'),
+    ('admin', '/dashboard/'),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4, help='gthread threads per worker')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=400, help='requests per endpoint')
+    args = parser.parse_args()
+
+    extra = ['--threads', str(args.threads)]
+    print(f"{'connections':<14}{'role':<9}{'endpoint':<40}{'req/s':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, env in MODES:
+        env = {**env, 'ASYNC_VIEWS': '0', 'DB_POOL_MAX_SIZE': str(args.threads)}
+        port = free_port()
+        with serve(gunicorn('student_analytics.wsgi:application', port, args.workers, 'gthread', extra), port, env) as base_url:
+            sessions = {role: Session(base_url).login(*creds) for role, creds in SEED_USERS.items()}
+            for role, path in ENDPOINTS:
+                sessions[role].get(path)  # warm-up
+                r = run_endpoint(sessions[role], path, args.requests, args.concurrency)
+                print(f"{name:<14}{role:<9}{path:<40}{r['rps']:>8.1f}{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}")
+
+
+if __name__ == '__main__':
+    main()
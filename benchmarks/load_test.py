@@ -0,0 +1,326 @@
+"""
+Replay a school-day peak: a login storm of students, teachers and admins
+followed by a mix of dashboard, student detail, trend API, roll-call and
+marks-entry requests, reporting throughput and latency per endpoint and role.
+
+Every virtual user logs in as one of the seeded accounts (several virtual users
+share an account) and picks its next request from the weighted --mix, limited
+to what its role can do: students only open their own detail page and trend,
+teachers the students and subjects in their scope. Without --url, gunicorn is
+started with gunicorn.conf.py against the configured database; a server given
+with --url must use the same database. Seed it first:
+
+    python manage.py seed_data
+    python benchmarks/load_test.py --users 60 --duration 60
+    python benchmarks/load_test.py --url http://127.0.0.1:8000 --roles teacher=1 --mix roll_call=3,marks_entry=1
+
+Roll-call and marks-entry requests save real rows, noted "load test"; they are
+deleted afterwards unless --keep-data is given.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.common import Session, free_port, gunicorn, serve, summarise  # noqa: E402
+
+LOAD_TEST_NOTE = 'load test'
+
+ACTIONS = ['dashboard', 'student_detail', 'api_student_trend', 'roll_call', 'marks_entry']
+
+ROLE_ACTIONS = {
+    'student': ['dashboard', 'student_detail', 'api_student_trend'],
+    'teacher': ACTIONS,
+    'admin': ACTIONS,
+}
+
+# Passwords `python manage.py seed_data` gives every account of each role.
+SEED_PASSWORDS = {'admin': 'admin123', 'teacher': 'teacher123', 'student': 'student123'}
+
+
+class Account:
+    def __init__(self, username, role, pk, student_ids, subject_ids):
+        self.username = username
+        self.password = SEED_PASSWORDS[role]
+        self.role = role
+        self.pk = pk
+        self.student_ids = sorted(student_ids)
+        self.subject_ids = sorted(subject_ids)
+
+    def actions(self, mix):
+        """The share of ``mix`` this account can carry out."""
+        allowed = set(ROLE_ACTIONS[self.role])
+        if not self.student_ids:
+            allowed -= {'student_detail', 'api_student_trend', 'roll_call', 'marks_entry'}
+        if not self.subject_ids:
+            allowed -= {'roll_call', 'marks_entry'}
+        return {action: weight for action, weight in mix.items() if action in allowed}
+
+
+class FreshEntries:
+    """Hands out (student, subject, day) triples nothing has been recorded for yet.
+
+    Each account walks through its students and subjects day by day, and
+    accounts take turns over the days after ``first_day``, so no two requests
+    collide on the (student, subject, date) part of the Attendance and Marks
+    unique keys.
+    """
+
+    def __init__(self, accounts, first_day):
+        self.lock = threading.Lock()
+        self.iterators = {
+            account.username: self._entries(account, first_day + timedelta(days=index), len(accounts))
+            for index, account in enumerate(accounts)
+        }
+
+    @staticmethod
+    def _entries(account, first_day, every):
+        for step in itertools.count():
+            day = first_day + timedelta(days=step * every)
+            for subject in account.subject_ids:
+                for student in account.student_ids:
+                    yield student, subject, day
+
+    def next(self, account):
+        with self.lock:
+            return next(self.iterators[account.username])
+
+
+def parse_weights(parser, text, choices, option):
+    weights = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name not in choices:
+            parser.error(f'{option}: unknown {name!r}, choose from {", ".join(choices)}')
+        try:
+            weights[name] = float(weight or 1)
+        except ValueError:
+            parser.error(f'{option}: {item!r} is not name=weight')
+    return {name: weight for name, weight in weights.items() if weight > 0}
+
+
+def load_accounts():
+    """The seeded accounts per role with the students and subjects each may use."""
+    from accounts.models import User
+    from analytics.models import Subject
+    from analytics.scope import TeacherScope
+
+    student_ids = set(User.objects.filter(role='student').values_list('pk', flat=True))
+    subject_ids = set(Subject.objects.values_list('pk', flat=True))
+    accounts = defaultdict(list)
+    for user in User.objects.filter(role__in=SEED_PASSWORDS, is_active=True).order_by('username'):
+        if not user.username.startswith(user.role):
+            continue  # not created by seed_data, password unknown
+        if user.role == 'student':
+            accounts['student'].append(Account(user.username, 'student', user.pk, [user.pk], []))
+        elif user.role == 'teacher':
+            scope = TeacherScope.for_user(user)
+            accounts['teacher'].append(Account(user.username, 'teacher', user.pk, scope.student_ids, scope.subject_ids))
+        else:
+            accounts['admin'].append(Account(user.username, 'admin', user.pk, student_ids, subject_ids))
+    return accounts
+
+
+class Recorder:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.results = defaultdict(list)  # (role, endpoint) -> [(seconds, ok), ...]
+
+    def time(self, role, endpoint, call):
+        started = time.perf_counter()
+        try:
+            ok = call()
+        except (OSError, http.client.HTTPException, RuntimeError):  # HTTP errors, resets, timeouts, failed logins
+            ok = False
+        with self.lock:
+            self.results[role, endpoint].append((time.perf_counter() - started, ok))
+        return ok
+
+
+def make_actions(roll_calls, marks_entries, fixtures):
+    """Request functions by action name; each returns whether the request succeeded."""
+    from django.urls import reverse
+
+    def dashboard(session, account, rng):
+        status, _ = session.get(reverse('dashboard'))
+        return status == 200
+
+    def student_detail(session, account, rng):
+        status, _ = session.get(reverse('student_detail', args=[rng.choice(account.student_ids)]))
+        return status == 200
+
+    def api_student_trend(session, account, rng):
+        status, _ = session.get(reverse('api_student_trend', args=[rng.choice(account.student_ids)]))
+        return status == 200
+
+    def roll_call_entry(session, account, rng):
+        student, subject, day = roll_calls.next(account)
+        _, path, _ = session.submit(reverse('mark_attendance'), {
+            'student': student, 'subject': subject, 'date': day.isoformat(),
+            'status': rng.choices(['present', 'absent', 'late'], [90, 7, 3])[0], 'note': LOAD_TEST_NOTE,
+        })
+        return path == reverse('attendance_list')  # the form comes back on validation errors
+
+    def marks_entry(session, account, rng):
+        student, subject, day = marks_entries.next(account)
+        _, path, _ = session.submit(reverse('add_marks'), {
+            'student': student, 'subject': subject, 'exam_type': rng.choice(fixtures['exam_types']),
+            'marks_obtained': round(rng.uniform(0.35, 1.0) * fixtures['max_marks'][subject], 2),
+            'date': day.isoformat(), 'remarks': LOAD_TEST_NOTE,
+        })
+        return path == reverse('marks_list')
+
+    return {
+        'dashboard': dashboard,
+        'student_detail': student_detail,
+        'api_student_trend': api_student_trend,
+        'roll_call': roll_call_entry,
+        'marks_entry': marks_entry,
+    }
+
+
+def virtual_user(base_url, account, mix, actions, recorder, start_at, duration, think, rng):
+    time.sleep(max(0.0, start_at - time.monotonic()))
+    session = Session(base_url)
+    if not recorder.time(account.role, 'login', lambda: session.login(account.username, account.password)):
+        return
+    names, weights = zip(*mix.items())
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        action = rng.choices(names, weights)[0]
+        recorder.time(account.role, action, lambda: actions[action](session, account, rng))
+        if think:
+            time.sleep(rng.expovariate(1 / think))
+
+
+def report(recorder, elapsed):
+    rows = []
+    groups = defaultdict(list)
+    for (role, endpoint), results in recorder.results.items():
+        groups[role, endpoint] = results
+        groups['all', endpoint] += results
+        groups['all', 'all'] += results
+    order = ['login'] + ACTIONS + ['all']
+    for (role, endpoint), results in sorted(groups.items(), key=lambda g: (g[0][0] == 'all', g[0][0], order.index(g[0][1]))):
+        latencies = [seconds for seconds, _ in results]
+        rows.append({
+            'role': role, 'endpoint': endpoint, **summarise(latencies, elapsed),
+            'errors': sum(not ok for _, ok in results), 'max': max(latencies) * 1000,
+        })
+
+    print(f"{'role':<9}{'endpoint':<19}{'requests':>9}{'errors':>8}{'req/s':>8}"
+          f"{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}")
+    for r in rows:
+        print(f"{r['role']:<9}{r['endpoint']:<19}{r['requests']:>9}{r['errors']:>8}{r['rps']:>8.1f}"
+              f"{r['p50']:>9.1f}{r['p95']:>9.1f}{r['p99']:>9.1f}{r['max']:>9.1f}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--url', help='Target a running server instead of starting gunicorn')
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers when starting the server')
+    parser.add_argument('--worker-class', help='gunicorn worker class, e.g. gthread')
+    parser.add_argument('--threads', type=int, default=1, help='threads per gthread worker')
+    parser.add_argument('--users', type=int, default=50, help='virtual users (client threads)')
+    parser.add_argument('--roles', default='student=75,teacher=20,admin=5', help='share of virtual users per role')
+    parser.add_argument('--mix', default='dashboard=40,student_detail=20,api_student_trend=20,roll_call=12,marks_entry=8',
+                        help='relative weight of each request type')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of traffic each user sends once logged in')
+    parser.add_argument('--ramp-up', type=float, default=0.0,
+                        help='spread the logins over this many seconds (0: everyone at once, the 8am storm)')
+    parser.add_argument('--think-time', type=float, default=0.0, help='mean pause between a user\'s requests, in seconds')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for roles, request mix and form values')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--keep-data', action='store_true', help='keep the attendance and marks the run saved')
+    args = parser.parse_args()
+
+    roles = parse_weights(parser, args.roles, list(ROLE_ACTIONS), '--roles')
+    mix = parse_weights(parser, args.mix, ACTIONS, '--mix')
+
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_analytics.settings')
+    import django
+    django.setup()
+    from django.db import connections
+    from django.db.models import Max
+
+    from analytics.models import Attendance, ExamType, Marks, Subject
+
+    accounts = load_accounts()
+    for role in roles:
+        if not accounts[role]:
+            parser.error(f'no seeded {role} accounts; run `python manage.py seed_data`')
+        if not any(account.actions(mix) for account in accounts[role]):
+            parser.error(f'--mix leaves {role}s nothing to do; change --mix or --roles')
+
+    rng = random.Random(args.seed)
+    plan = []
+    for index, role in enumerate(rng.choices(list(roles), list(roles.values()), k=args.users)):
+        usable = [a for a in accounts[role] if a.actions(mix)]
+        plan.append(usable[index % len(usable)])
+    writers = sorted({a for a in plan if {'roll_call', 'marks_entry'} & set(a.actions(mix))}, key=lambda a: a.username)
+    entries = {}
+    for model in (Attendance, Marks):
+        last_day = model.objects.aggregate(last=Max('date'))['last'] or date.today()
+        entries[model] = FreshEntries(writers, last_day + timedelta(days=1))
+    fixtures = {
+        'exam_types': list(ExamType.objects.values_list('pk', flat=True)),
+        'max_marks': dict(Subject.objects.values_list('pk', 'max_marks')),
+    }
+    actions = make_actions(entries[Attendance], entries[Marks], fixtures)
+    connections.close_all()
+
+    def run(base_url):
+        recorder = Recorder()
+        counts = defaultdict(int)
+        for account in plan:
+            counts[account.role] += 1
+        print(f'{args.users} virtual users ({", ".join(f"{n} {r}s" for r, n in counts.items())}) '
+              f'against {base_url} for {args.duration:.0f}s')
+        start = time.monotonic() + 0.5
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.users) as pool:
+            futures = [
+                pool.submit(
+                    virtual_user, base_url, account, account.actions(mix), actions, recorder,
+                    start + args.ramp_up * index / args.users, args.duration, args.think_time,
+                    random.Random(f'{args.seed}-{index}'),
+                )
+                for index, account in enumerate(plan)
+            ]
+            for future in futures:
+                future.result()
+        return report(recorder, time.perf_counter() - started)
+
+    try:
+        if args.url:
+            rows = run(args.url.rstrip('/'))
+        else:
+            port = free_port()
+            extra = ['--threads', str(args.threads)] if args.threads > 1 else []
+            server = gunicorn('student_analytics.wsgi:application', port, args.workers, args.worker_class, extra)
+            with serve(server, port) as base_url:
+                rows = run(base_url)
+    finally:
+        if not args.keep_data:
+            removed = Attendance.objects.filter(note=LOAD_TEST_NOTE).delete()[0]
+            removed += Marks.objects.filter(remarks=LOAD_TEST_NOTE).delete()[0]
+            print(f'Removed {removed} records saved by the run.')
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'args': vars(args), 'results': rows}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""
+Gunicorn settings with worker warm-up (see student_analytics.warmup).
+Run: gunicorn student_analytics.wsgi:application -c gunicorn.conf.py
+     (or student_analytics.asgi:application with GUNICORN_WORKER_CLASS=uvicorn_worker.UvicornWorker)
+
+With preload_app (GUNICORN_PRELOAD=1, the default) the master loads Django,
+compiles templates and fills the caches once, and every forked worker starts
+from that copy and only opens its own database connections. Without it each
+worker runs the whole warm-up after loading the app.
+"""
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'sync')
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def _log(log, where, timings):
+    for step, seconds, detail in timings:
+        log.info('warm-up (%s) %s: %.0f ms, %s', where, step, seconds * 1000, detail)
+
+
+def on_starting(server):
+    # Counters start from zero with the server; drop what the last run left.
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_analytics.settings')
+    from analytics import metrics
+
+    metrics.clear()
+
+
+def when_ready(server):
+    # Runs in the master before the first fork; connections must not leak
+    # into the workers.
+    if server.cfg.preload_app:
+        from student_analytics.warmup import STEPS, warm_up
+
+        steps = [s for s in STEPS if s != 'connections']
+        _log(server.log, 'master', warm_up(steps, keep_connections=False))
+
+
+def post_worker_init(worker):
+    from student_analytics.warmup import STEPS, warm_up
+
+    steps = ['connections'] if worker.cfg.preload_app else STEPS
+    _log(worker.log, f'worker {worker.pid}', warm_up(steps))
+
+
+def worker_exit(server, worker):
+    # Write out the request metrics this worker has not flushed yet.
+    from analytics import metrics
+
+    metrics.flush()
@@ -0,0 +1,5 @@
+import os
+from django.core.asgi import get_asgi_application
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'student_analytics.settings')
+os.environ.setdefault('ASYNC_VIEWS', '1')
+application = get_asgi_application()
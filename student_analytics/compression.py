@@ -0,0 +1,76 @@
+"""
+Compression of dynamic HTML and JSON responses.
+
+Brotli is used when the client accepts it and the ``brotli`` package is
+installed, gzip otherwise. Either way the body is padded with a random
+number of bytes against BREACH-style length attacks, as GZipMiddleware does:
+gzip through a random header filename, Brotli through a metadata block that
+decoders skip. Responses smaller than ``COMPRESSION_MIN_SIZE``
+bytes, already encoded, streamed (report-card ZIPs) or of a type that does
+not compress are passed through unchanged. Static files never get here:
+WhiteNoise serves its precompressed copies before this middleware runs.
+"""
+import secrets
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.regex_helper import _lazy_re_compile
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+accepts_br = _lazy_re_compile(r'\bbr\b(?!\s*;\s*q=0(?:\.0*)?\b)')
+accepts_gzip = _lazy_re_compile(r'\bgzip\b(?!\s*;\s*q=0(?:\.0*)?\b)')
+compressible = _lazy_re_compile(r'^(text/|application/(json|javascript|xml)|image/svg\+xml)')
+
+
+def compress_brotli(content, *, max_random_bytes):
+    """Brotli-compress ``content``, padded with fewer than ``max_random_bytes`` (at most 256) bytes."""
+    compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+    stream = compressor.process(content) + compressor.flush()  # ends on a byte boundary
+    padding = secrets.randbelow(max_random_bytes)
+    if padding:
+        # Metadata meta-block (RFC 7932, 9.2): ISLAST=0, MNIBBLES=0, reserved
+        # bit, MSKIPBYTES=1, MSKIPLEN-1 in 8 bits, zero bits up to the byte
+        # boundary, then MSKIPLEN bytes the decoder skips.
+        stream += bytes([0b00010110 | ((padding - 1) & 0b11) << 6, (padding - 1) >> 2]) + b'a' * padding
+    return stream + b'\x03'  # last meta-block: ISLAST=1, ISLASTEMPTY=1
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    # Same random padding as GZipMiddleware against BREACH-style length attacks.
+    max_random_bytes = 100
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+        if not compressible.match(response.get('Content-Type', '')):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        accept = request.META.get('HTTP_ACCEPT_ENCODING', '')
+        if brotli is not None and accepts_br.search(accept):
+            encoding = 'br'
+            compressed = compress_brotli(response.content, max_random_bytes=self.max_random_bytes)
+        elif accepts_gzip.search(accept):
+            encoding = 'gzip'
+            compressed = compress_string(response.content, max_random_bytes=self.max_random_bytes)
+        else:
+            return response
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        # The body is no longer byte-identical to what a strong ETag promised.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+        return response
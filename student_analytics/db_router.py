@@ -0,0 +1,195 @@
+"""
+Read-replica routing.
+
+Writes always go to ``default`` (the primary). Reads go to the primary too,
+except inside views wrapped with ``@replica_reads``: there a GET/HEAD request
+reads from one of ``settings.DATABASE_REPLICAS`` unless
+
+* the client wrote something within the last ``READ_YOUR_WRITES_SECONDS``
+  (tracked with a cookie set by ``ReplicaRoutingMiddleware``),
+* the request itself has already written, or is inside a transaction on the
+  primary, or
+* the replica lags more than ``REPLICA_MAX_LAG`` seconds (or is unreachable).
+
+Locally, point a ``replica`` alias at a copy of the SQLite database (or a
+second PostgreSQL database) and list it in ``DATABASE_REPLICAS``.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_primary'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Per-request routing state: {'replica': bool, 'wrote': bool}. A mutable dict so
+# flags set in threads / tasks spawned by the request are seen by the request.
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+# alias -> (checked at, healthy)
+_health = {}
+
+
+def _replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def replica_lag(alias):
+    """Replication lag of ``alias`` in seconds (0 for backends without replication info)."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        connection.ensure_connection()
+        return 0.0
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT CASE WHEN NOT pg_is_in_recovery() "
+            "OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+            "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+        )
+        return float(cursor.fetchone()[0])
+
+
+def _in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def _healthy(alias):
+    checked_at, healthy = _health.get(alias, (0, False))
+    if time.monotonic() - checked_at < getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 5):
+        return healthy
+    if _in_event_loop():
+        # Can't query from async code; the next lookup made from the ORM's
+        # worker thread refreshes it.
+        return healthy
+    try:
+        healthy = replica_lag(alias) <= getattr(settings, 'REPLICA_MAX_LAG', 5)
+    except Exception:
+        logger.warning("Replica %s unavailable, reading from the primary", alias, exc_info=True)
+        healthy = False
+    _health[alias] = (time.monotonic(), healthy)
+    return healthy
+
+
+def reading_from_replica():
+    """True if reads in the current request may be served by a replica."""
+    state = _state.get()
+    return bool(state and state['replica'] and not state['wrote'] and _replicas())
+
+
+@contextmanager
+def routing(replica=False):
+    """Route the reads made inside the block (writes always use the primary)."""
+    state = _state.get()
+    if state is None:
+        token = _state.set({'replica': replica, 'wrote': False})
+        try:
+            yield
+        finally:
+            _state.reset(token)
+        return
+    previous = state['replica']
+    state['replica'] = replica
+    try:
+        yield
+    finally:
+        state['replica'] = previous
+
+
+def replica_may_be_behind(changed_at):
+    """True if data changed at ``changed_at`` (epoch seconds) may not have
+    reached the replica the current request reads from yet."""
+    return reading_from_replica() and time.time() - changed_at < getattr(settings, 'REPLICA_MAX_LAG', 5)
+
+
+def _pinned(request):
+    return request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+
+
+def replica_reads(view_func):
+    """Let a read-only view read from a replica (see module docstring)."""
+    if iscoroutinefunction(view_func):
+        @functools.wraps(view_func)
+        async def wrapper(request, *args, **kwargs):
+            with routing(replica=not _pinned(request)):
+                return await view_func(request, *args, **kwargs)
+    else:
+        @functools.wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            with routing(replica=not _pinned(request)):
+                return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not reading_from_replica() or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        healthy = [alias for alias in _replicas() if _healthy(alias)]
+        return random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Also consulted for unique/constraint validation, so a failed form POST
+        # pins the client too; erring towards the primary is harmless.
+        state = _state.get()
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in _replicas():
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """Tracks writes per request and pins the client to the primary afterwards.
+
+    Place it after the session and authentication middleware so their own
+    bookkeeping writes (session saves) don't count as the client's writes.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with routing():
+            response = self.get_response(request)
+            return self._pin(response)
+
+    async def __acall__(self, request):
+        with routing():
+            response = await self.get_response(request)
+            return self._pin(response)
+
+    def _pin(self, response):
+        if _state.get()['wrote']:
+            response.set_cookie(
+                PIN_COOKIE, '1', max_age=getattr(settings, 'READ_YOUR_WRITES_SECONDS', 10),
+                httponly=True, samesite='Lax',
+            )
+        return response
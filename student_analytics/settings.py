@@ -5,7 +5,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = 'django-insecure-change-this-in-production-ps10-analytics-key'
 
-DEBUG = True
+# Turn off in production (DJANGO_DEBUG=0); static files then get far-future
+# cache headers.
+DEBUG = os.environ.get('DJANGO_DEBUG', '1') == '1'
 
 ALLOWED_HOSTS = ['*']
 
@@ -16,6 +18,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'analytics',
     'accounts',
 ]
@@ -24,13 +27,17 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
+    'analytics.metrics.MetricsMiddleware',
+    'student_analytics.compression.CompressionMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'analytics.profiling.ProfilerMiddleware',
+    'student_analytics.db_router.ReplicaRoutingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
 ]
 
 ROOT_URLCONF = 'student_analytics.urls'
@@ -53,6 +60,11 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'student_analytics.wsgi.application'
+ASGI_APPLICATION = 'student_analytics.asgi.application'
+
+# Serve the async dashboard/API views. Enabled automatically by asgi.py so
+# that uvicorn workers get them while WSGI workers keep the sync versions.
+ASYNC_VIEWS = os.environ.get('ASYNC_VIEWS', '0') == '1'
 
 DATABASES = {
     'default': {
@@ -62,11 +74,66 @@ DATABASES = {
         'PASSWORD': '93905@Sai',
         'HOST': 'localhost',
         'PORT': '5432',
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Connection reuse. By default each worker process keeps a psycopg connection
+# pool (sized per worker: max_size should cover its threads). Connections are
+# health-checked on checkout and recycled after max_lifetime seconds. With
+# DB_POOL=0 Django keeps one persistent connection per thread instead, for
+# DB_CONN_MAX_AGE seconds (0 = a new connection per request).
+if os.environ.get('DB_POOL', '1') == '1':
+    DATABASES['default']['OPTIONS'] = {
+        'pool': {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+            'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+            'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+            'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 30 * 60)),
+            'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 5 * 60)),
+        },
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+# Seconds between flushes of each process's connection pool counters and
+# request metrics to its file in METRICS_DIR.
+METRICS_FLUSH_INTERVAL = 10
+
+# One analytics.metrics file per process, added up when /metrics is scraped;
+# every worker of a host must see the same directory.
+METRICS_DIR = os.environ.get('METRICS_DIR', str(BASE_DIR / 'metrics'))
+
+# Bearer token Prometheus must send to scrape /metrics; without one only
+# requests from the host itself are answered.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+
+# Read replicas for the analytics views (see student_analytics.db_router).
+# DB_REPLICA_HOSTS is a comma-separated list of streaming replicas of the
+# primary above; each becomes a "replica<N>" alias.
+for n, host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{n}'] = {**DATABASES['default'], 'HOST': host.strip(), 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['student_analytics.db_router.ReplicaRouter']
+
+# Replicas lagging more than this many seconds are skipped (health is
+# re-checked every REPLICA_HEALTH_CHECK_INTERVAL seconds).
+REPLICA_MAX_LAG = 5
+REPLICA_HEALTH_CHECK_INTERVAL = 5
+
+# After a write, the client reads from the primary for this many seconds.
+READ_YOUR_WRITES_SECONDS = 10
+
 AUTH_USER_MODEL = 'accounts.User'
 
+# The logged-in user is served from the cache rather than queried on every
+# request (only when CACHE_IS_SHARED, see below). Sessions created under
+# ModelBackend are moved over by migration accounts 0002; listing both would
+# hash failed logins' passwords twice.
+AUTHENTICATION_BACKENDS = ['accounts.backends.CachedModelBackend']
+USER_CACHE_TIMEOUT = 60
+
 LOGIN_URL = '/accounts/login/'
 LOGIN_REDIRECT_URL = '/dashboard/'
 LOGOUT_REDIRECT_URL = '/accounts/login/'
@@ -88,7 +155,91 @@ STATICFILES_DIRS = [BASE_DIR / 'static']
 STATIC_ROOT = BASE_DIR / 'staticfiles'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# collectstatic writes content-hashed copies of every file plus gzip and
+# Brotli versions; WhiteNoise serves the hashed names with a far-future,
+# immutable Cache-Control.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {'BACKEND': 'whitenoise.storage.CompressedManifestStaticFilesStorage'},
+}
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Shared cache for dashboard sections, template fragments and data version
+# counters. Set REDIS_URL when running several workers so they share it.
+# CACHE_IS_SHARED says whether every worker sees the same cache; without it
+# nothing derived from the version counters is cached (see analytics.versioning).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+    CACHE_IS_SHARED = True
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+    CACHE_IS_SHARED = False
+
+# Sessions are read from the cache and written through to the database when
+# the cache is shared; a per-process copy would outlive logout in the other
+# workers.
+if CACHE_IS_SHARED:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+
+# Seconds a versioned template fragment is kept; keys change on every data
+# write, so this only bounds how long superseded entries linger.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Identifies the deployed code; part of every ETag so a release invalidates
+# pages browsers and proxies have cached.
+RELEASE_VERSION = os.environ.get('RELEASE_VERSION', '')
+
+# Seconds a dashboard section payload (see analytics.dashboard_sections) is cached.
+DASHBOARD_SECTION_TIMEOUT = 60
+
+# Month (1-12) in which a new academic year starts, e.g. June -> "2024-2025".
+ACADEMIC_YEAR_START_MONTH = 6
+
+# Monthly Attendance partitions (PostgreSQL) kept ready ahead of the current month.
+ATTENDANCE_PARTITIONS_AHEAD = 3
+
+# Where manage.py export_snapshot writes its Parquet / Arrow files.
+SNAPSHOT_DIR = os.environ.get('SNAPSHOT_DIR', BASE_DIR / 'snapshots')
+
+# Change feed (analytics.changefeed): seconds before a gap in the change-log
+# ids is taken for a rolled-back transaction where transaction ids are not
+# available (not PostgreSQL; keep it above the longest write transaction), and
+# days entries every consumer has read are kept.
+CHANGEFEED_SETTLE_SECONDS = 10
+CHANGEFEED_RETENTION_DAYS = 30
+
+# Report card ZIPs (analytics.report_cards): worker processes rendering the
+# cards (0 renders in the request's own process) and students loaded per batch.
+REPORT_CARD_WORKERS = int(os.environ.get('REPORT_CARD_WORKERS', 2))
+REPORT_CARD_CHUNK = 100
+
+# Dynamic responses (student_analytics.compression): smallest body in bytes
+# worth compressing, and the Brotli quality (0-11; higher is smaller but slower).
+COMPRESSION_MIN_SIZE = 1024
+BROTLI_QUALITY = 5
+
+# On-demand profiling (analytics.profiling): staff add ?_profile (or
+# ?_profile=sample) to a URL; the newest PROFILER_KEEP profiles are kept.
+PROFILER_ENABLED = os.environ.get('PROFILER_ENABLED', '1') == '1'
+PROFILER_KEEP = 200
+PROFILER_SAMPLE_INTERVAL = 0.002
+
+# Statements slower than this many milliseconds are aggregated into the
+# slow-query log (analytics.slow_queries) with their plans; 0 turns it off.
+SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 200))
@@ -0,0 +1,120 @@
+"""
+Worker warm-up: do the work the first requests after a deploy would
+otherwise pay for.
+
+* import every module of the project's apps (views, forms, admin, ...),
+* populate the URL resolvers,
+* compile every template under ``templates/`` and the apps' template dirs
+  into the cached template loader,
+* fill the per-process and shared reference-data caches (content types,
+  data version counters, teacher scopes, school-wide dashboard sections),
+* open the database connections (and connection pools).
+
+``gunicorn.conf.py`` runs it once in the master with ``preload_app`` (without
+keeping connections, which must not be shared with forked workers) and opens
+the connections in each worker; ``manage.py warmup`` runs all of it.
+"""
+import importlib
+import pkgutil
+import time
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.template import engines
+from django.urls import get_resolver
+
+STEPS = ['apps', 'urls', 'templates', 'caches', 'connections']
+
+
+def _project_apps():
+    return [a for a in apps.get_app_configs() if Path(a.path).is_relative_to(settings.BASE_DIR)]
+
+
+def import_apps():
+    count = 0
+    for app in _project_apps():
+        for module in pkgutil.walk_packages([app.path], prefix=f'{app.name}.'):
+            if '.migrations' in module.name or '.management.commands.' in module.name:
+                continue
+            importlib.import_module(module.name)
+            count += 1
+    return f'{count} modules'
+
+
+def populate_urls():
+    resolver = get_resolver()
+    resolver.reverse_dict  # builds the reverse lookup tables of every included URLconf
+    return f'{len(resolver.reverse_dict)} names'
+
+
+def compile_templates():
+    engine = engines['django']
+    dirs = list(engine.dirs) + [Path(a.path) / 'templates' for a in _project_apps()]
+    count = 0
+    for directory in map(Path, dirs):
+        for path in sorted(directory.rglob('*.html')):
+            engine.get_template(path.relative_to(directory).as_posix())
+            count += 1
+    return f'{count} templates'
+
+
+def prime_caches():
+    from django.contrib.contenttypes.models import ContentType
+
+    from accounts.models import User
+    from analytics import dashboard_sections, versioning
+    from analytics.models import ClassRoom, Subject
+    from analytics.scope import TeacherScope
+
+    ContentType.objects.get_for_models(*apps.get_models())
+    pairs = [versioning.SCHOOL] + [('subject', pk) for pk in Subject.objects.values_list('pk', flat=True)]
+    pairs += [('classroom', pk) for pk in ClassRoom.objects.values_list('pk', flat=True)]
+    versioning.get_versions(pairs)
+    teachers = list(User.objects.filter(role='teacher')) if versioning.is_shared() else []
+    for teacher in teachers:
+        TeacherScope.for_user(teacher)
+    admin = User.objects.filter(role='admin').first()
+    sections = [s for s in dashboard_sections.SECTIONS if admin and dashboard_sections.is_available(s, admin)]
+    for section in sections:
+        dashboard_sections.get_section(section, admin)
+    return f'{len(pairs)} versions, {len(teachers)} teacher scopes, {len(sections)} dashboard sections'
+
+
+def open_connections():
+    for alias in connections:
+        connections[alias].ensure_connection()
+    return f'{len(connections.all())} databases'
+
+
+def close_connections():
+    for connection in connections.all():
+        connection.close()
+        if hasattr(connection, 'close_pool'):
+            connection.close_pool()
+
+
+RUNNERS = {
+    'apps': import_apps,
+    'urls': populate_urls,
+    'templates': compile_templates,
+    'caches': prime_caches,
+    'connections': open_connections,
+}
+
+
+def warm_up(steps=STEPS, keep_connections=True):
+    """Run ``steps`` in order; returns ``[(step, seconds, detail), ...]``.
+
+    With ``keep_connections=False`` every connection (and pool) opened along
+    the way is closed at the end, as needed before forking.
+    """
+    timings = []
+    for step in steps:
+        started = time.perf_counter()
+        detail = RUNNERS[step]()
+        timings.append((step, time.perf_counter() - started, detail))
+    if not keep_connections:
+        close_connections()
+    return timings